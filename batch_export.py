@@ -0,0 +1,170 @@
+"""
+Headless batch export of many game sessions (e.g. every section at the end of term)
+
+Each session's results are rendered in a separate worker process with the
+same layout as the Admin page download.
+
+Usage:
+    python batch_export.py --all-finished --out exports/
+    python batch_export.py ABC123 DEF456 --zip grading.zip --format xlsx
+"""
+
+import argparse
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+
+import shared_state as state
+
+FILE_EXTENSIONS = {"xlsx": "xlsx", "csv": "csv.zip", "parquet": "parquet.zip", "arrow": "arrow.zip"}
+
+
+def export_file_name(join_code: str, game: dict, fmt: str) -> str:
+    return f"{join_code}_{game.get('game_type', 'game')}.{FILE_EXTENSIONS[fmt]}"
+
+
+def _rounds_played(game: dict) -> int:
+    """Rounds with processed results; current_round runs one past the last round once the game finishes"""
+    played = [int(r) for team in game.get("teams", {}).values() for r in (team.get("round_history") or {})]
+    return max(played, default=0)
+
+
+def _render(join_code: str, game: dict, fmt: str, fileobj):
+    if fmt == "xlsx":
+        state.write_game_results_excel(game, fileobj)
+    else:
+        state.write_export_bundle(state.build_export_tables(join_code, game), fmt, fileobj)
+
+
+def _export_one(join_code: str, game: dict, fmt: str, out_dir: str = None) -> dict:
+    """
+    Worker: render one session. Writes to out_dir if given, otherwise returns
+    the file contents in result["data"] for the parent to add to a zip.
+    """
+    start = time.perf_counter()
+    result = {
+        "join_code": join_code,
+        "game_type": game.get("game_type"),
+        "teams": len(game.get("teams", {})),
+        "rounds": _rounds_played(game),
+        "file_name": export_file_name(join_code, game, fmt),
+        "data": None,
+        "error": None,
+    }
+
+    try:
+        if out_dir:
+            path = os.path.join(out_dir, result["file_name"])
+            with open(path, "wb") as f:
+                _render(join_code, game, fmt, f)
+            result["bytes"] = os.path.getsize(path)
+        else:
+            output = BytesIO()
+            _render(join_code, game, fmt, output)
+            result["data"] = output.getvalue()
+            result["bytes"] = len(result["data"])
+    except Exception as e:
+        result["error"] = str(e)
+        result["bytes"] = 0
+
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def select_sessions(join_codes: list = None, all_finished: bool = False) -> dict:
+    """
+    {join_code: game} for the given codes and/or every finished session. Each
+    is loaded like the single-session export (get_game_session), so decisions
+    still queued in the session's inbox are included.
+    """
+    games = state.get_all_game_sessions()
+
+    codes = [code.upper() for code in join_codes or [] if code.upper() in games]
+    if all_finished:
+        codes += [code for code, game in games.items() if game.get("status") == "finished"]
+
+    selected = {}
+    for code in dict.fromkeys(codes):
+        game = state.get_game_session(code)
+        if game:
+            selected[code] = game
+    return selected
+
+
+def batch_export(join_codes: list = None, all_finished: bool = False, out_dir: str = None,
+                 zip_path: str = None, fmt: str = "xlsx", max_workers: int = None) -> list:
+    """
+    Export many sessions in parallel into out_dir (one file each) or into a
+    single zip at zip_path.
+    Returns: per-session results (join_code, game_type, teams, rounds,
+    file_name, bytes, seconds, error); unknown join codes are reported with
+    an error instead of being skipped silently.
+    """
+    if fmt not in FILE_EXTENSIONS:
+        raise ValueError(f"Unknown format {fmt!r} (choose from {', '.join(FILE_EXTENSIONS)})")
+    if bool(out_dir) == bool(zip_path):
+        raise ValueError("Give exactly one of out_dir or zip_path")
+
+    sessions = select_sessions(join_codes, all_finished)
+    missing = [c.upper() for c in join_codes or [] if c.upper() not in sessions]
+    results = [{"join_code": c, "game_type": None, "teams": 0, "rounds": 0, "file_name": None,
+                "bytes": 0, "seconds": 0.0, "error": "session not found"} for c in missing]
+
+    if out_dir:
+        os.makedirs(out_dir, exist_ok=True)
+
+    zf = zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_STORED) if zip_path else None
+    try:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            futures = [pool.submit(_export_one, code, game, fmt, out_dir) for code, game in sessions.items()]
+            for future in futures:
+                result = future.result()
+                data = result.pop("data")
+                if zf is not None and data is not None:
+                    # xlsx and the bundles are already compressed
+                    zf.writestr(result["file_name"], data)
+                results.append(result)
+    finally:
+        if zf is not None:
+            zf.close()
+
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export many game sessions at once")
+    parser.add_argument("join_codes", nargs="*", help="sessions to export")
+    parser.add_argument("--all-finished", action="store_true", help="export every finished session")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--out", help="directory to write one file per session into")
+    target.add_argument("--zip", help="single zip file to write all sessions into")
+    parser.add_argument("--format", default="xlsx", choices=list(FILE_EXTENSIONS))
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    if not args.join_codes and not args.all_finished:
+        parser.error("give join codes and/or --all-finished")
+
+    start = time.perf_counter()
+    results = batch_export(args.join_codes, args.all_finished, args.out, args.zip, args.format, args.workers)
+    wall = time.perf_counter() - start
+
+    print(f"{'session':<9}{'game':<15}{'teams':>6}{'rounds':>7}{'seconds':>9}{'KB':>9}  file")
+    for r in results:
+        if r["error"]:
+            print(f"{r['join_code']:<9}{(r['game_type'] or '-'):<15}{'':>6}{'':>7}{'':>9}{'':>9}  ERROR: {r['error']}")
+        else:
+            print(f"{r['join_code']:<9}{r['game_type']:<15}{r['teams']:>6}{r['rounds']:>7}"
+                  f"{r['seconds']:>9.2f}{r['bytes'] / 1024:>9.1f}  {r['file_name']}")
+
+    ok = [r for r in results if not r["error"]]
+    print(f"\n{len(ok)}/{len(results)} sessions exported in {wall:.2f}s wall "
+          f"({sum(r['seconds'] for r in ok):.2f}s of rendering) -> {args.out or args.zip}")
+    return 0 if len(ok) == len(results) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,331 @@
+"""
+Round engine regression harness with golden outputs
+
+Plays each round engine (_process_<game_type>_round) for ROUNDS rounds on
+seeded synthetic classes of 8, 100 and 1000 teams, scores the build-country
+teams with compute_build_country_score, checks everything against the golden
+files in benchmarks/golden/ and reports throughput in teams per second.
+
+A faster engine (vectorized, batched, cached) is passed with --candidate and
+only qualifies to replace the scalar one if, on the same inputs, every output
+matches the scalar engine (floats within --rel-tol) and it is at least
+--min-speedup times faster at the largest team count.
+
+Usage:
+    python benchmarks/engine_regression.py                       # check goldens, print teams/s
+    python benchmarks/engine_regression.py --update-golden       # after an intentional engine change
+    python benchmarks/engine_regression.py --candidate build_country=fast_engine:process_round
+    python benchmarks/engine_regression.py --candidate score=fast_engine:score --teams 1000
+"""
+
+import argparse
+import hashlib
+import importlib
+import json
+import math
+import os
+import pickle
+import random
+import statistics
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from synthetic import GAME_TYPES, decision_update
+
+GOLDEN_DIR = os.path.join(BENCH_DIR, "golden")
+TEAM_COUNTS = (8, 100, 1000)
+ROUNDS = 3
+SEED = 11
+
+# Teams shown in full in the golden files; the rest are checked through per-field aggregates
+GOLDEN_SAMPLE_TEAMS = 8
+
+# Round context, cycled through the rounds; the engines only look at keywords in the names
+BUILD_COUNTRY_SCENARIOS = ("Recession", "Tech Boom", "Natural Disaster", "Climate Crisis",
+                           "Trade Agreement", "Social Movement", "Steady Year")
+BEAT_MARKET_EVENTS = ("Bull Market Rally", "Interest Rate Hike", "Company Scandal", "Tech Breakthrough",
+                      "Market Correction", "Climate Regulation", "Quiet Week")
+
+# Team fields the engines read rather than write
+_INPUT_KEYS = {"decisions", "portfolio", "decision_saved_round", "joined_at", "team_code"}
+
+
+def _copy(obj):
+    return pickle.loads(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+
+def make_rounds(game_type: str, num_teams: int, seed: int = SEED) -> list:
+    """
+    Inputs of ROUNDS rounds: [(round context, {team: decision update})]. About
+    a fifth of the teams keep their previous decision each round.
+    """
+    rng = random.Random(seed * 1_000_003 + num_teams * 10 + GAME_TYPES.index(game_type))
+    rounds = []
+    for round_num in range(1, ROUNDS + 1):
+        turn = round_num + num_teams
+        if game_type == "build_country":
+            context = {"current_scenario": {"name": BUILD_COUNTRY_SCENARIOS[turn % len(BUILD_COUNTRY_SCENARIOS)]}}
+        elif game_type == "beat_market":
+            context = {"current_event": {"name": BEAT_MARKET_EVENTS[turn % len(BEAT_MARKET_EVENTS)]}}
+        else:
+            context = {"indicators": {
+                "sentiment": rng.randint(20, 80),
+                "volume": rng.randint(30, 90),
+                "hype": rng.randint(25, 95),
+                "price": round(rng.uniform(8000, 15000), 2),
+                "price_change": round(rng.uniform(-20, 20), 2),
+            }}
+        updates = {f"Team {i}": decision_update(game_type, round_num, rng)
+                   for i in range(1, num_teams + 1) if round_num == 1 or rng.random() < 0.8}
+        rounds.append((context, updates))
+    return rounds
+
+
+def play(engine, game_type: str, num_teams: int, rounds: list, seed: int = SEED):
+    """
+    Run engine through the rounds on a fresh game.
+    Returns: (final game, seconds spent inside engine calls)
+    """
+    # The crypto engine draws the stablecoin return from the global random module
+    random.seed(seed)
+    game = {"game_type": game_type, "current_round": 0, "game_state": {},
+            "teams": {f"Team {i}": {} for i in range(1, num_teams + 1)}}
+
+    elapsed = 0.0
+    for round_num, (context, updates) in enumerate(rounds, start=1):
+        game["current_round"] = round_num
+        game["game_state"].update(_copy(context))
+        for team_name, update in updates.items():
+            game["teams"][team_name].update(_copy(update))
+
+        start = time.perf_counter()
+        engine(game)
+        elapsed += time.perf_counter() - start
+    return game, elapsed
+
+
+def outputs(game: dict, scores: dict = None) -> dict:
+    """What the engine produced: {"game_state": {...}, "teams": {team: {...}}} (plus "scores")"""
+    result = {
+        "game_state": {k: v for k, v in game["game_state"].items()
+                       if k not in ("current_scenario", "current_event", "indicators")},
+        "teams": {name: {k: v for k, v in team.items() if k not in _INPUT_KEYS}
+                  for name, team in game["teams"].items()},
+    }
+    if scores is not None:
+        result["scores"] = scores
+    return result
+
+
+def _leaves(obj, path: str = ""):
+    if isinstance(obj, dict):
+        for key, value in obj.items():
+            yield from _leaves(value, f"{path}.{key}" if path else str(key))
+    elif isinstance(obj, (list, tuple)):
+        for i, value in enumerate(obj):
+            yield from _leaves(value, f"{path}[{i}]")
+    else:
+        yield path, obj
+
+
+def _field(path: str) -> str:
+    """teams.Team 12.metrics.gdp -> teams.*.metrics.gdp"""
+    parts = path.split(".")
+    if parts[0] in ("teams", "scores") and len(parts) > 1:
+        parts[1] = "*"
+    return ".".join(parts)
+
+
+def golden_record(result: dict) -> dict:
+    """Golden form of outputs(): the first teams in full, per-field aggregates, a digest of the text"""
+    fields, text = {}, hashlib.sha256()
+    for path, value in _leaves(result):
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            text.update(f"{path}={value!r}\n".encode("utf-8"))
+            continue
+        agg = fields.setdefault(_field(path), [0, 0.0, math.inf, -math.inf])
+        agg[0] += 1
+        agg[1] += float(value)
+        agg[2] = min(agg[2], float(value))
+        agg[3] = max(agg[3], float(value))
+
+    sample = sorted(result["teams"], key=lambda name: int(name.split()[-1]))[:GOLDEN_SAMPLE_TEAMS]
+    return {
+        "game_state": result["game_state"],
+        "teams": {name: result["teams"][name] for name in sample},
+        "scores": {name: result["scores"][name] for name in sample} if "scores" in result else None,
+        "fields": {path: fields[path] for path in sorted(fields)},
+        "text_sha256": text.hexdigest(),
+    }
+
+
+def _close(a, b, rel_tol: float) -> bool:
+    if isinstance(a, bool) or isinstance(b, bool) or not isinstance(a, (int, float)) or not isinstance(b, (int, float)):
+        return a == b
+    return math.isclose(a, b, rel_tol=rel_tol, abs_tol=rel_tol)
+
+
+def differences(expected, actual, rel_tol: float, limit: int = 10) -> list:
+    """Leaves of expected and actual that differ (floats beyond rel_tol), as readable lines"""
+    expected_leaves, actual_leaves = dict(_leaves(expected)), dict(_leaves(actual))
+    found = []
+    for path in sorted(expected_leaves.keys() | actual_leaves.keys()):
+        a, b = expected_leaves.get(path, "<missing>"), actual_leaves.get(path, "<missing>")
+        if not _close(a, b, rel_tol):
+            found.append(f"{path}: expected {a!r}, got {b!r}")
+            if len(found) >= limit:
+                found.append("...")
+                break
+    return found
+
+
+def golden_path(game_type: str) -> str:
+    return os.path.join(GOLDEN_DIR, f"{game_type}.json")
+
+
+def _load_candidate(spec: str):
+    """'build_country=module:function' -> ("build_country", function)"""
+    target, _, where = spec.partition("=")
+    module_name, _, function_name = where.partition(":")
+    if target not in GAME_TYPES + ("score",) or not module_name or not function_name:
+        raise SystemExit(f"--candidate {spec!r}: expected <{'|'.join(GAME_TYPES)}|score>=module:function")
+    sys.path.insert(0, os.getcwd())
+    return target, getattr(importlib.import_module(module_name), function_name)
+
+
+def run_engine(state, game_type: str, num_teams: int, repeat: int, engine=None, score=None) -> dict:
+    """
+    Play one engine repeat times (fresh game each time).
+    Returns: {"result": outputs(), "engine_s", "teams_per_s", "score_s", "scores_per_s"}
+    """
+    engine = engine or getattr(state, f"_process_{game_type}_round")
+    rounds = make_rounds(game_type, num_teams)
+
+    times, game = [], None
+    for _ in range(repeat):
+        game, elapsed = play(engine, game_type, num_teams, rounds)
+        times.append(elapsed)
+    engine_s = statistics.median(times)
+    run = {"engine_s": engine_s, "teams_per_s": num_teams * ROUNDS / engine_s if engine_s else math.inf}
+
+    scores = None
+    if game_type == "build_country":
+        score = score or state.compute_build_country_score
+        teams = list(game["teams"].items())
+        score_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            scores = {name: score(team) for name, team in teams}
+            score_times.append(time.perf_counter() - start)
+        run["score_s"] = statistics.median(score_times)
+        run["scores_per_s"] = num_teams / run["score_s"] if run["score_s"] else math.inf
+
+    run["result"] = outputs(game, scores)
+    return run
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--game-types", nargs="+", default=list(GAME_TYPES), choices=list(GAME_TYPES))
+    parser.add_argument("--teams", nargs="+", type=int, default=list(TEAM_COUNTS), help="team counts to run")
+    parser.add_argument("--repeat", type=int, default=7, help="timed plays per case (median is reported)")
+    parser.add_argument("--update-golden", action="store_true", help="rewrite the golden files from this run")
+    parser.add_argument("--candidate", action="append", default=[], metavar="TARGET=module:function",
+                        help="faster engine to qualify; TARGET is a game type or 'score'")
+    parser.add_argument("--rel-tol", type=float, default=1e-9, help="allowed relative float difference")
+    parser.add_argument("--min-speedup", type=float, default=1.1,
+                        help="how much faster a candidate must be at the largest team count")
+    parser.add_argument("--json", default=None, metavar="PATH", help="also write the results as JSON")
+    args = parser.parse_args()
+
+    import shared_state as state
+
+    candidates = dict(_load_candidate(spec) for spec in args.candidate)
+    failures, report = [], {}
+
+    print(f"  {'case':<34}{'teams':>6}{'ms':>10}{'teams/s':>12}  check")
+    for game_type in args.game_types:
+        path = golden_path(game_type)
+        golden = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                golden = json.load(f)
+
+        updated = {}
+        for num_teams in args.teams:
+            run = run_engine(state, game_type, num_teams, args.repeat)
+            record = golden_record(run["result"])
+            updated[str(num_teams)] = record
+
+            expected = golden.get(str(num_teams))
+            if args.update_golden:
+                check = "written"
+            elif expected is None:
+                check = "no golden"
+                failures.append(f"{game_type}[{num_teams}]: no golden (run with --update-golden)")
+            else:
+                diffs = differences(expected, record, args.rel_tol)
+                check = "ok" if not diffs else "MISMATCH"
+                if diffs:
+                    failures.append(f"{game_type}[{num_teams}] differs from golden:\n      " + "\n      ".join(diffs))
+
+            name = f"_process_{game_type}_round"
+            print(f"  {name:<34}{num_teams:>6}{run['engine_s'] * 1000:>10.2f}{run['teams_per_s']:>12,.0f}  {check}")
+            case = {"engine_ms": run["engine_s"] * 1000, "teams_per_s": run["teams_per_s"], "check": check}
+            if "score_s" in run:
+                print(f"  {'compute_build_country_score':<34}{num_teams:>6}{run['score_s'] * 1000:>10.2f}"
+                      f"{run['scores_per_s']:>12,.0f}  {check}")
+                case.update(score_ms=run["score_s"] * 1000, scores_per_s=run["scores_per_s"])
+            report[f"{game_type}[{num_teams}]"] = case
+
+            # A candidate is compared with the scalar engine on every team of the same inputs
+            for target, fn in candidates.items():
+                if target != game_type and not (target == "score" and game_type == "build_country"):
+                    continue
+                fast = run_engine(state, game_type, num_teams, args.repeat,
+                                  engine=fn if target == game_type else None,
+                                  score=fn if target == "score" else None)
+                diffs = differences(run["result"], fast["result"], args.rel_tol)
+                key = "score_s" if target == "score" else "engine_s"
+                speedup = run[key] / fast[key] if fast[key] else math.inf
+                label = f"candidate {target} ({fn.__name__})"
+                print(f"  {label:<34}{num_teams:>6}{fast[key] * 1000:>10.2f}"
+                      f"{num_teams * (1 if target == 'score' else ROUNDS) / fast[key]:>12,.0f}"
+                      f"  {'equivalent' if not diffs else 'NOT EQUIVALENT'}, {speedup:.2f}x")
+                report[f"candidate {target}[{num_teams}]"] = {"equivalent": not diffs, "speedup": speedup}
+                if diffs:
+                    failures.append(f"candidate {target}[{num_teams}] differs from the scalar engine:\n      "
+                                    + "\n      ".join(diffs))
+                elif num_teams == max(args.teams) and speedup < args.min_speedup:
+                    failures.append(f"candidate {target}[{num_teams}]: {speedup:.2f}x is below "
+                                    f"--min-speedup {args.min_speedup}")
+
+        if args.update_golden:
+            os.makedirs(GOLDEN_DIR, exist_ok=True)
+            with open(path, "w") as f:
+                json.dump({**golden, **updated}, f, indent=1, sort_keys=True)
+                f.write("\n")
+            print(f"  wrote {os.path.relpath(path)}")
+
+    if args.json:
+        os.makedirs(os.path.dirname(os.path.abspath(args.json)), exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump({"params": {"teams": args.teams, "rounds": ROUNDS, "seed": SEED, "repeat": args.repeat},
+                       "results": report}, f, indent=2)
+
+    if failures:
+        print(f"\n{len(failures)} failure(s):")
+        for failure in failures:
+            print(f"  - {failure}")
+        return 1
+    print("\nAll engines match their golden outputs." if not candidates
+          else "\nAll engines match their golden outputs; candidates qualify.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""
+Import-time budget check
+
+Times, in fresh interpreters, what a process restart costs before it can
+serve anything:
+  - importing the headless modules (shared_state, batch_export, export_cache),
+    which must not load Streamlit or any heavy optional dependency;
+  - each page's top-level imports once Streamlit is loaded (what the first run
+    of a page pays), which must leave QR rendering, pyarrow, openpyxl and
+    pandas to the code paths that use them.
+Budgets are SHARED_STATE_IMPORT_BUDGET_MS and PAGE_IMPORT_BUDGET_MS in
+config.py. Exits with status 1 if a budget is exceeded or a deferred module
+gets imported; the slowest imports of a failing target are listed
+(python -X importtime).
+
+Usage:
+    python benchmarks/import_budget.py [--repeat 5]
+"""
+
+import argparse
+import ast
+import glob
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import config
+
+# Loaded only on the code paths that need them
+HEAVY = ("pandas", "numpy", "pyarrow", "openpyxl", "qrcode", "PIL")
+HEADLESS_FORBIDDEN = ("streamlit", "asyncio") + HEAVY
+PAGE_FORBIDDEN = ("streamlit_javascript", "warehouse", "qr_codes") + HEAVY
+
+HEADLESS_MODULES = ("shared_state", "batch_export", "export_cache")
+
+_PROBE = """
+import sys, time, json
+sys.path.insert(0, {root!r})
+{setup}
+before = set(sys.modules)
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+loaded = sorted({{name.split(".")[0] for name in set(sys.modules) - before}})
+print(json.dumps({{"ms": elapsed * 1000, "loaded": loaded}}))
+"""
+
+
+def page_imports(path: str) -> str:
+    """The page's module-level import statements (not those inside functions or branches)"""
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), path)
+    return "\n".join(ast.unparse(node) for node in tree.body if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def probe(code: str, setup: str = "", importtime: bool = False) -> dict:
+    """Run code in a fresh interpreter (after setup); returns {"ms", "loaded"} or the importtime report"""
+    script = _PROBE.format(root=ROOT, setup=setup, code=code)
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", script]
+    result = subprocess.run(command, cwd=ROOT, capture_output=True, text=True, timeout=120)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "probe failed")
+    if importtime:
+        return {"stderr": result.stderr}
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(code: str, setup: str = "", limit: int = 8) -> list:
+    """[(cumulative ms, module)] of the slowest imports made by code"""
+    report = probe(code, setup, importtime=True)["stderr"]
+    rows = []
+    for line in report.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1000, name.rstrip()))
+    # -X importtime also reports interpreter startup and setup's imports; keep only what came after them
+    baseline = probe("pass", setup, importtime=True)["stderr"]
+    already = {line.split("|")[-1].strip() for line in baseline.splitlines() if line.startswith("import time:")}
+    return sorted((row for row in rows if row[1].strip() not in already), reverse=True)[:limit]
+
+
+def check(name: str, code: str, setup: str, budget_ms: float, forbidden: tuple, repeat: int) -> dict:
+    probe(code, setup)  # warm up: compiles bytecode, fills the OS file cache
+    runs = [probe(code, setup) for _ in range(repeat)]
+    ms = statistics.median(run["ms"] for run in runs)
+    loaded = set(runs[0]["loaded"])
+    deferred = sorted(loaded & set(forbidden))
+
+    ok = ms <= budget_ms and not deferred
+    print(f"  {name:<30}{ms:>10.1f}{budget_ms:>10.0f}  {'ok' if ok else 'FAIL'}"
+          + (f"  imports {', '.join(deferred)}" if deferred else ""))
+    if not ok:
+        for cumulative, module in slowest_imports(code, setup):
+            print(f"      {cumulative:>8.1f} ms  {module}")
+    return {"name": name, "ms": ms, "budget_ms": budget_ms, "deferred_loaded": deferred, "ok": ok}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters per target (median is used)")
+    args = parser.parse_args()
+
+    print(f"  {'target':<30}{'ms':>10}{'budget':>10}")
+    results = []
+    for module in HEADLESS_MODULES:
+        results.append(check(f"import {module}", f"import {module}", "",
+                             config.SHARED_STATE_IMPORT_BUDGET_MS, HEADLESS_FORBIDDEN, args.repeat))
+
+    # Streamlit is already loaded when a page first runs, so only the page's own imports count
+    pages = [os.path.join(ROOT, "Home.py")] + sorted(glob.glob(os.path.join(ROOT, "pages", "*.py")))
+    for path in pages:
+        results.append(check(f"page {os.path.basename(path)}", page_imports(path), "import streamlit",
+                             config.PAGE_IMPORT_BUDGET_MS, PAGE_FORBIDDEN, args.repeat))
+
+    failed = [r["name"] for r in results if not r["ok"]]
+    if failed:
+        print(f"\n{len(failed)} target(s) over budget or importing deferred modules: {', '.join(failed)}")
+        return 1
+    print("\nAll imports within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
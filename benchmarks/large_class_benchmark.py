@@ -0,0 +1,152 @@
+"""
+Large-class latency benchmark
+
+Plays one LARGE_CLASS_MAX_TEAMS-team session per game type against a scratch
+data directory and checks team joins, team saves (inbox and direct) and
+advance_round against the budgets in config.py. Exits with status 1 if any budget is exceeded.
+
+Usage:
+    python benchmarks/large_class_benchmark.py [--teams 500] [--rounds 4] [--saves-per-round 25] [--backend memory]
+"""
+
+import argparse
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import decision_update
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _timed(fn, *args, **kwargs) -> float:
+    start = time.perf_counter()
+    fn(*args, **kwargs)
+    return (time.perf_counter() - start) * 1000.0
+
+
+def run_game(state, config, game_type: str, num_teams: int, num_rounds: int, saves_per_round: int) -> dict:
+    settings = {"num_rounds": num_rounds, "round_duration": 180, "auto_lock": True, "num_teams": num_teams, "large_class": True}
+    join_code = state.create_game_session(game_type, "Benchmark", settings)
+
+    codes_ms = _timed(state.generate_team_codes, join_code, num_teams)
+    team_codes = list(state.get_game_session(join_code)["team_codes"])
+
+    join_ms = [_timed(state.add_team_to_game, join_code, f"Team {i + 1}", code) for i, code in enumerate(team_codes)]
+
+    state.update_game_session(join_code, {"status": "running", "current_round": 0})
+    state.advance_round(join_code)
+
+    save_ms = []
+    inbox_ms = []
+    advance_ms = []
+    team_names = [f"Team {i + 1}" for i in range(num_teams)]
+
+    for round_num in range(1, num_rounds + 1):
+        sample = random.sample(team_names, min(2 * saves_per_round, num_teams))
+        # Team page path (inbox append) for half the sample, direct session writes for the rest
+        for team_name in sample[:saves_per_round]:
+            inbox_ms.append(_timed(state.submit_team_decision, join_code, team_name,
+                                   decision_update(game_type, round_num), round_num))
+        for team_name in sample[saves_per_round:]:
+            save_ms.append(_timed(state.update_team_data, join_code, team_name, decision_update(game_type, round_num)))
+        advance_ms.append(_timed(state.advance_round, join_code))
+
+    state.flush_state()  # memory backend: make sure the file size below is current
+    return {
+        "game_type": game_type,
+        "teams": num_teams,
+        "rounds": num_rounds,
+        "team_codes_ms": codes_ms,
+        "join_p95_ms": _percentile(join_ms, 95),
+        "join_mean_ms": statistics.mean(join_ms),
+        "inbox_p95_ms": _percentile(inbox_ms, 95),
+        "save_p95_ms": _percentile(save_ms, 95),
+        "save_mean_ms": statistics.mean(save_ms),
+        "advance_max_ms": max(advance_ms),
+        "advance_mean_ms": statistics.mean(advance_ms),
+        "state_file_bytes": os.path.getsize(state.GAMES_FILE),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--teams", type=int, default=None, help="teams per session (default: config.LARGE_CLASS_MAX_TEAMS)")
+    parser.add_argument("--rounds", type=int, default=4)
+    parser.add_argument("--saves-per-round", type=int, default=25,
+                        help="timed inbox saves and direct saves per round (others auto-submit)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--backend", choices=["file", "memory"], default=None,
+                        help="state backend (default: config.STATE_BACKEND)")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="econ_games_bench_") as data_dir:
+        os.environ["ECONOMICS_GAMES_DATA_DIR"] = data_dir
+        if args.backend:
+            os.environ["ECONOMICS_GAMES_STATE_BACKEND"] = args.backend
+
+        import config
+        import shared_state as state
+
+        num_teams = args.teams or config.LARGE_CLASS_MAX_TEAMS
+        budgets = {
+            "join_p95_ms": config.TEAM_JOIN_BUDGET_MS,
+            "inbox_p95_ms": config.TEAM_SAVE_BUDGET_MS,
+            "save_p95_ms": config.TEAM_SAVE_BUDGET_MS,
+            "advance_max_ms": config.ADVANCE_ROUND_BUDGET_MS,
+        }
+
+        failures = []
+        print(f"State backend: {state.STATE_BACKEND}")
+        print(f"{'game':<14}{'join p95':>10}{'inbox p95':>11}{'save p95':>10}{'advance max':>13}{'file MB':>9}")
+
+        for game_type in ("build_country", "beat_market", "crypto_crash"):
+            # One session per data directory, as in a live class
+            for code in state.get_all_game_sessions():
+                state.delete_game_session(code)
+            for name in os.listdir(data_dir):
+                path = os.path.join(data_dir, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.remove(path)
+
+            result = run_game(state, config, game_type, num_teams, args.rounds, args.saves_per_round)
+            print(
+                f"{game_type:<14}{result['join_p95_ms']:>9.1f} {result['inbox_p95_ms']:>10.1f} {result['save_p95_ms']:>9.1f} "
+                f"{result['advance_max_ms']:>12.1f} {result['state_file_bytes'] / 1e6:>8.2f}"
+            )
+
+            for key, budget in budgets.items():
+                if result[key] > budget:
+                    failures.append(f"{game_type}: {key} {result[key]:.1f} ms > budget {budget} ms")
+
+    print()
+    print(f"Budgets: join p95 <= {budgets['join_p95_ms']} ms, inbox/save p95 <= {budgets['save_p95_ms']} ms, "
+          f"advance_round <= {budgets['advance_max_ms']} ms ({num_teams} teams)")
+
+    if failures:
+        print("OVER BUDGET:")
+        for failure in failures:
+            print(f"  {failure}")
+        return 1
+
+    print("All operations within budget.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
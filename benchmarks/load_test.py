@@ -0,0 +1,333 @@
+"""
+End-of-round load generator
+
+Simulates a class against the shared_state API from several worker threads
+or processes, with the traffic shape of a live round:
+    join burst   - every team joins within --join-seconds
+    polling      - team pages, scoreboards and admin panels refresh on their
+                   intervals the whole time
+    save spike   - every team clicks "Yes, Save" in the last --spike-seconds
+    advance      - the admin advances the round
+Each worker runs its share of the actors one call at a time, like a Streamlit
+server thread, so slow calls delay the ones queued behind them ("lag").
+
+Reports p50/p95/p99 latency per operation, schedule lag, lost updates (saves
+that were acknowledged but aren't in the round history after the advance) and
+how the state files grow, for sizing a deployment.
+
+Usage:
+    python benchmarks/load_test.py [--teams 200] [--workers 8] [--mode threads|processes]
+                                   [--rounds 2] [--save-path inbox|direct] [--backend file|memory|server]
+"""
+
+import argparse
+import heapq
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from multiprocessing import get_context
+from multiprocessing.pool import ThreadPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from synthetic import decision_update
+
+_state = None
+
+
+def _shared_state():
+    global _state
+    if _state is None:
+        import shared_state
+        _state = shared_state
+    return _state
+
+
+# ============================================================================
+# WORKER
+# ============================================================================
+
+def _call(op: str, args: list, memo: dict):
+    """Run one operation; returns its result (for saves, whether it was acknowledged)"""
+    state = _shared_state()
+
+    if op == "join":
+        return state.add_team_to_game(*args)[0]
+    if op == "save_inbox":
+        return state.submit_team_decision(*args, if_unsaved=True)[0]
+    if op == "save_direct":
+        return state.update_team_data(*args) is None
+    if op == "team_poll":
+        return state.get_game_session(args[0])
+    if op == "scoreboard_poll":
+        version, game = state.get_game_session_if_changed(args[0], memo.get(args[1]))
+        memo[args[1]] = version
+        return game
+    if op == "admin_timer":
+        return state.check_round_timer(args[0])
+    if op == "admin_summary":
+        return state.get_session_summary(args[0])
+    raise ValueError(op)
+
+
+def warm_up(_) -> str:
+    """Import shared_state in a worker before the clock starts"""
+    return _shared_state().STATE_BACKEND
+
+
+def run_phase(spec: dict) -> dict:
+    """
+    Run one worker's share of a phase.
+    spec: start_at (wall clock), duration, one_offs [(offset, op, args, key)],
+    pollers [(op, args, interval)]
+    Returns: {"latency": {op: [ms]}, "lag": [ms], "acks": {key: bool}}
+    """
+    events = []
+    for offset, op, args, key in spec["one_offs"]:
+        events.append((spec["start_at"] + offset, op, args, key, None))
+    for op, args, interval in spec["pollers"]:
+        # Stagger pollers so they don't all fire on the same tick
+        first = spec["start_at"] + random.uniform(0, interval)
+        events.append((first, op, args, None, interval))
+    heapq.heapify(events)
+
+    end = spec["start_at"] + spec["duration"]
+    latency, lag, acks, memo = defaultdict(list), [], {}, {}
+
+    while events:
+        due, op, args, key, interval = heapq.heappop(events)
+        if interval is not None and due >= end:
+            continue
+
+        now = time.time()
+        if due > now:
+            time.sleep(due - now)
+        lag.append(max(0.0, time.time() - due) * 1000.0)
+
+        start = time.perf_counter()
+        result = _call(op, args, memo)
+        latency[op].append((time.perf_counter() - start) * 1000.0)
+
+        if key is not None:
+            acks[key] = bool(result)
+        if interval is not None:
+            heapq.heappush(events, (due + interval, op, args, key, interval))
+
+    return {"latency": dict(latency), "lag": lag, "acks": acks}
+
+
+# ============================================================================
+# COORDINATOR
+# ============================================================================
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))]
+
+
+def _file_sizes(state) -> dict:
+    state.flush_state()
+    inbox_bytes = 0
+    if os.path.isdir(state.INBOX_DIR):
+        inbox_bytes = sum(os.path.getsize(os.path.join(state.INBOX_DIR, name)) for name in os.listdir(state.INBOX_DIR))
+    return {
+        "games_bytes": os.path.getsize(state.GAMES_FILE),
+        "summaries_bytes": os.path.getsize(state.SUMMARY_FILE),
+        "inbox_bytes": inbox_bytes,
+    }
+
+
+def _pollers(join_code: str, team_names: list, scoreboards: int, admins: int, config) -> list:
+    """Every polling actor in the room: (op, args, interval)"""
+    pollers = [("team_poll", [join_code], config.TIMER_REFRESH_INTERVAL) for _ in team_names]
+    pollers += [("scoreboard_poll", [join_code, f"scoreboard {i}"], config.SCOREBOARD_REFRESH_INTERVAL)
+                for i in range(scoreboards)]
+    for _ in range(admins):
+        pollers.append(("admin_timer", [join_code], config.ADMIN_TIMER_REFRESH_INTERVAL))
+        pollers.append(("admin_summary", [join_code], config.ADMIN_READINESS_REFRESH_INTERVAL))
+    return pollers
+
+
+def _run_phase(pool, workers: int, duration: float, one_offs: list, pollers: list) -> dict:
+    """Split a phase's actors across the workers and merge what they measured"""
+    start_at = time.time() + 0.5
+    specs = [{"start_at": start_at, "duration": duration,
+              "one_offs": one_offs[w::workers], "pollers": pollers[w::workers]} for w in range(workers)]
+
+    merged = {"latency": defaultdict(list), "lag": [], "acks": {}}
+    for result in pool.map(run_phase, specs):
+        for op, samples in result["latency"].items():
+            merged["latency"][op].extend(samples)
+        merged["lag"].extend(result["lag"])
+        merged["acks"].update(result["acks"])
+    return merged
+
+
+def _lost_updates(game: dict, round_num: int, expected: dict, acks: dict) -> int:
+    """Acknowledged saves whose decision isn't what the round history recorded"""
+    lost = 0
+    for team_name, update in expected.items():
+        if not acks.get(team_name):
+            continue
+        wanted = update.get("decisions") or update.get("portfolio")
+        recorded = ((game["teams"].get(team_name, {}).get("round_history", {}) or {})
+                    .get(str(round_num), {}) or {}).get("decisions")
+        if recorded != wanted:
+            lost += 1
+    return lost
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--game-type", default="build_country", choices=["build_country", "beat_market", "crypto_crash"])
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--scoreboards", type=int, default=2, help="projected scoreboards polling")
+    parser.add_argument("--admins", type=int, default=1, help="admin panels polling")
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--workers", type=int, default=8, help="server threads/processes sharing the load")
+    parser.add_argument("--mode", choices=["threads", "processes"], default="threads")
+    parser.add_argument("--join-seconds", type=float, default=5.0)
+    parser.add_argument("--poll-seconds", type=float, default=5.0, help="quiet polling before the save spike")
+    parser.add_argument("--spike-seconds", type=float, default=5.0)
+    parser.add_argument("--save-path", choices=["inbox", "direct"], default="inbox",
+                        help="inbox = Team page path (submit_team_decision), direct = update_team_data")
+    parser.add_argument("--backend", choices=["file", "memory", "server"], default=None,
+                        help="state backend (default: config.STATE_BACKEND; memory only with --mode threads)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", default=None, help="also write the report to this JSON file")
+    args = parser.parse_args()
+
+    if args.backend == "memory" and args.mode == "processes":
+        parser.error("the memory backend is per process; use --mode threads or --backend server")
+
+    rng = random.Random(args.seed)
+
+    with tempfile.TemporaryDirectory(prefix="econ_games_load_") as data_dir:
+        os.environ["ECONOMICS_GAMES_DATA_DIR"] = data_dir
+        if args.backend:
+            os.environ["ECONOMICS_GAMES_STATE_BACKEND"] = args.backend
+
+        daemon = None
+        if args.backend == "server":
+            daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "state_server.py")],
+                                      stdout=subprocess.PIPE, text=True)
+            daemon.stdout.readline()  # "State server listening on ..."
+
+        import config
+        state = _shared_state()
+
+        pool = ThreadPool(args.workers) if args.mode == "threads" else get_context("spawn").Pool(args.workers)
+        try:
+            pool.map(warm_up, range(args.workers), chunksize=1)
+            report = _run(args, rng, state, config, pool)
+        finally:
+            pool.close()
+            pool.join()
+            if daemon is not None:
+                daemon.terminate()
+                daemon.wait(timeout=30)
+
+    _print_report(args, report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {args.json}")
+
+    return 0 if report["lost_updates"] == 0 else 1
+
+
+def _run(args, rng, state, config, pool) -> dict:
+    settings = {"num_rounds": args.rounds, "round_duration": int(args.poll_seconds + args.spike_seconds),
+                "auto_lock": True, "num_teams": args.teams, "large_class": args.teams > config.MAX_TEAMS}
+    join_code = state.create_game_session(args.game_type, "Load test", settings)
+    state.generate_team_codes(join_code, args.teams)
+    codes = sorted(state.get_game_session(join_code)["team_codes"].items(), key=lambda x: x[1]["team_slot"])
+    team_names = [f"Team {info['team_slot']}" for _, info in codes]
+
+    latency, lag = defaultdict(list), []
+    sizes = {"start": _file_sizes(state)}
+    lost, saves_acked = 0, 0
+    pollers_without_teams = _pollers(join_code, [], args.scoreboards, args.admins, config)
+    pollers = _pollers(join_code, team_names, args.scoreboards, args.admins, config)
+
+    def absorb(phase: dict):
+        for op, samples in phase["latency"].items():
+            latency[op].extend(samples)
+        lag.extend(phase["lag"])
+
+    # Join burst (teams can't poll before they've joined)
+    joins = [(rng.uniform(0, args.join_seconds), "join", [join_code, name, code], name)
+             for (code, _), name in zip(codes, team_names)]
+    absorb(_run_phase(pool, args.workers, args.join_seconds, joins, pollers_without_teams))
+    sizes["after_join"] = _file_sizes(state)
+
+    state.update_game_session(join_code, {"status": "running", "current_round": 0})
+    state.advance_round(join_code)
+
+    for round_num in range(1, args.rounds + 1):
+        state.start_round_timer(join_code, int(args.poll_seconds + args.spike_seconds))
+
+        expected = {name: decision_update(args.game_type, round_num, rng) for name in team_names}
+        if args.save_path == "inbox":
+            saves = [(args.poll_seconds + rng.uniform(0, args.spike_seconds), "save_inbox",
+                      [join_code, name, expected[name], round_num], name) for name in team_names]
+        else:
+            saves = [(args.poll_seconds + rng.uniform(0, args.spike_seconds), "save_direct",
+                      [join_code, name, expected[name]], name) for name in team_names]
+
+        phase = _run_phase(pool, args.workers, args.poll_seconds + args.spike_seconds, saves, pollers)
+        absorb(phase)
+        sizes[f"round_{round_num}_saved"] = _file_sizes(state)
+
+        start = time.perf_counter()
+        state.advance_round(join_code)
+        latency["advance_round"].append((time.perf_counter() - start) * 1000.0)
+        sizes[f"round_{round_num}_advanced"] = _file_sizes(state)
+
+        saves_acked += sum(phase["acks"].values())
+        lost += _lost_updates(state.get_game_session(join_code), round_num, expected, phase["acks"])
+
+    return {
+        "params": vars(args),
+        "backend": state.STATE_BACKEND,
+        "operations": {
+            op: {"count": len(s), "p50_ms": _percentile(s, 50), "p95_ms": _percentile(s, 95),
+                 "p99_ms": _percentile(s, 99), "max_ms": max(s)}
+            for op, s in sorted(latency.items())
+        },
+        "lag_ms": {"p50": _percentile(lag, 50), "p95": _percentile(lag, 95), "p99": _percentile(lag, 99),
+                   "max": max(lag)},
+        "saves_acknowledged": saves_acked,
+        "saves_expected": args.teams * args.rounds,
+        "lost_updates": lost,
+        "file_sizes": sizes,
+    }
+
+
+def _print_report(args, report: dict):
+    print(f"{args.teams} teams, {args.scoreboards} scoreboards, {args.admins} admins, {args.rounds} rounds; "
+          f"{args.workers} {args.mode}, {report['backend']} backend, saves via {args.save_path}\n")
+
+    print(f"{'operation':<18}{'count':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for op, r in report["operations"].items():
+        print(f"{op:<18}{r['count']:>8}{r['p50_ms']:>9.1f}{r['p95_ms']:>9.1f}{r['p99_ms']:>9.1f}{r['max_ms']:>9.1f}")
+
+    lag = report["lag_ms"]
+    print(f"\nSchedule lag (waiting behind other calls): p50 {lag['p50']:.1f} ms, p95 {lag['p95']:.1f} ms, "
+          f"p99 {lag['p99']:.1f} ms, max {lag['max']:.1f} ms")
+    print(f"Saves acknowledged: {report['saves_acknowledged']}/{report['saves_expected']}, "
+          f"lost updates: {report['lost_updates']}")
+
+    print(f"\n{'state files (KB)':<22}{'games':>10}{'summaries':>11}{'inbox':>9}")
+    for phase, s in report["file_sizes"].items():
+        print(f"{phase:<22}{s['games_bytes'] / 1024:>10.1f}{s['summaries_bytes'] / 1024:>11.1f}{s['inbox_bytes'] / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,158 @@
+"""
+Multi-worker state benchmark: file backend vs the local state daemon
+
+Starts state_server.py on a scratch data directory, then runs several worker
+processes that join teams and save decisions into one session at the same
+time, as several Streamlit workers behind a reverse proxy would. The same load
+is run against the file backend for comparison. Checks that no write is lost
+(every team present, one revision per write) and that a subscriber saw the
+session move.
+
+Usage:
+    python benchmarks/state_server_benchmark.py [--workers 4] [--teams 200] [--saves 5] [--tcp]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from multiprocessing import get_context
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def _percentile(samples: list, pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def _worker(env: dict, join_code: str, team_names: list, saves: int) -> list:
+    """One 'Streamlit worker': joins its teams, then saves decisions for each. Returns per-call ms."""
+    os.environ.update(env)
+    sys.path.insert(0, ROOT)
+    import shared_state as state
+
+    timings = []
+    for team_name in team_names:
+        start = time.perf_counter()
+        state.add_team_to_game(join_code, team_name)
+        timings.append((time.perf_counter() - start) * 1000)
+
+    for i in range(saves):
+        for team_name in team_names:
+            start = time.perf_counter()
+            state.update_team_data(join_code, team_name, {"tax_rate": 20 + i, "decision_saved_round": 1})
+            timings.append((time.perf_counter() - start) * 1000)
+
+    return timings
+
+
+def _subscriber(join_code: str, address: str, seen: list, stop: threading.Event):
+    from state_server import subscribe_revisions
+
+    async def listen():
+        async for event in subscribe_revisions(join_code, None, address):
+            seen.append(event["revision"])
+            if stop.is_set():
+                return
+
+    try:
+        asyncio.run(asyncio.wait_for(listen(), timeout=600))
+    except asyncio.TimeoutError:
+        pass
+
+
+def run(state, data_dir: str, backend: str, workers: int, teams: int, saves: int, address: str) -> dict:
+    env = {"ECONOMICS_GAMES_DATA_DIR": data_dir, "ECONOMICS_GAMES_STATE_BACKEND": backend,
+           "ECONOMICS_GAMES_STATE_SERVER": address}
+
+    daemon = None
+    if backend == "server":
+        daemon = subprocess.Popen([sys.executable, os.path.join(ROOT, "state_server.py"), "--address", address],
+                                  env={**os.environ, **env}, stdout=subprocess.PIPE, text=True)
+        daemon.stdout.readline()  # "State server listening on ..."
+
+    state.STATE_BACKEND = backend
+    try:
+        join_code = state.create_game_session("build_country", "Benchmark", {"num_rounds": 3})
+        state.update_game_session(join_code, {"status": "running", "current_round": 1})
+        start_revision = state.get_revision(join_code)
+
+        seen, stop = [], threading.Event()
+        listener = None
+        if backend == "server":
+            listener = threading.Thread(target=_subscriber, args=(join_code, address, seen, stop), daemon=True)
+            listener.start()
+            time.sleep(0.2)
+
+        names = [f"Team {i + 1}" for i in range(teams)]
+        chunks = [names[w::workers] for w in range(workers)]
+
+        start = time.perf_counter()
+        with get_context("spawn").Pool(workers) as pool:
+            results = pool.starmap(_worker, [(env, join_code, chunk, saves) for chunk in chunks])
+        wall = time.perf_counter() - start
+
+        game = state.get_game_session(join_code)
+        writes = teams * (1 + saves)
+        timings = [ms for worker_timings in results for ms in worker_timings]
+
+        if listener is not None:
+            stop.set()
+            state.update_game_session(join_code, {"round_locked": True})  # wake the subscriber
+            listener.join(timeout=5)
+
+        return {
+            "backend": backend,
+            "writes": writes,
+            "wall_s": wall,
+            "writes_per_s": writes / wall,
+            "p50_ms": statistics.median(timings),
+            "p95_ms": _percentile(timings, 95),
+            "teams_ok": len(game["teams"]) == teams,
+            "revisions_ok": game["revision"] - start_revision == writes,
+            "events_seen": len(seen),
+        }
+    finally:
+        if daemon is not None:
+            daemon.terminate()
+            daemon.wait(timeout=30)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--saves", type=int, default=5, help="decision saves per team")
+    parser.add_argument("--tcp", action="store_true", help="use TCP on localhost instead of a Unix socket")
+    args = parser.parse_args()
+
+    print(f"{args.workers} workers, {args.teams} teams, {args.saves} saves per team")
+    print(f"{'backend':<8}{'writes':>8}{'wall s':>8}{'writes/s':>10}{'p50 ms':>8}{'p95 ms':>8}  consistent  events")
+
+    ok = True
+    with tempfile.TemporaryDirectory(prefix="econ_games_server_bench_") as data_dir:
+        os.environ["ECONOMICS_GAMES_DATA_DIR"] = data_dir
+        address = "127.0.0.1:8765" if args.tcp else "unix:" + os.path.join(data_dir, "state.sock")
+        os.environ["ECONOMICS_GAMES_STATE_SERVER"] = address
+
+        import shared_state as state
+
+        for backend in ("file", "server"):
+            r = run(state, data_dir, backend, args.workers, args.teams, args.saves, address)
+            consistent = r["teams_ok"] and r["revisions_ok"]
+            ok = ok and consistent and (backend != "server" or r["events_seen"] > 0)
+            print(f"{r['backend']:<8}{r['writes']:>8}{r['wall_s']:>8.2f}{r['writes_per_s']:>10.0f}"
+                  f"{r['p50_ms']:>8.2f}{r['p95_ms']:>8.2f}  {'yes' if consistent else 'NO':<10}  {r['events_seen'] or '-'}")
+
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
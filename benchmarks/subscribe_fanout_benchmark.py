@@ -0,0 +1,86 @@
+"""
+Change-subscription fan-out benchmark
+
+Opens many concurrent shared_state.subscribe() iterators on one session, makes
+a series of team saves, and reports how long each event took to reach every
+subscriber. All subscribers share one watcher, so the state is read once per
+change however many subscribers there are.
+
+Usage:
+    python benchmarks/subscribe_fanout_benchmark.py [--subscribers 500] [--changes 20] [--backend memory]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+async def run(state, subscribers: int, changes: int) -> dict:
+    join_code = state.create_game_session("build_country", "Benchmark", {"num_rounds": 3})
+    for i in range(changes):
+        state.add_team_to_game(join_code, f"Team {i + 1}")
+    state.update_game_session(join_code, {"status": "running", "current_round": 1})
+
+    received = [dict() for _ in range(subscribers)]  # subscriber -> {team: arrival time}
+
+    async def consume(seen: dict):
+        async for event in state.subscribe(join_code):
+            if event["type"] == "decision_saved":
+                seen[event["team"]] = time.perf_counter()
+                if len(seen) == changes:
+                    return
+
+    tasks = [asyncio.ensure_future(consume(seen)) for seen in received]
+    await asyncio.sleep(1.5)  # let the watcher take its first snapshot
+
+    sent = {}
+    for i in range(changes):
+        team_name = f"Team {i + 1}"
+        sent[team_name] = time.perf_counter()
+        await asyncio.to_thread(state.update_team_data, join_code, team_name, {"decision_saved_round": 1})
+        await asyncio.sleep(0.05)
+
+    await asyncio.wait_for(asyncio.gather(*tasks), timeout=60)
+
+    latencies = [(seen[team] - sent[team]) * 1000 for seen in received for team in seen]
+    return {
+        "events": len(latencies),
+        "expected": subscribers * changes,
+        "p50_ms": statistics.median(latencies),
+        "p95_ms": sorted(latencies)[int(0.95 * (len(latencies) - 1))],
+        "max_ms": max(latencies),
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=500)
+    parser.add_argument("--changes", type=int, default=20, help="team saves to deliver")
+    parser.add_argument("--backend", choices=["file", "memory"], default="memory")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="econ_games_subscribe_bench_") as data_dir:
+        os.environ["ECONOMICS_GAMES_DATA_DIR"] = data_dir
+        os.environ["ECONOMICS_GAMES_STATE_BACKEND"] = args.backend
+
+        import config
+        import shared_state as state
+
+        r = asyncio.run(run(state, args.subscribers, args.changes))
+
+    print(f"{args.subscribers} subscribers, {args.changes} changes, {args.backend} backend "
+          f"(poll interval {config.SUBSCRIBE_POLL_INTERVAL_SECONDS}s)")
+    print(f"delivered {r['events']}/{r['expected']} events; latency p50 {r['p50_ms']:.0f} ms, "
+          f"p95 {r['p95_ms']:.0f} ms, max {r['max_ms']:.0f} ms")
+    return 0 if r["events"] == r["expected"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
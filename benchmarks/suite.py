@@ -0,0 +1,231 @@
+"""
+Storage and engine benchmark suite
+
+Generates a synthetic data directory (sessions x teams x rounds across the game
+types, see synthetic.py), times the storage layer, the session API, the round
+engine and the Excel export against it, and writes the results as JSON.
+With --compare, each case's median is checked against a stored baseline and
+the run fails if anything got slower than the tolerance allows.
+
+Usage:
+    python benchmarks/suite.py                                   # run, write benchmarks/results/latest.json
+    python benchmarks/suite.py --save-baseline                   # ... and store it as benchmarks/baseline.json
+    python benchmarks/suite.py --compare                         # run and compare with benchmarks/baseline.json
+    python benchmarks/suite.py --sessions 9 --teams 100 --rounds 5 --game-types build_country
+"""
+
+import argparse
+import json
+import os
+import pickle
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+from synthetic import GAME_TYPES, decision_update, generate_session, generate_state
+
+DEFAULT_OUT = os.path.join(BENCH_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+
+def measure(fn, repeat: int, setup=None) -> dict:
+    """Time fn(setup()) repeat times (setup runs outside the timer)"""
+    samples = []
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        start = time.perf_counter()
+        fn(arg) if setup else fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+
+    ordered = sorted(samples)
+    return {
+        "n": repeat,
+        "min_ms": ordered[0],
+        "median_ms": statistics.median(ordered),
+        "p95_ms": ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))],
+        "mean_ms": statistics.mean(ordered),
+    }
+
+
+def _copy(obj):
+    return pickle.loads(pickle.dumps(obj, pickle.HIGHEST_PROTOCOL))
+
+
+def run_suite(state, sessions: list, teams: int, rounds: int, repeat: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    games = state.get_all_game_sessions()
+    by_type = {}
+    for join_code, game_type in sessions:
+        by_type.setdefault(game_type, join_code)
+
+    results = {}
+
+    def case(name: str, fn, setup=None, n: int = repeat):
+        results[name] = measure(fn, n, setup)
+        r = results[name]
+        print(f"  {name:<44}{r['median_ms']:>10.3f}{r['p95_ms']:>10.3f}")
+
+    print(f"  {'case':<44}{'median ms':>10}{'p95 ms':>10}")
+
+    # Storage layer
+    scratch = os.path.join(state.DATA_DIR, "bench_save.json")
+    case("storage.load_json", lambda: state.load_json(state.GAMES_FILE))
+    case("storage.save_json", lambda: state.save_json(scratch, games))
+    os.remove(scratch)
+
+    # Session API
+    codes = [code for code, _ in sessions]
+    case("api.get_game_session", lambda: state.get_game_session(rng.choice(codes)))
+
+    def team_save():
+        join_code, game_type = rng.choice(sessions)
+        state.update_team_data(join_code, f"Team {rng.randint(1, teams)}",
+                               decision_update(game_type, games[join_code]["current_round"], rng))
+    case("api.update_team_data", team_save)
+
+    # A session without team codes, so any team name can join
+    open_code = state.create_game_session("build_country", "Bench", {"num_rounds": rounds})
+    joins = iter(range(10 ** 9))
+    case("api.add_team_to_game", lambda: state.add_team_to_game(open_code, f"Bench {next(joins)}"))
+
+    # Round engine and end-to-end advance, per game type
+    for game_type, join_code in sorted(by_type.items()):
+        fixture = _round_fixture(games[join_code], rng)
+        process = getattr(state, f"_process_{game_type}_round")
+        case(f"engine._process_{game_type}_round", process, setup=lambda f=fixture: _copy(f))
+
+        advance_code = generate_session(state, game_type, teams, 0, rng)
+        case(f"api.advance_round[{game_type}]", lambda c=advance_code: state.advance_round(c),
+             n=max(3, repeat // 5))
+
+        case(f"export.excel[{game_type}]", lambda c=join_code: state.export_game_results_to_excel(c),
+             n=max(3, repeat // 10))
+
+    if "build_country" in by_type:
+        team_data = next(iter(games[by_type["build_country"]]["teams"].values()))
+        case("engine.compute_build_country_score", lambda: state.compute_build_country_score(team_data),
+             n=repeat * 20)
+
+    return results
+
+
+def _round_fixture(game: dict, rng) -> dict:
+    """Copy of game with a saved decision from every team for the current round"""
+    fixture = _copy(game)
+    round_num = fixture.get("current_round", 1)
+    fixture.setdefault("game_state", {}).pop("processed_round", None)
+    for team in fixture["teams"].values():
+        team.update(decision_update(fixture["game_type"], round_num, rng))
+    return fixture
+
+
+def compare(current: dict, baseline: dict, tolerance: float, min_delta_ms: float) -> list:
+    """Print a comparison table. Returns the names of cases that regressed."""
+    if current["meta"]["params"] != baseline["meta"]["params"]:
+        print(f"note: baseline was run with {baseline['meta']['params']}, this run with {current['meta']['params']}")
+
+    regressions = []
+    print(f"\n  {'case':<44}{'baseline':>10}{'now':>10}{'change':>9}")
+    for name, r in current["results"].items():
+        b = baseline["results"].get(name)
+        if b is None:
+            print(f"  {name:<44}{'-':>10}{r['median_ms']:>10.3f}{'new':>9}")
+            continue
+
+        ratio = r["median_ms"] / b["median_ms"] if b["median_ms"] else 1.0
+        slower = ratio > 1 + tolerance and r["median_ms"] - b["median_ms"] > min_delta_ms
+        if slower:
+            regressions.append(name)
+        print(f"  {name:<44}{b['median_ms']:>10.3f}{r['median_ms']:>10.3f}{(ratio - 1) * 100:>+8.0f}%"
+              f"{'  REGRESSION' if slower else ''}")
+
+    for name in baseline["results"].keys() - current["results"].keys():
+        print(f"  {name:<44}{baseline['results'][name]['median_ms']:>10.3f}{'-':>10}{'gone':>9}")
+
+    return regressions
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                              text=True, timeout=10).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=6)
+    parser.add_argument("--teams", type=int, default=40, help="teams per session")
+    parser.add_argument("--rounds", type=int, default=4, help="rounds played per session")
+    parser.add_argument("--game-types", nargs="+", default=list(GAME_TYPES), choices=list(GAME_TYPES))
+    parser.add_argument("--repeat", type=int, default=30, help="timed runs per case (fewer for slow cases)")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--out", default=DEFAULT_OUT, help="results JSON path")
+    parser.add_argument("--compare", nargs="?", const=DEFAULT_BASELINE, default=None, metavar="BASELINE",
+                        help="compare with a baseline JSON (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", nargs="?", const=DEFAULT_BASELINE, default=None, metavar="PATH",
+                        help="also store the results as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown of a median (0.25 = 25%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5, help="ignore slowdowns smaller than this")
+    args = parser.parse_args()
+
+    params = {"sessions": args.sessions, "teams": args.teams, "rounds": args.rounds,
+              "game_types": args.game_types, "repeat": args.repeat, "seed": args.seed}
+
+    with tempfile.TemporaryDirectory(prefix="econ_games_suite_") as data_dir:
+        os.environ["ECONOMICS_GAMES_DATA_DIR"] = data_dir
+        import shared_state as state
+
+        print(f"Generating {args.sessions} sessions x {args.teams} teams x {args.rounds} rounds ...")
+        start = time.perf_counter()
+        sessions = generate_state(state, args.sessions, args.teams, args.rounds, args.game_types, args.seed)
+        state_bytes = os.path.getsize(state.GAMES_FILE)
+        print(f"  {time.perf_counter() - start:.1f}s, state file {state_bytes / 1e6:.2f} MB\n")
+
+        results = run_suite(state, sessions, args.teams, args.rounds, args.repeat, args.seed)
+        backend = state.STATE_BACKEND
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "backend": backend,
+            "state_file_bytes": state_bytes,
+            "params": params,
+        },
+        "results": results,
+    }
+
+    for path in filter(None, [args.out, args.save_baseline]):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nWrote {path}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than baseline by more than {args.tolerance:.0%}: "
+                  f"{', '.join(regressions)}")
+            return 1
+        print("\nNo regressions against baseline.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Synthetic game states for the benchmarks and load tests
+
+Sessions are built through the shared_state API (create, team codes, joins,
+decisions, advance_round), so their documents have the same shape and size
+as real games.
+"""
+
+import random
+
+GAME_TYPES = ("build_country", "beat_market", "crypto_crash")
+
+
+def decision_update(game_type: str, round_num: int, rng=random) -> dict:
+    """team_data updates for one saved decision, as the Team page writes them"""
+    if game_type == "build_country":
+        return {
+            "decisions": {
+                "tax_rate": rng.choice(range(10, 55, 5)),
+                "education_spending": rng.choice(range(10, 55, 5)),
+                "infrastructure_spending": rng.choice(range(10, 55, 5)),
+                "climate_policy": rng.choice(["Weak", "Moderate", "Strong"]),
+            },
+            "decision_saved_round": round_num,
+        }
+    if game_type == "beat_market":
+        cash = rng.choice(range(0, 45, 5))
+        shares = rng.choice(range(0, 100 - cash, 5))
+        crypto = rng.choice(range(0, 100 - cash - shares + 1, 5))
+        return {
+            "portfolio": {"cash_pct": cash, "shares_pct": shares, "crypto_pct": crypto,
+                          "bonds_pct": 100 - cash - shares - crypto},
+            "decision_saved_round": round_num,
+        }
+    btc = rng.choice(range(0, 65, 5))
+    eth = rng.choice(range(0, 100 - btc, 5))
+    doge = rng.choice(range(0, 100 - btc - eth + 1, 5))
+    return {
+        "decisions": {
+            "allocations": {"btc": btc, "eth": eth, "doge": doge, "stable": 100 - btc - eth - doge},
+            "leverage": rng.randint(1, 5),
+        },
+        "decision_saved_round": round_num,
+    }
+
+
+def generate_session(state, game_type: str, num_teams: int, num_rounds: int, rng=random,
+                     save_share: float = 0.8) -> str:
+    """
+    Create one session with num_teams joined teams and num_rounds played rounds
+    (save_share of the teams save each round, the rest are auto-submitted).
+    Returns: join code
+    """
+    settings = {"num_rounds": num_rounds, "round_duration": 180, "auto_lock": True,
+                "num_teams": num_teams, "large_class": num_teams > 8}
+    join_code = state.create_game_session(game_type, "Synthetic", settings)
+    state.generate_team_codes(join_code, num_teams)
+
+    team_codes = sorted(state.get_game_session(join_code)["team_codes"].items(), key=lambda x: x[1]["team_slot"])
+    for code, info in team_codes:
+        state.add_team_to_game(join_code, f"Team {info['team_slot']}", code)
+
+    state.update_game_session(join_code, {"status": "running", "current_round": 0})
+    state.advance_round(join_code)
+
+    team_names = [f"Team {info['team_slot']}" for _, info in team_codes]
+    for round_num in range(1, num_rounds + 1):
+        for team_name in team_names:
+            if rng.random() < save_share:
+                state.update_team_data(join_code, team_name, decision_update(game_type, round_num, rng))
+        state.advance_round(join_code)
+
+    return join_code
+
+
+def generate_state(state, sessions: int, teams: int, rounds: int, game_types=GAME_TYPES, seed: int = 7) -> list:
+    """
+    Fill the current data directory with sessions x teams x rounds synthetic
+    games, cycling through game_types. Deterministic for a given seed (the game
+    engine draws from the global random module, so it is seeded too).
+    Returns: [(join_code, game_type)]
+    """
+    rng = random.Random(seed)
+    random.seed(seed)
+
+    created = []
+    for i in range(sessions):
+        game_type = game_types[i % len(game_types)]
+        created.append((generate_session(state, game_type, teams, rounds, rng), game_type))
+    return created
@@ -36,6 +36,38 @@ MAX_TEAMS = 8
 # Minimum number of teams to start game
 MIN_TEAMS = 1
 
+# ============================================================================
+# LARGE CLASS MODE (lecture halls)
+# ============================================================================
+
+# Maximum number of teams when "Large class mode" is ticked on game creation
+LARGE_CLASS_MAX_TEAMS = 500
+
+# Above this many teams, pages switch to compact views (top-N scoreboard,
+# percentile ranks, searchable team lists) even without large class mode
+LARGE_CLASS_THRESHOLD = 12
+
+# Large-class scoreboard: always show the top N, then rotate through the
+# remaining ranks one page at a time
+SCOREBOARD_TOP_N = 10
+SCOREBOARD_PAGE_SIZE = 20
+SCOREBOARD_PAGE_ROTATE_SECONDS = 9
+
+# Max teams listed at once in the Admin team list / QR tab in large classes
+ADMIN_TEAM_LIST_LIMIT = 20
+
+# Latency budgets (milliseconds) for one LARGE_CLASS_MAX_TEAMS-team session,
+# enforced by benchmarks/large_class_benchmark.py
+ADVANCE_ROUND_BUDGET_MS = 1000
+TEAM_SAVE_BUDGET_MS = 150
+TEAM_JOIN_BUDGET_MS = 150
+
+# Import-time budgets (milliseconds) for restarts, enforced by
+# benchmarks/import_budget.py: importing shared_state and the other headless
+# modules (no Streamlit), and a page's own top-level imports on its first run
+SHARED_STATE_IMPORT_BUDGET_MS = 100
+PAGE_IMPORT_BUDGET_MS = 150
+
 # ============================================================================
 # DATA STORAGE SETTINGS
 # ============================================================================
@@ -46,6 +78,93 @@ DATA_DIRECTORY = "/tmp/economics_games_data"
 # How long to keep old game sessions (in hours)
 SESSION_CLEANUP_HOURS = 24
 
+# Analytics warehouse (partitioned Parquet, see warehouse.py). Finished games
+# are archived there when they finish and before cleanup removes them.
+WAREHOUSE_DIRECTORY = None  # None = <DATA_DIRECTORY>/warehouse
+ARCHIVE_ON_FINISH = True
+
+# State backend:
+#   "file"   - every write is saved to disk before it returns (default)
+#   "memory" - state lives in the server process and dirty files are flushed
+#              to disk in the background every STATE_FLUSH_INTERVAL_SECONDS
+#              (round advances, game start/finish and deletes flush at once).
+#              Only for a single server process; restarts recover from the
+#              last flush.
+#   "server" - several Streamlit workers forward their state calls to the
+#              local state daemon (python state_server.py), which keeps the
+#              state in memory as above
+STATE_BACKEND = "file"
+STATE_FLUSH_INTERVAL_SECONDS = 1.0
+
+# State daemon address: "unix:/path/to.sock" or "host:port"
+# (None = Unix socket <DATA_DIRECTORY>/state.sock)
+STATE_SERVER_ADDRESS = None
+STATE_SERVER_POOL_SIZE = 8
+STATE_SERVER_TIMEOUT_SECONDS = 30
+
+# Change subscriptions (shared_state.subscribe): one watcher per session checks
+# for changes this often with the file/memory backends (the state server pushes
+# them instead). A subscriber that falls this many events behind gets a single
+# "resync" event instead.
+SUBSCRIBE_POLL_INTERVAL_SECONDS = 0.5
+SUBSCRIBER_QUEUE_SIZE = 256
+
+# Read-only viewers (the Scoreboard) share one parsed copy of each session per
+# process (shared_state.get_game_session_cached), reloaded when its version
+# moves; at most this many sessions are kept
+SESSION_CACHE_MAX_ENTRIES = 16
+
+# ============================================================================
+# MONITORING SETTINGS
+# ============================================================================
+
+# Count calls, time, file bytes and JSON parse time of the state functions per
+# function and session (see instrumentation.py). Cheap, but off unless needed;
+# ECONOMICS_GAMES_INSTRUMENTATION=1 turns it on without editing this file.
+INSTRUMENTATION_ENABLED = False
+
+# Operations page (pages/4_Operations.py, admin password): how often it
+# refreshes, how recently a browser must have rerun a page to count as an
+# active viewer, which state calls count as slow (and how many are kept), and
+# how often a session's size in the state file is re-measured
+OPERATIONS_REFRESH_INTERVAL = 2
+OPERATIONS_ACTIVE_WINDOW_SECONDS = 30
+SLOW_CALL_MS = 100
+SLOW_CALL_LOG_SIZE = 200
+SESSION_SIZE_SAMPLE_SECONDS = 30
+
+# Slow operation log (with instrumentation on): every page run gets a trace ID,
+# and a run taking SLOW_RERUN_MS or more, or with a state call of SLOW_CALL_MS
+# or more, is written with its state calls and their timings as one JSON line
+# to SLOW_LOG_FILE (None = <DATA_DIRECTORY>/slow_operations.jsonl; the state
+# daemon uses slow_operations.state_server.jsonl), rotated at SLOW_LOG_MAX_BYTES
+# keeping SLOW_LOG_BACKUPS old files. ECONOMICS_GAMES_SLOW_LOG overrides the
+# file: with several workers give each its own.
+SLOW_RERUN_MS = 1000
+SLOW_LOG_FILE = None
+SLOW_LOG_MAX_BYTES = 5_000_000
+SLOW_LOG_BACKUPS = 3
+
+# Prometheus metrics (metrics_exporter.py): serve /metrics on this local port
+# from a background thread of the Streamlit process (None = off; turns
+# instrumentation on). ECONOMICS_GAMES_METRICS_PORT overrides. Every process
+# exports its own counters: with several workers give each its own port, and
+# start the state daemon with --metrics-port for the state work done there.
+METRICS_PORT = None
+METRICS_BIND_ADDRESS = "127.0.0.1"
+
+# Page profiling (profiling.py): profile 1 in PROFILING_SAMPLE_EVERY page runs
+# with cProfile and write .prof + collapsed-stack files (flame graphs) to
+# PROFILING_DIRECTORY (None = <DATA_DIRECTORY>/profiles), keeping the newest
+# PROFILING_KEEP. An admin can profile a single run with ?profile=1 in the URL
+# even when this is off. Only one run is profiled at a time; one that never
+# finished stops blocking others after PROFILING_MAX_SECONDS.
+PROFILING_ENABLED = False
+PROFILING_SAMPLE_EVERY = 50
+PROFILING_DIRECTORY = None
+PROFILING_KEEP = 200
+PROFILING_MAX_SECONDS = 60
+
 # ============================================================================
 # ADVANCED SETTINGS (Don't change unless you know what you're doing)
 # ============================================================================
@@ -58,3 +177,28 @@ TIMER_REFRESH_INTERVAL = 3
 
 # Scoreboard auto-refresh interval (seconds)
 SCOREBOARD_REFRESH_INTERVAL = 3
+
+# Admin page fragment refresh intervals (seconds). Only the timer and the
+# team-readiness panels rerun on these intervals; the rest of the control
+# panel reruns on admin interaction.
+ADMIN_TIMER_REFRESH_INTERVAL = 1
+ADMIN_READINESS_REFRESH_INTERVAL = 3
+
+# QR codes: how many rendered codes to keep in memory (LRU), how many
+# missing codes a bulk team-code sheet needs before rendering in a process pool,
+# and how many A4 pages of a PDF sheet are held in memory before being written
+QR_CACHE_MAX_ENTRIES = 512
+QR_BULK_PROCESS_THRESHOLD = 24
+QR_BULK_MAX_WORKERS = None  # None = one worker per CPU
+QR_PDF_PAGES_PER_WRITE = 8
+
+# Excel export: workbooks are built in a spooled temp file that moves from
+# memory to disk once it grows past this many bytes
+EXPORT_SPOOL_MAX_BYTES = 8 * 1024 * 1024
+
+# Exports are built in background worker threads and cached per
+# (session, state revision, format); the Admin download button serves the
+# cached file. Optionally build the Excel report as soon as a game finishes.
+EXPORT_MAX_WORKERS = 2
+EXPORT_CACHE_MAX_ENTRIES = 32
+PREBUILD_EXPORT_ON_FINISH = True
@@ -0,0 +1,119 @@
+"""
+Background-built, version-cached game result exports
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import config
+import shared_state as state
+
+# (join_code, version, fmt) -> {"status", "progress", "data", "error", "version", "finished_at"}
+_EXPORTS = OrderedDict()
+_EXPORTS_LOCK = threading.Lock()
+_EXECUTOR = None
+
+EXPORT_FORMATS = {
+    "xlsx": {"label": "Excel", "extension": "xlsx",
+             "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+    "csv": {"label": "CSV (zip)", "extension": "csv.zip", "mime": "application/zip"},
+    "parquet": {"label": "Parquet (zip)", "extension": "parquet.zip", "mime": "application/zip"},
+    "arrow": {"label": "Arrow IPC (zip)", "extension": "arrow.zip", "mime": "application/zip"},
+}
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _EXECUTOR
+    if _EXECUTOR is None:
+        _EXECUTOR = ThreadPoolExecutor(max_workers=config.EXPORT_MAX_WORKERS, thread_name_prefix="export")
+    return _EXECUTOR
+
+
+def _current_version(join_code: str) -> tuple:
+    """(revision, inbox bytes): queued saves change the export without bumping the revision"""
+    return tuple(state.get_version(join_code))
+
+
+def _build(key: tuple, entry: dict):
+    join_code, _, fmt = key
+
+    def progress(done: int, total: int):
+        entry["progress"] = done / total if total else 1.0
+
+    try:
+        data = state.export_game_results(join_code, fmt, progress=progress)
+        if data is None:
+            raise ValueError("Nothing to export (game or format not found)")
+        entry["data"] = data
+        entry["status"] = "ready"
+    except Exception as e:
+        entry["error"] = str(e)
+        entry["status"] = "failed"
+    finally:
+        entry["progress"] = 1.0
+        entry["finished_at"] = time.time()
+
+    with _EXPORTS_LOCK:
+        if entry["status"] == "ready":
+            # Older builds of the same session/format are superseded
+            for old_key in [k for k in _EXPORTS if k[0] == join_code and k[2] == fmt and k[1] < key[1]]:
+                del _EXPORTS[old_key]
+
+
+def request_export(join_code: str, fmt: str = "xlsx") -> dict:
+    """
+    Get the export of join_code at its current version, starting a background
+    build if there isn't one yet. Never blocks on the build itself.
+    Returns: the cache entry (status: "building", "ready" or "failed")
+    """
+    join_code = join_code.upper()
+    key = (join_code, _current_version(join_code), fmt)
+
+    with _EXPORTS_LOCK:
+        entry = _EXPORTS.get(key)
+        if entry is not None and entry["status"] != "failed":
+            _EXPORTS.move_to_end(key)
+            return entry
+
+        entry = {"status": "building", "progress": 0.0, "data": None, "error": None,
+                 "version": key[1], "finished_at": None}
+        _EXPORTS[key] = entry
+
+        while len(_EXPORTS) > config.EXPORT_CACHE_MAX_ENTRIES:
+            _EXPORTS.popitem(last=False)
+
+    _executor().submit(_build, key, entry)
+    return entry
+
+
+def get_export(join_code: str, fmt: str = "xlsx") -> Optional[dict]:
+    """Cache entry for join_code at its current version, or None (doesn't start a build)"""
+    join_code = join_code.upper()
+    with _EXPORTS_LOCK:
+        return _EXPORTS.get((join_code, _current_version(join_code), fmt))
+
+
+def get_latest_export(join_code: str, fmt: str = "xlsx") -> Optional[dict]:
+    """Most recently built ready export of join_code in fmt, whatever its version"""
+    join_code = join_code.upper()
+    with _EXPORTS_LOCK:
+        ready = [e for k, e in _EXPORTS.items() if k[0] == join_code and k[2] == fmt and e["status"] == "ready"]
+    return max(ready, key=lambda e: e["finished_at"]) if ready else None
+
+
+def is_building(join_code: str) -> bool:
+    """True if any export of join_code is being built"""
+    join_code = join_code.upper()
+    with _EXPORTS_LOCK:
+        return any(k[0] == join_code and e["status"] == "building" for k, e in _EXPORTS.items())
+
+
+def drop_exports(join_code: str):
+    """Forget all cached exports of a session"""
+    join_code = join_code.upper()
+    with _EXPORTS_LOCK:
+        for key in [k for k in _EXPORTS if k[0] == join_code]:
+            del _EXPORTS[key]
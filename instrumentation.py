@@ -0,0 +1,461 @@
+"""
+Opt-in instrumentation for the shared_state hot paths
+
+Records call counts, wall time, bytes read and written and JSON parse time per
+state function and per join code. Each thread only ever updates its own
+counters, so recording takes no locks; snapshot() merges them. Bytes and parse
+time go to the innermost instrumented call that is running (e.g. the scoring
+function inside process_current_round gets none, the surrounding call gets
+the loads and saves). Per-session totals count each top-level call once, so
+nested calls don't add their wall time twice.
+
+For the Operations page it also keeps latency histograms, lock wait time, a
+log of slow calls, page reruns and viewers, and sampled session sizes.
+
+Traces: begin_trace() at the start of a page run (or a state server request)
+gives it a trace ID and records every instrumented call made on that thread
+until end_trace(). A trace slower than SLOW_RERUN_MS, or holding a call
+slower than SLOW_CALL_MS, is written with its call breakdown as one JSON line
+to the slow operation log (rotating, SLOW_LOG_FILE); so is a slow call made
+outside any trace, without a breakdown.
+
+Off by default (config.INSTRUMENTATION_ENABLED, or ECONOMICS_GAMES_INSTRUMENTATION=1);
+ENABLED can also be flipped at runtime. When off, instrumented functions only
+pay for one flag check.
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import weakref
+from collections import deque
+from datetime import datetime
+
+import config
+
+ENABLED = os.environ.get("ECONOMICS_GAMES_INSTRUMENTATION", str(int(config.INSTRUMENTATION_ENABLED))) not in ("", "0")
+
+# Per-call counters, in this order, followed by a latency histogram
+FIELDS = ("calls", "errors", "wall_s", "bytes_read", "bytes_written", "parse_s", "lock_wait_s")
+
+# Histogram bucket upper bounds (ms); the last bucket counts everything slower
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500)
+
+# I/O outside any instrumented call (e.g. init_data_dir) is recorded under this name
+UNATTRIBUTED = "(other)"
+
+# Slow operation log (JSON lines); None = <data dir>/slow_operations.jsonl.
+# Each process needs its own file, since rotation isn't safe across processes
+SLOW_LOG_FILE = os.environ.get("ECONOMICS_GAMES_SLOW_LOG") or config.SLOW_LOG_FILE
+
+# Calls kept per trace; a rerun making more only counts the rest
+MAX_TRACE_CALLS = 500
+
+_local = threading.local()
+_THREADS = []          # [(weakref to thread, counters, generation)] for snapshot()
+_RETIRED = {}          # counters of threads that have exited
+_REGISTRY_LOCK = threading.Lock()
+_GENERATION = 0        # bumped by reset(); threads drop their counters when it changes
+_STARTED_AT = time.time()
+
+# Appended/assigned from any thread: single deque appends and dict item
+# assignments are atomic, so these need no lock either
+_SLOW_CALLS = deque(maxlen=config.SLOW_CALL_LOG_SIZE)   # (at, function, join_code, ms, trace_id)
+_RERUNS = {}           # page -> deque of rerun times
+_RERUN_TOTALS = {}     # page -> reruns since start (a lock; reruns are rare next to state calls)
+_RERUN_LOCK = threading.Lock()
+_VIEWERS = {}          # viewer (Streamlit session id) -> (last seen, page, join_code)
+_SESSION_SIZES = {}    # join_code -> (bytes, measured at)
+
+_OPEN_TRACES = {}      # owner (viewer) -> their latest trace, until it ends
+_slow_log = None
+_SLOW_LOG_LOCK = threading.Lock()
+
+
+def _empty() -> list:
+    return [0, 0, 0.0, 0, 0, 0.0, 0.0] + [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+
+def _bucket(ms: float) -> int:
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _add_into(totals: dict, counters: dict):
+    for key, values in counters.items():
+        row = totals.setdefault(key, _empty())
+        for i, value in enumerate(values):
+            row[i] += value
+
+
+def _retire_dead_threads():
+    """Fold the counters of exited threads into _RETIRED (call under _REGISTRY_LOCK)"""
+    alive = []
+    for thread_ref, counters, generation in _THREADS:
+        if thread_ref() is not None and thread_ref().is_alive():
+            alive.append((thread_ref, counters, generation))
+        elif generation == _GENERATION:
+            _add_into(_RETIRED, counters)
+    _THREADS[:] = alive
+
+
+def _thread_state():
+    """This thread's (counters, call stack), registering it on first use or after a reset"""
+    if getattr(_local, "generation", None) != _GENERATION:
+        _local.generation = _GENERATION
+        _local.counters = {}
+        _local.stack = []
+        with _REGISTRY_LOCK:
+            # Streamlit runs every rerun in a new thread, so don't let dead ones pile up
+            _retire_dead_threads()
+            _THREADS.append((weakref.ref(threading.current_thread()), _local.counters, _GENERATION))
+    return _local.counters, _local.stack
+
+
+def _join_code_getter(fn):
+    """How to find the join code in fn's arguments (None unless its first parameter is join_code)"""
+    code = fn.__code__
+    if code.co_varnames[:min(code.co_argcount, 1)] != ("join_code",):
+        return lambda args, kwargs: None
+
+    def getter(args, kwargs):
+        value = args[0] if args else kwargs.get("join_code")
+        return value.upper() if isinstance(value, str) else None
+    return getter
+
+
+def instrumented(fn, call=None):
+    """
+    Decorator recording calls of fn per join code. call: run this instead of
+    fn (same signature), e.g. a proxy that forwards fn to the state server.
+    """
+    name = fn.__name__
+    target = call or fn
+    join_code_of = _join_code_getter(fn)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not ENABLED:
+            return target(*args, **kwargs)
+
+        counters, stack = _thread_state()
+        join_code = join_code_of(args, kwargs)
+        if join_code is None and stack:
+            # e.g. the scoring functions only get the game dict: count them for the caller's session
+            join_code = stack[-1][1]
+        key = (name, join_code, not stack)
+        row = counters.get(key)
+        if row is None:
+            row = counters[key] = _empty()
+
+        trace = getattr(_local, "trace", None)
+        if trace is not None:
+            before = (row[3], row[4], row[6])
+        failed = False
+
+        stack.append((row, join_code))
+        start = time.perf_counter()
+        try:
+            return target(*args, **kwargs)
+        except BaseException:
+            row[1] += 1
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            row[0] += 1
+            row[2] += elapsed
+            row[len(FIELDS) + _bucket(elapsed * 1000)] += 1
+            stack.pop()
+            ms = elapsed * 1000
+            if trace is not None:
+                _trace_call(trace, name, join_code, len(stack), start, ms, failed, row, before)
+            if not stack and ms >= config.SLOW_CALL_MS:
+                trace_id = trace["trace_id"] if trace is not None else None
+                _SLOW_CALLS.append((time.time(), name, join_code, ms, trace_id))
+                if trace is None:
+                    _write_slow_log({"kind": "call", "trace_id": None, "function": name,
+                                     "join_code": join_code, "ms": round(ms, 2), "error": failed})
+
+    return wrapper
+
+
+def begin_trace(kind: str = "rerun", trace_id: str = None, owner: str = None, **context) -> str:
+    """
+    Start recording this thread's instrumented calls under a new trace.
+    owner: e.g. the viewer whose page run this is; a trace of theirs still open
+    (the run stopped early: st.stop(), st.rerun()) is ended first, as is one
+    left open on this thread. context: page, join_code, user_type etc., logged
+    with the trace.
+    Returns: the trace ID, or None when instrumentation is off
+    """
+    if not ENABLED:
+        return None
+
+    _finish_trace(getattr(_local, "trace", None), ended_early=True)
+    if owner is not None:
+        _finish_trace(_OPEN_TRACES.pop(owner, None), ended_early=True)
+
+    trace = {"trace_id": trace_id or os.urandom(8).hex(), "kind": kind, "owner": owner,
+             "context": context, "at": time.time(), "started": time.perf_counter(),
+             "last": None, "calls": [], "dropped": 0, "ended": False}
+    _local.trace = trace
+    if owner is not None:
+        _OPEN_TRACES[owner] = trace
+    return trace["trace_id"]
+
+
+def current_trace_id() -> str:
+    """ID of the trace running on this thread (None if there's none)"""
+    trace = getattr(_local, "trace", None)
+    return trace["trace_id"] if trace is not None else None
+
+
+def end_trace():
+    """Finish this thread's trace and log it if it was slow"""
+    trace = getattr(_local, "trace", None)
+    if trace is not None and trace["owner"] is not None:
+        _OPEN_TRACES.pop(trace["owner"], None)
+    _finish_trace(trace, ended_early=False)
+
+
+def _finish_trace(trace: dict, ended_early: bool):
+    """Log trace if it was slow. ended_early: timed up to its last recorded call"""
+    if trace is None or trace["ended"]:
+        return
+    trace["ended"] = True
+    if getattr(_local, "trace", None) is trace:
+        _local.trace = None
+
+    if ended_early and trace["last"] is None:
+        return
+    ended = trace["last"] if ended_early else time.perf_counter()
+    total_ms = (ended - trace["started"]) * 1000
+    calls = trace["calls"]
+    top_level = [c for c in calls if c["depth"] == 0]
+    slow = [c for c in top_level if c["ms"] >= config.SLOW_CALL_MS]
+    if total_ms < config.SLOW_RERUN_MS and not slow:
+        return
+
+    _write_slow_log({
+        "kind": trace["kind"],
+        "trace_id": trace["trace_id"],
+        **trace["context"],
+        "started": datetime.fromtimestamp(trace["at"]).isoformat(timespec="milliseconds"),
+        "ms": round(total_ms, 2),
+        "state_ms": round(sum(c["ms"] for c in top_level), 2),
+        "ended_early": ended_early,
+        "call_count": len(calls) + trace["dropped"],
+        "slow_calls": [c["function"] for c in slow],
+        "calls": calls,
+    })
+
+
+def _trace_call(trace: dict, name: str, join_code: str, depth: int, start: float,
+                ms: float, failed: bool, row: list, before: tuple):
+    trace["last"] = time.perf_counter()
+    if len(trace["calls"]) >= MAX_TRACE_CALLS:
+        trace["dropped"] += 1
+        return
+    # Nested calls finish first: the list is in completion order, offsets say where each started
+    trace["calls"].append({
+        "function": name,
+        "join_code": join_code,
+        "depth": depth,
+        "offset_ms": round((start - trace["started"]) * 1000, 2),
+        "ms": round(ms, 2),
+        "bytes_read": row[3] - before[0],
+        "bytes_written": row[4] - before[1],
+        "lock_wait_ms": round((row[6] - before[2]) * 1000, 2),
+        "error": failed,
+    })
+
+
+def slow_log_path() -> str:
+    if SLOW_LOG_FILE:
+        return SLOW_LOG_FILE
+    return os.path.join(os.environ.get("ECONOMICS_GAMES_DATA_DIR", config.DATA_DIRECTORY), "slow_operations.jsonl")
+
+
+def _write_slow_log(entry: dict):
+    """Append one JSON line to the slow operation log (never raises: it's only diagnostics)"""
+    global _slow_log
+
+    try:
+        if _slow_log is None:
+            with _SLOW_LOG_LOCK:
+                if _slow_log is None:
+                    import logging.handlers  # on first use, so importing this module stays cheap
+                    path = slow_log_path()
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                    handler = logging.handlers.RotatingFileHandler(
+                        path, maxBytes=config.SLOW_LOG_MAX_BYTES, backupCount=config.SLOW_LOG_BACKUPS,
+                        encoding="utf-8")
+                    handler.setFormatter(logging.Formatter("%(message)s"))
+                    logger = logging.getLogger("economics_games.slow_operations")
+                    logger.setLevel(logging.INFO)
+                    logger.propagate = False
+                    logger.addHandler(handler)
+                    _slow_log = logger
+        entry = {"at": datetime.now().isoformat(timespec="milliseconds"), "pid": os.getpid(), **entry}
+        _slow_log.info(json.dumps(entry, default=str, separators=(",", ":")))
+    except Exception:
+        pass
+
+
+def record_io(bytes_read: int = 0, bytes_written: int = 0, parse_s: float = 0.0):
+    """Add file I/O to the innermost instrumented call running on this thread"""
+    if not ENABLED:
+        return
+
+    row = _innermost_row()
+    row[3] += bytes_read
+    row[4] += bytes_written
+    row[5] += parse_s
+
+
+def _innermost_row() -> list:
+    counters, stack = _thread_state()
+    if stack:
+        return stack[-1][0]
+    row = counters.get((UNATTRIBUTED, None, True))
+    if row is None:
+        row = counters[(UNATTRIBUTED, None, True)] = _empty()
+    return row
+
+
+def record_lock_wait(seconds: float):
+    """Add time spent waiting for the state lock to the innermost instrumented call"""
+    if ENABLED:
+        _innermost_row()[6] += seconds
+
+
+def record_rerun(page: str, viewer: str = None, join_code: str = None):
+    """Count one script run of a page, by a viewer (browser session) of a game"""
+    if not ENABLED:
+        return
+
+    now = time.time()
+    runs = _RERUNS.get(page)
+    if runs is None:
+        runs = _RERUNS.setdefault(page, deque(maxlen=10000))
+    runs.append(now)
+    with _RERUN_LOCK:
+        _RERUN_TOTALS[page] = _RERUN_TOTALS.get(page, 0) + 1
+    if viewer is not None:
+        _VIEWERS[viewer] = (now, page, join_code)
+
+
+def session_size_due(join_code: str) -> bool:
+    """Whether the session's size should be measured again (at most every SESSION_SIZE_SAMPLE_SECONDS)"""
+    if not ENABLED:
+        return False
+    measured = _SESSION_SIZES.get(join_code)
+    return measured is None or time.time() - measured[1] >= config.SESSION_SIZE_SAMPLE_SECONDS
+
+
+def record_session_size(join_code: str, size_bytes: int):
+    _SESSION_SIZES[join_code] = (size_bytes, time.time())
+
+
+def histogram_percentile(histogram: list, pct: float) -> float:
+    """Upper bound (ms) of the bucket holding the pct-th percentile; inf if it's the overflow bucket"""
+    total = sum(histogram)
+    if not total:
+        return 0.0
+    seen = 0
+    for i, count in enumerate(histogram):
+        seen += count
+        if seen >= pct / 100.0 * total:
+            return LATENCY_BUCKETS_MS[i] if i < len(LATENCY_BUCKETS_MS) else float("inf")
+    return float("inf")
+
+
+def _as_dict(values: list) -> dict:
+    stats = dict(zip(FIELDS, values))
+    stats["mean_ms"] = stats["wall_s"] * 1000 / stats["calls"] if stats["calls"] else 0.0
+    stats["histogram"] = list(values[len(FIELDS):])
+    return stats
+
+
+def snapshot() -> dict:
+    """
+    Counters of all threads so far (since start or the last reset()).
+    Returns: {"enabled", "since", "functions": {name: stats}, "sessions": {join_code: stats},
+              "calls": [{"function", "join_code", **stats}], "slow_calls": [...],
+              "session_bytes": {join_code: bytes}} - stats are FIELDS plus mean_ms and
+              histogram (call counts per LATENCY_BUCKETS_MS bucket)
+    """
+    with _REGISTRY_LOCK:
+        _retire_dead_threads()
+        totals = {}
+        _add_into(totals, _RETIRED)
+        for _, counters, generation in _THREADS:
+            if generation == _GENERATION:
+                # dict() copies under the GIL; the owning thread may be mid-update, which only skews one call
+                _add_into(totals, dict(counters))
+        since = _STARTED_AT
+
+    functions, sessions, calls = {}, {}, {}
+    for (name, join_code, top_level), values in totals.items():
+        _add_into(functions, {name: values})
+        _add_into(calls, {(name, join_code): values})
+        if join_code is not None:
+            # Nested calls only add their I/O and lock waits to the session
+            _add_into(sessions, {join_code: values if top_level else [0, 0, 0.0] + values[3:len(FIELDS)]})
+
+    return {
+        "enabled": ENABLED,
+        "since": since,
+        "functions": {name: _as_dict(v) for name, v in sorted(functions.items())},
+        "sessions": {code: _as_dict(v) for code, v in sorted(sessions.items())},
+        "calls": [{"function": name, "join_code": code, **_as_dict(v)}
+                  for (name, code), v in sorted(calls.items(), key=lambda kv: (kv[0][0], kv[0][1] or ""))],
+        "slow_calls": [{"at": at, "function": name, "join_code": code, "ms": ms, "trace_id": trace_id}
+                       for at, name, code, ms, trace_id in list(_SLOW_CALLS) if at >= since],
+        "session_bytes": {code: size for code, (size, _) in list(_SESSION_SIZES.items())},
+    }
+
+
+def activity(window_seconds: float = None) -> dict:
+    """
+    Page reruns and viewers in the last window_seconds (default OPERATIONS_ACTIVE_WINDOW_SECONDS).
+    Returns: {"reruns_per_second": {page: rate}, "viewers": {page: count},
+              "sessions": {join_code: viewer count}, "reruns_total": {page: reruns since start}}
+    """
+    window = window_seconds or config.OPERATIONS_ACTIVE_WINDOW_SECONDS
+    cutoff = time.time() - window
+
+    rates = {}
+    for page, runs in list(_RERUNS.items()):
+        rates[page] = sum(1 for at in list(runs) if at >= cutoff) / window
+
+    viewers, sessions = {}, {}
+    for viewer, (seen, page, join_code) in list(_VIEWERS.items()):
+        if seen < cutoff:
+            _VIEWERS.pop(viewer, None)
+            _OPEN_TRACES.pop(viewer, None)
+            continue
+        viewers[page] = viewers.get(page, 0) + 1
+        if join_code:
+            sessions[join_code] = sessions.get(join_code, 0) + 1
+
+    with _RERUN_LOCK:
+        totals = dict(_RERUN_TOTALS)
+
+    return {"reruns_per_second": rates, "viewers": viewers, "sessions": sessions, "reruns_total": totals}
+
+
+def reset():
+    """Start counting from zero (threads drop their counters on their next call)"""
+    global _GENERATION, _STARTED_AT
+    with _REGISTRY_LOCK:
+        _GENERATION += 1
+        _RETIRED.clear()
+        _THREADS.clear()
+        _SLOW_CALLS.clear()
+        _STARTED_AT = time.time()
@@ -0,0 +1,231 @@
+"""
+Memory accounting for long-running servers
+
+Estimates how much memory each game session takes once parsed (deep
+sys.getsizeof walk) and which of its fields dominate: per-team round history,
+narrative strings (explanations, outcomes, indicator notes) and repeated
+identical small dicts. Also sums what each page's viewers keep in
+st.session_state and what the process-wide session cache (shared by
+Scoreboard viewers) holds, reads the process RSS, and wraps tracemalloc for
+allocation snapshots and growth between them.
+
+    memory_usage.memory_report()      # everything, largest sessions first
+    memory_usage.start_tracing()      # then tracemalloc_report() now and later
+
+Shown on the Operations page.
+"""
+
+import os
+import sys
+import tracemalloc
+from typing import Optional
+
+import instrumentation
+
+# Strings at least this long count as narrative text
+NARRATIVE_MIN_CHARS = 40
+
+# Keys that are names (teams, rounds, codes) rather than fields: grouped as "*"
+_NAMED_CHILDREN = {"teams", "round_history", "team_codes", "ranks", "previous_ranks"}
+
+_SCALARS = (str, int, float, bool, type(None))
+
+_previous_snapshot = None
+
+
+def deep_size(obj, seen: Optional[set] = None) -> int:
+    """Approximate bytes held by obj and everything it references (shared objects counted once)"""
+    seen = set() if seen is None else seen
+    total, stack = 0, [obj]
+    while stack:
+        current = stack.pop()
+        if id(current) in seen:
+            continue
+        seen.add(id(current))
+        total += sys.getsizeof(current)
+        if isinstance(current, dict):
+            stack.extend(current.keys())
+            stack.extend(current.values())
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            stack.extend(current)
+    return total
+
+
+def session_footprint(game: dict, depth: int = 3, top: int = 8) -> dict:
+    """
+    Size of one parsed game session and what it's made of.
+    Returns: {"total_bytes", "teams", "fields": [(path, bytes)] largest first
+    (paths down to depth, team names/rounds as "*"), "narrative_bytes",
+    "narrative_strings", "duplicate_dict_bytes" (small dicts equal to an earlier one)}
+    """
+    seen = set()
+    by_path = {}
+    narrative_bytes = narrative_strings = duplicate_bytes = 0
+    leaf_dicts = set()
+
+    stack = [(game, ())]
+    while stack:
+        obj, path = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+
+        size = sys.getsizeof(obj)
+        key = ".".join(path[:depth]) or "(session)"
+
+        if isinstance(obj, str):
+            if len(obj) >= NARRATIVE_MIN_CHARS:
+                narrative_bytes += size
+                narrative_strings += 1
+        elif isinstance(obj, dict):
+            for k in obj:
+                if id(k) not in seen:
+                    seen.add(id(k))
+                    size += sys.getsizeof(k)
+
+            if 0 < len(obj) <= 16 and all(isinstance(v, _SCALARS) for v in obj.values()):
+                fingerprint = tuple(sorted((str(k), repr(v)) for k, v in obj.items()))
+                if fingerprint in leaf_dicts:
+                    duplicate_bytes += size + sum(sys.getsizeof(v) for v in obj.values())
+                leaf_dicts.add(fingerprint)
+
+            named = bool(path) and path[-1] in _NAMED_CHILDREN
+            for k, v in obj.items():
+                stack.append((v, path + ("*" if named else str(k),)))
+        elif isinstance(obj, (list, tuple)):
+            for item in obj:
+                stack.append((item, path + ("[]",)))
+
+        by_path[key] = by_path.get(key, 0) + size
+
+    total = sum(by_path.values())
+    fields = sorted(by_path.items(), key=lambda kv: kv[1], reverse=True)[:top]
+    return {
+        "total_bytes": total,
+        "teams": len(game.get("teams", {})),
+        "fields": fields,
+        "narrative_bytes": narrative_bytes,
+        "narrative_strings": narrative_strings,
+        "duplicate_dict_bytes": duplicate_bytes,
+    }
+
+
+def viewer_state_sizes() -> dict:
+    """
+    What browser sessions keep in st.session_state, by the page they last ran.
+    Returns: {page: {"viewers", "bytes"}} ({} outside a running Streamlit server)
+    """
+    try:
+        from streamlit.runtime import Runtime
+        sessions = Runtime.instance()._session_mgr.list_active_sessions()
+    except Exception:  # not running under `streamlit run`, or the runtime internals changed
+        return {}
+
+    pages = {}
+    for info in sessions:
+        session = info.session
+        viewer = instrumentation._VIEWERS.get(session.id)
+        page = viewer[1] if viewer else "(unknown)"
+        try:
+            size = deep_size(dict(session.session_state.filtered_state))
+        except Exception:
+            continue
+        entry = pages.setdefault(page, {"viewers": 0, "bytes": 0})
+        entry["viewers"] += 1
+        entry["bytes"] += size
+    return pages
+
+
+def process_memory() -> dict:
+    """Resident set size of this process and memory still available on the machine (bytes, None if unknown)"""
+    rss = available = None
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    rss = int(line.split()[1]) * 1024
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    available = int(line.split()[1]) * 1024
+    except OSError:
+        pass
+
+    if rss is None:
+        try:
+            import resource
+            peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            rss = peak if sys.platform == "darwin" else peak * 1024  # peak, not current
+        except ImportError:  # Windows
+            pass
+
+    return {"rss_bytes": rss, "available_bytes": available}
+
+
+def start_tracing(frames: int = 1):
+    """Start tracemalloc (slows allocation-heavy code noticeably; stop it when done)"""
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop_tracing():
+    global _previous_snapshot
+    _previous_snapshot = None
+    tracemalloc.stop()
+
+
+def tracemalloc_report(limit: int = 15) -> Optional[dict]:
+    """
+    Largest allocation sites now, and the biggest growth since the previous call.
+    Returns: {"traced_bytes", "peak_bytes", "top": [(site, bytes, count)],
+    "growth": [(site, bytes delta)]}, or None if tracing is off
+    """
+    global _previous_snapshot
+
+    if not tracemalloc.is_tracing():
+        return None
+
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ])
+    current, peak = tracemalloc.get_traced_memory()
+
+    def site(stat) -> str:
+        frame = stat.traceback[0]
+        return f"{os.path.relpath(frame.filename) if frame.filename.startswith(os.getcwd()) else frame.filename}:{frame.lineno}"
+
+    top = [(site(s), s.size, s.count) for s in snapshot.statistics("lineno")[:limit]]
+    growth = []
+    if _previous_snapshot is not None:
+        growth = [(site(s), s.size_diff) for s in snapshot.compare_to(_previous_snapshot, "lineno")[:limit]
+                  if s.size_diff]
+    _previous_snapshot = snapshot
+
+    return {"traced_bytes": current, "peak_bytes": peak, "top": top, "growth": growth}
+
+
+def memory_report(top_sessions: int = 10) -> dict:
+    """
+    Process memory, every session's parsed size (largest first, with their
+    dominant fields for the top_sessions), the shared session cache, viewers'
+    session_state by page, and tracemalloc results if tracing.
+    """
+    import shared_state as state
+
+    sessions = []
+    for join_code, game in state.get_all_game_sessions().items():
+        sessions.append({"join_code": join_code, "game_type": game.get("game_type"),
+                         "status": game.get("status"), **session_footprint(game)})
+    sessions.sort(key=lambda s: s["total_bytes"], reverse=True)
+    for s in sessions[top_sessions:]:
+        s["fields"] = []
+
+    return {
+        "process": process_memory(),
+        "sessions_total_bytes": sum(s["total_bytes"] for s in sessions),
+        "sessions": sessions,
+        "session_cache": {"sessions": len(state._SESSION_CACHE), "bytes": deep_size(dict(state._SESSION_CACHE))},
+        "viewer_state": viewer_state_sizes(),
+        "tracemalloc": tracemalloc_report(),
+    }
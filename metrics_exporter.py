@@ -0,0 +1,173 @@
+"""
+Prometheus metrics exporter
+
+Serves this process's instrumentation counters (state calls, bytes, JSON
+parse and lock wait time, latency histograms - round processing and exports
+included), page reruns and viewers, state file sizes and teams per session in
+the Prometheus text format, from a daemon thread:
+
+    curl http://127.0.0.1:<METRICS_PORT>/metrics
+
+Started by the pages when config.METRICS_PORT (or ECONOMICS_GAMES_METRICS_PORT)
+is set, and by state_server.py --metrics-port.
+"""
+
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+import config
+import instrumentation
+
+PREFIX = "econgames"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+_SERVER = None
+_START_LOCK = threading.Lock()
+
+
+def configured_port() -> Optional[int]:
+    port = os.environ.get("ECONOMICS_GAMES_METRICS_PORT", config.METRICS_PORT)
+    return int(port) if port not in (None, "") else None
+
+
+def _label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _family(lines: list, name: str, kind: str, help_text: str, samples: list):
+    """Append one metric family; samples: [(suffix, {label: value}, value)]"""
+    lines.append(f"# HELP {PREFIX}_{name} {help_text}")
+    lines.append(f"# TYPE {PREFIX}_{name} {kind}")
+    for suffix, labels, value in samples:
+        label_text = ",".join(f'{key}="{_label_value(v)}"' for key, v in labels.items())
+        lines.append(f"{PREFIX}_{name}{suffix}{{{label_text}}} {_format_value(value)}" if label_text
+                     else f"{PREFIX}_{name}{suffix} {_format_value(value)}")
+
+
+def _histogram_samples(labels: dict, stats: dict) -> list:
+    samples, cumulative = [], 0
+    bounds = [ms / 1000 for ms in instrumentation.LATENCY_BUCKETS_MS] + [float("inf")]
+    for bound, count in zip(bounds, stats["histogram"]):
+        cumulative += count
+        samples.append(("_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+    samples.append(("_sum", labels, stats["wall_s"]))
+    samples.append(("_count", labels, stats["calls"]))
+    return samples
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    import shared_state as state
+
+    snapshot = instrumentation.snapshot()
+    activity = instrumentation.activity()
+    functions = snapshot["functions"].items()
+    lines = []
+
+    _family(lines, "instrumentation_enabled", "gauge", "Whether state calls are being counted",
+            [("", {}, int(instrumentation.ENABLED))])
+
+    _family(lines, "state_calls_total", "counter", "State function calls",
+            [("", {"function": name}, s["calls"]) for name, s in functions])
+    _family(lines, "state_errors_total", "counter", "State function calls that raised",
+            [("", {"function": name}, s["errors"]) for name, s in functions])
+    _family(lines, "state_call_duration_seconds", "histogram",
+            "State function latency (incl. round processing: process_current_round, advance_round, "
+            "_process_*_round; exports: export_game_results*)",
+            [sample for name, s in functions for sample in _histogram_samples({"function": name}, s)])
+    _family(lines, "state_read_bytes_total", "counter", "State file bytes read",
+            [("", {"function": name}, s["bytes_read"]) for name, s in functions])
+    _family(lines, "state_written_bytes_total", "counter", "State file bytes written",
+            [("", {"function": name}, s["bytes_written"]) for name, s in functions])
+    _family(lines, "state_json_parse_seconds_total", "counter", "Time spent parsing state JSON",
+            [("", {"function": name}, s["parse_s"]) for name, s in functions])
+    _family(lines, "state_lock_wait_seconds_total", "counter", "Time spent waiting for the state lock",
+            [("", {"function": name}, s["lock_wait_s"]) for name, s in functions])
+
+    _family(lines, "page_reruns_total", "counter", "Page script runs (including autorefresh reruns)",
+            [("", {"page": page}, count) for page, count in sorted(activity["reruns_total"].items())])
+    _family(lines, "active_viewers", "gauge",
+            f"Browser sessions that ran a page in the last {config.OPERATIONS_ACTIVE_WINDOW_SECONDS}s",
+            [("", {"page": page}, count) for page, count in sorted(activity["viewers"].items())])
+    _family(lines, "active_sessions", "gauge", "Game sessions with active viewers",
+            [("", {}, len(activity["sessions"]))])
+
+    files = [("games", state.GAMES_FILE), ("summaries", state.SUMMARY_FILE), ("sessions", state.SESSIONS_FILE)]
+    sizes = [("", {"file": name}, os.path.getsize(path)) for name, path in files if os.path.exists(path)]
+    if os.path.isdir(state.INBOX_DIR):
+        inbox = sum(entry.stat().st_size for entry in os.scandir(state.INBOX_DIR) if entry.is_file())
+        sizes.append(("", {"file": "inbox"}, inbox))
+    _family(lines, "state_file_bytes", "gauge", "Size of the state files on disk", sizes)
+    _family(lines, "session_state_bytes", "gauge", "Size of a session in the state file (sampled)",
+            [("", {"join_code": code}, size) for code, size in sorted(snapshot["session_bytes"].items())])
+
+    summaries = state.get_all_session_summaries()
+    _family(lines, "sessions", "gauge", "Game sessions in the state files", [("", {}, len(summaries))])
+    _family(lines, "session_teams", "gauge", "Teams per game session",
+            [("", {"join_code": code}, s["team_count"]) for code, s in sorted(summaries.items())])
+
+    backend = state.state_backend_info()
+    _family(lines, "state_pending_writes", "gauge", "Writes not yet flushed to disk (memory backend)",
+            [("", {"backend": backend["backend"]}, backend["pending_writes"])])
+
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        try:
+            body = render().encode("utf-8")
+        except Exception as e:
+            logger.exception("Rendering metrics failed")
+            self.send_error(500, str(e))
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):  # scrapes every few seconds would flood the console
+        pass
+
+
+def start(port: Optional[int] = None, host: Optional[str] = None) -> Optional[int]:
+    """
+    Serve /metrics from a daemon thread (once per process; later calls are
+    no-ops). Turns instrumentation on.
+    Returns: the port being served, or None if no port is configured or it's taken
+    """
+    global _SERVER
+
+    port = configured_port() if port is None else port
+    if port is None:
+        return None
+
+    with _START_LOCK:
+        if _SERVER is None:
+            try:
+                _SERVER = ThreadingHTTPServer((host or config.METRICS_BIND_ADDRESS, port), _MetricsHandler)
+            except OSError as e:
+                # e.g. another worker already has the port: keep running without metrics
+                logger.warning("Metrics exporter not started on port %s: %s", port, e)
+                _SERVER = False
+                return None
+            _SERVER.daemon_threads = True
+            threading.Thread(target=_SERVER.serve_forever, name="metrics-exporter", daemon=True).start()
+            instrumentation.ENABLED = True
+
+    return _SERVER.server_address[1] if _SERVER else None
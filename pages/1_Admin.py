@@ -4,13 +4,10 @@ Admin Page - Control game flow, manage teams, and monitor progress
 
 import streamlit as st
 import shared_state as state
+import profiling
 import time
 import config
-from streamlit_autorefresh import st_autorefresh
-import qrcode
-from io import BytesIO
-import base64
-from streamlit_javascript import st_javascript
+import export_cache
 from datetime import datetime
 
 st.set_page_config(
@@ -41,8 +38,8 @@ if url_join_code and not st.session_state.get("user_type"):
         st.rerun()
 
 state.init_user_session()
-
-st.markdown("""
+with state.page_view("Admin"), profiling.page_profile("Admin"):
+    st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Poppins:wght@600;700;800&display=swap');.main {
         background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
@@ -140,194 +137,170 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-def generate_qr_code(url: str) -> str:
-    """Generate QR code as base64 image"""
-    try:
-        qr = qrcode.QRCode(version=1, box_size=10, border=4)
-        qr.add_data(url)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
+    def generate_qr_code(url: str) -> str:
+        """Generate QR code as base64 image"""
+        import qr_codes  # qrcode and Pillow load only when a QR code is shown
 
-        return f"data:image/png;base64,{img_str}"
-    except Exception as e:
-        st.error(f"Error generating QR code: {e}")
-        return ""
+        try:
+            return qr_codes.get_qr_data_uri(url)
+        except Exception as e:
+            st.error(f"Error generating QR code: {e}")
+            return ""
 
 
-if not state.is_admin():
-    st.error("🚫 Admin access required")
-    st.markdown("---")
-    st.markdown("### 🔐 Re-authenticate as Admin")
+    if not state.is_admin():
+        st.error("🚫 Admin access required")
+        st.markdown("---")
+        st.markdown("### 🔐 Re-authenticate as Admin")
     
-    url_join = _get_query_param("join_code").upper()
+        url_join = _get_query_param("join_code").upper()
     
-    with st.form("admin_reauth_top"):
-        reauth_password = st.text_input("Admin Password", type="password")
-        join_code_input = st.text_input("Game Join Code", value=url_join)
+        with st.form("admin_reauth_top"):
+            reauth_password = st.text_input("Admin Password", type="password")
+            join_code_input = st.text_input("Game Join Code", value=url_join)
         
-        if st.form_submit_button("Re-authenticate"):
-            if not reauth_password:
-                st.error("❌ Please enter admin password!")
-            elif reauth_password != config.ADMIN_PASSWORD:
-                st.error("❌ Invalid admin password!")
-            elif not join_code_input:
-                st.error("❌ Please enter game join code!")
-            else:
-                game_check = state.get_game_session(join_code_input.upper())
-                if game_check:
-                    state.set_user_as_admin(game_check.get("admin_name", "Admin"), join_code_input.upper())
-                    st.success("✅ Re-authenticated!")
-                    time.sleep(0.5)
-                    st.rerun()
+            if st.form_submit_button("Re-authenticate"):
+                if not reauth_password:
+                    st.error("❌ Please enter admin password!")
+                elif reauth_password != config.ADMIN_PASSWORD:
+                    st.error("❌ Invalid admin password!")
+                elif not join_code_input:
+                    st.error("❌ Please enter game join code!")
                 else:
-                    st.error("❌ Game not found!")
+                    game_check = state.get_game_session(join_code_input.upper())
+                    if game_check:
+                        state.set_user_as_admin(game_check.get("admin_name", "Admin"), join_code_input.upper())
+                        st.success("✅ Re-authenticated!")
+                        time.sleep(0.5)
+                        st.rerun()
+                    else:
+                        st.error("❌ Game not found!")
     
-    st.info("💡 **Tip:** Create a new game from the Home page if you don't have a join code.")
-    st.stop()
+        st.info("💡 **Tip:** Create a new game from the Home page if you don't have a join code.")
+        st.stop()
 
-game = state.get_current_game()
+    game = state.get_current_game()
 
-if not game:
-    st.error("❌ Game session not found!")
+    if not game:
+        st.error("❌ Game session not found!")
     
-    st.markdown("---")
-    st.markdown("### 🔐 Re-authenticate as Admin")
+        st.markdown("---")
+        st.markdown("### 🔐 Re-authenticate as Admin")
     
-    with st.form("admin_reauth_nogame"):
-        reauth_password = st.text_input("Admin Password", type="password")
-        join_code_input = st.text_input("Game Join Code")
+        with st.form("admin_reauth_nogame"):
+            reauth_password = st.text_input("Admin Password", type="password")
+            join_code_input = st.text_input("Game Join Code")
         
-        if st.form_submit_button("Re-authenticate"):
-            if not reauth_password:
-                st.error("❌ Please enter admin password!")
-            elif reauth_password != config.ADMIN_PASSWORD:
-                st.error("❌ Invalid admin password!")
-            elif not join_code_input:
-                st.error("❌ Please enter game join code!")
-            else:
-                game_check = state.get_game_session(join_code_input.upper())
-                if game_check:
-                    state.set_user_as_admin(game_check["admin_name"], join_code_input.upper())
-                    st.success("✅ Re-authenticated!")
-                    time.sleep(0.5)
-                    st.rerun()
+            if st.form_submit_button("Re-authenticate"):
+                if not reauth_password:
+                    st.error("❌ Please enter admin password!")
+                elif reauth_password != config.ADMIN_PASSWORD:
+                    st.error("❌ Invalid admin password!")
+                elif not join_code_input:
+                    st.error("❌ Please enter game join code!")
                 else:
-                    st.error("❌ Game not found!")
+                    game_check = state.get_game_session(join_code_input.upper())
+                    if game_check:
+                        state.set_user_as_admin(game_check["admin_name"], join_code_input.upper())
+                        st.success("✅ Re-authenticated!")
+                        time.sleep(0.5)
+                        st.rerun()
+                    else:
+                        st.error("❌ Game not found!")
     
-    st.info("💡 **Tip:** Create a new game from the Home page.")
-    st.stop()
+        st.info("💡 **Tip:** Create a new game from the Home page.")
+        st.stop()
 
-st.markdown("""
+    st.markdown("""
 <div style="text-align: center; padding: 12px 0 6px 0;">
     <h1>👨‍💼 Admin Control Panel</h1>
 </div>
 """, unsafe_allow_html=True)
 
-if game["status"] == "running" and game.get("round_timer_end"):
     timer_active, remaining = state.check_round_timer(st.session_state.join_code)
-    if timer_active and remaining > 0:
-        st_autorefresh(interval=1000, key="admin_timer_refresh")
+    timer_running = game["status"] == "running" and timer_active and remaining > 0
 
-with st.sidebar:
-    st.markdown("## 🎮 Game Info")
-    
-    game_names = {
-        "build_country": "🌍 Build a Country",
-        "beat_market": "📈 Beat the Market",
-        "crypto_crash": "₿ Crypto Crash"
-    }
-    
-    st.markdown(f"**Game:** {game_names.get(game['game_type'], game['game_type'])}")
-    st.markdown(f"**Status:** {game['status'].upper()}")
-    st.markdown(f"**Teams:** {len(game['teams'])}")
-    st.markdown(f"**Round:** {game['current_round']}/{game['settings']['num_rounds']}")
-    
-    st.markdown("---")
-    
-    st.markdown("## ⚙️ Settings")
-    st.markdown(f"**Rounds:** {game['settings']['num_rounds']}")
-    st.markdown(f"**Round Duration:** {game['settings']['round_duration']}s")
-    st.markdown(f"**Auto-lock:** {'Yes' if game['settings']['auto_lock'] else 'No'}")
-    
-    if game["game_type"] == "beat_market":
-        st.markdown(f"**ESG Mode:** {'Yes' if game['settings'].get('esg_mode') else 'No'}")
-    
-        st.markdown("---")
-    
-    # ✅ NEW: Export Results
-    st.markdown("## 📥 Export Results")
-    
-    if game["status"] in ["running", "finished"]:
-        if st.button("📊 Download Excel Report", use_container_width=True, type="primary"):
-            try:
-                excel_data = state.export_game_results_to_excel(st.session_state.join_code)
-                
-                if excel_data:
-                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                    filename = f"game_results_{game['game_type']}_{timestamp}.xlsx"
-                    
-                    st.download_button(
-                        label="💾 Download Excel File",
-                        data=excel_data,
-                        file_name=filename,
-                        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                        use_container_width=True
-                    )
-                    st.success("✅ Excel file ready for download!")
-                else:
-                    st.error("❌ Failed to generate Excel file")
-            except Exception as e:
-                st.error(f"❌ Error: {str(e)}")
-    else:
-        st.info("Start the game to enable export")
-        
-    st.markdown("---")
-    
-    if st.button("🚪 End Game & Return Home", use_container_width=True):
-        if st.session_state.get("confirm_end"):
-            state.delete_game_session(st.session_state.join_code)
-            state.clear_user_session()
-            st.rerun()
-        else:
-            st.session_state.confirm_end = True
-            st.warning("Click again to confirm")
 
-# ✅ NEW: 3-tab layout (added "Team QR Codes" tab)
-tab1, tab2, tab3 = st.tabs(["📋 Team Management", "🎮 Round Control", "🔗 Team QR Codes"])
+    # ============================================================================
+    # LIVE PANELS (FRAGMENTS)
+    # Only these rerun on an interval; the rest of the page reruns on admin input.
+    # ============================================================================
 
-with tab1:
-    st.markdown("### 👥 Team Management")
-    
-    col1, col2 = st.columns([2, 1])
-    
-    with col1:
-        st.markdown(f"**Teams Joined:** {len(game['teams'])} teams")
-    
-    with col2:
-        if game["status"] == "setup":
-            st.markdown("**Status:** Ready to start")
-        else:
-            current_round = game.get("current_round", 1)
-            saved_count = sum(1 for t in game["teams"].values() if t.get("decision_saved_round") == current_round)
-            st.markdown(f"**Decisions Saved:** {saved_count}/{len(game['teams'])}")
-    
-    if not game["teams"]:
-        st.info("⏳ Waiting for teams to join...")
-    else:
-        for team_name, team_data in game["teams"].items():
-            if game["status"] == "setup":
+    @st.fragment(run_every=config.ADMIN_TIMER_REFRESH_INTERVAL if timer_running else None)
+    @state.fragment_view("Admin", "round_timer_panel")
+    def round_timer_panel():
+        live_game = state.get_game_session(st.session_state.join_code)
+        if not live_game:
+            return
+
+        live_active, live_remaining = state.check_round_timer(st.session_state.join_code)
+
+        if live_active and live_remaining > 0:
+            st.markdown(f"""
+        <div class="timer-display">
+            ⏱️ {state.format_time_remaining(live_remaining)}
+        </div>
+        """, unsafe_allow_html=True)
+
+        elif live_active and live_remaining == 0:
+            st.markdown("""
+        <div class="timer-display" style="color: #ff4757;">
+            ⏰ TIME'S UP!
+        </div>
+        """, unsafe_allow_html=True)
+
+            if live_game["settings"]["auto_lock"] and not live_game["round_locked"]:
+                state.lock_round(st.session_state.join_code)
+                st.rerun()
+
+            # Timer just ran out: refresh the whole panel once so the controls update
+            if timer_running:
+                st.rerun()
+
+
+    @st.fragment(run_every=config.ADMIN_READINESS_REFRESH_INTERVAL if game["status"] == "running" else None)
+    @state.fragment_view("Admin", "team_readiness_list")
+    def team_readiness_list():
+        live_game = state.get_game_session(st.session_state.join_code)
+        if not live_game:
+            return
+
+        col1, col2 = st.columns([2, 1])
+
+        with col1:
+            st.markdown(f"**Teams Joined:** {len(live_game['teams'])} teams")
+
+        with col2:
+            if live_game["status"] == "setup":
+                st.markdown("**Status:** Ready to start")
+            else:
+                summary = state.get_session_summary(st.session_state.join_code)
+                st.markdown(f"**Decisions Saved:** {summary['saved_count']}/{summary['team_count']}")
+
+        if not live_game["teams"]:
+            st.info("⏳ Waiting for teams to join...")
+            return
+
+        team_items = list(live_game["teams"].items())
+
+        if state.is_large_class(live_game):
+            # Lecture hall: search instead of listing every team
+            team_query = st.text_input("🔎 Find team", key="admin_team_search", placeholder="Team name").strip().lower()
+            if team_query:
+                team_items = [(name, t) for name, t in team_items if team_query in name.lower()]
+            if len(team_items) > config.ADMIN_TEAM_LIST_LIMIT:
+                st.caption(f"Showing {config.ADMIN_TEAM_LIST_LIMIT} of {len(team_items)} teams")
+                team_items = team_items[:config.ADMIN_TEAM_LIST_LIMIT]
+
+        for team_name, team_data in team_items:
+            if live_game["status"] == "setup":
                 status_class = "status-ready"
                 status_text = "✅ Joined"
             else:
-                current_round = game.get("current_round", 1)
+                current_round = live_game.get("current_round", 1)
                 decision_saved = team_data.get("decision_saved_round") == current_round
                 auto_submitted = team_data.get("auto_submitted", False)
-                
+
                 if decision_saved:
                     if auto_submitted:
                         status_class = "status-waiting"
@@ -338,226 +311,361 @@ with tab1:
                 else:
                     status_class = "status-waiting"
                     status_text = "⏳ Deciding..."
-            
+
             col_a, col_b = st.columns([3, 1])
-            
+
             with col_a:
                 st.markdown(f"""
-                <div class="team-list-item">
-                    <div>
-                        <strong style="font-size: 18px; color: #333;">{team_name}</strong><br>
-                        <span style="color: #666; font-size: 14px;">
-                            Joined: {team_data.get('joined_at', 'Unknown')[:19]}
-                        </span>
-                    </div>
-                    <span class="{status_class}">{status_text}</span>
+            <div class="team-list-item">
+                <div>
+                    <strong style="font-size: 18px; color: #333;">{team_name}</strong><br>
+                    <span style="color: #666; font-size: 14px;">
+                        Joined: {team_data.get('joined_at', 'Unknown')[:19]}
+                    </span>
                 </div>
-                """, unsafe_allow_html=True)
-            
+                <span class="{status_class}">{status_text}</span>
+            </div>
+            """, unsafe_allow_html=True)
+
             with col_b:
                 if st.button("🗑️ Remove", key=f"remove_{team_name}"):
                     state.remove_team_from_game(st.session_state.join_code, team_name)
                     st.rerun()
+
+
+    @st.fragment(run_every=config.ADMIN_READINESS_REFRESH_INTERVAL if game["status"] == "running" else None)
+    @state.fragment_view("Admin", "round_readiness_panel")
+    def round_readiness_panel():
+        live_game = state.get_game_session(st.session_state.join_code)
+        if not live_game:
+            return
+
+        col1, col2 = st.columns(2)
+
+        with col1:
+            lock_status = "🔒 LOCKED" if live_game["round_locked"] else "🔓 UNLOCKED"
+            st.markdown(f"""
+        <div class="admin-card">
+            <h3 style="color: #667eea;">Round Status</h3>
+            <p style="font-size: 24px; font-weight: 800; color: #333; margin: 6px 0 0 0;">
+                {lock_status}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        summary = state.get_session_summary(st.session_state.join_code)
+
+        with col2:
+            saved_count = summary["saved_count"]
+            total_teams = summary["team_count"]
+            all_saved = (total_teams > 0 and saved_count == total_teams)
+
+            st.markdown(f"""
+        <div class="admin-card">
+            <h3 style="color: #667eea;">Decisions Saved</h3>
+            <p style="font-size: 24px; font-weight: 800; color: {'#00ff88' if all_saved else '#ffa502'}; margin: 6px 0 0 0;">
+                {saved_count} / {total_teams}
+            </p>
+        </div>
+        """, unsafe_allow_html=True)
+
+        if live_game["teams"]:
+            current_round = live_game.get("current_round", 1)
+            missing = [name for name, t in live_game["teams"].items() if t.get("decision_saved_round") != current_round]
+            if len(missing) > config.ADMIN_TEAM_LIST_LIMIT:
+                shown = ", ".join(missing[:config.ADMIN_TEAM_LIST_LIMIT])
+                st.info(f"⏳ Waiting on: {shown} and {len(missing) - config.ADMIN_TEAM_LIST_LIMIT} more")
+            elif missing:
+                st.info("⏳ Waiting on: " + ", ".join(missing))
+            else:
+                st.success("✅ All teams have saved decisions!")
+
+            if summary["auto_submitted_count"]:
+                st.caption(f"⚠️ Auto-submitted: {summary['auto_submitted_count']}")
+
+            if state.are_all_teams_ready(st.session_state.join_code):
+                st.caption(f"🙋 All {total_teams} teams marked ready")
+            else:
+                st.caption(f"🙋 Ready: {state.get_ready_team_count(st.session_state.join_code)}/{total_teams}")
+
+    if (game["status"] == "finished" and config.PREBUILD_EXPORT_ON_FINISH
+            and export_cache.get_export(st.session_state.join_code, "xlsx") is None):
+        export_cache.request_export(st.session_state.join_code, "xlsx")
+
+    export_building = export_cache.is_building(st.session_state.join_code)
+
+
+    @st.fragment(run_every=1 if export_building else None)
+    @state.fragment_view("Admin", "export_panel")
+    def export_panel():
+        join_code = st.session_state.join_code
+
+        if export_building and not export_cache.is_building(join_code):
+            # Build just finished: one full rerun so this panel stops polling
+            st.rerun()
+
+        fmt_key = st.selectbox(
+            "Format",
+            list(export_cache.EXPORT_FORMATS),
+            format_func=lambda k: export_cache.EXPORT_FORMATS[k]["label"],
+            key="export_format"
+        )
+        fmt = export_cache.EXPORT_FORMATS[fmt_key]
+        entry = export_cache.get_export(join_code, fmt_key)
+        latest = export_cache.get_latest_export(join_code, fmt_key)
+
+        if entry and entry["status"] == "building":
+            st.progress(entry["progress"], text=f"⏳ Building {fmt['label']} export...")
+        elif entry and entry["status"] == "failed":
+            st.error(f"❌ Export failed: {entry['error']}")
+
+        if latest:
+            st.download_button(
+                label=f"💾 Download {fmt['label']}",
+                data=lambda: latest["data"],
+                file_name=f"game_results_{game['game_type']}_{join_code}.{fmt['extension']}",
+                mime=fmt["mime"],
+                width="stretch",
+                type="primary"
+            )
+            built_at = datetime.fromtimestamp(latest["finished_at"]).strftime("%H:%M:%S")
+            if latest is entry:
+                st.caption(f"Up to date (built {built_at})")
+            else:
+                st.caption(f"Built {built_at}; game data has changed since")
+
+        if entry is None or entry["status"] == "failed":
+            label = f"🔄 Rebuild {fmt['label']}" if latest else f"📊 Prepare {fmt['label']}"
+            if st.button(label, width="stretch"):
+                export_cache.request_export(join_code, fmt_key)
+                st.rerun()
+
+    with st.sidebar:
+        st.markdown("## 🎮 Game Info")
+    
+        game_names = {
+            "build_country": "🌍 Build a Country",
+            "beat_market": "📈 Beat the Market",
+            "crypto_crash": "₿ Crypto Crash"
+        }
+    
+        st.markdown(f"**Game:** {game_names.get(game['game_type'], game['game_type'])}")
+        st.markdown(f"**Status:** {game['status'].upper()}")
+        st.markdown(f"**Teams:** {len(game['teams'])}")
+        st.markdown(f"**Round:** {game['current_round']}/{game['settings']['num_rounds']}")
+    
+        st.markdown("---")
+    
+        st.markdown("## ⚙️ Settings")
+        st.markdown(f"**Rounds:** {game['settings']['num_rounds']}")
+        st.markdown(f"**Round Duration:** {game['settings']['round_duration']}s")
+        st.markdown(f"**Auto-lock:** {'Yes' if game['settings']['auto_lock'] else 'No'}")
+    
+        if game["game_type"] == "beat_market":
+            st.markdown(f"**ESG Mode:** {'Yes' if game['settings'].get('esg_mode') else 'No'}")
     
-    st.markdown("---")
+            st.markdown("---")
     
-    if game["status"] == "setup":
-        if len(game["teams"]) < 1:
-            st.warning("⚠️ Need at least 1 team to start!")
+        # ✅ NEW: Export Results
+        st.markdown("## 📥 Export Results")
+    
+        if game["status"] in ["running", "finished"]:
+            export_panel()
         else:
-            _, mid, _ = st.columns([1, 1, 1])
-            with mid:
-                if st.button("▶️ START GAME", use_container_width=True, type="primary"):
-                    state.update_game_session(st.session_state.join_code, {
-                        "status": "running",
-                        "current_round": 0,
-                        "round_locked": False,
-                        "round_timer_end": None
-                    })
+            st.info("Start the game to enable export")
+        
+        st.markdown("---")
+    
+        if st.button("🚪 End Game & Return Home", width="stretch"):
+            if st.session_state.get("confirm_end"):
+                state.delete_game_session(st.session_state.join_code)
+                export_cache.drop_exports(st.session_state.join_code)
+                state.clear_user_session()
+                st.rerun()
+            else:
+                st.session_state.confirm_end = True
+                st.warning("Click again to confirm")
+
+    # ✅ NEW: 3-tab layout (added "Team QR Codes" tab)
+    tab1, tab2, tab3 = st.tabs(["📋 Team Management", "🎮 Round Control", "🔗 Team QR Codes"])
+
+    with tab1:
+        st.markdown("### 👥 Team Management")
+    
+        team_readiness_list()
+    
+        st.markdown("---")
+    
+        if game["status"] == "setup":
+            if len(game["teams"]) < 1:
+                st.warning("⚠️ Need at least 1 team to start!")
+            else:
+                _, mid, _ = st.columns([1, 1, 1])
+                with mid:
+                    if st.button("▶️ START GAME", width="stretch", type="primary"):
+                        state.update_game_session(st.session_state.join_code, {
+                            "status": "running",
+                            "current_round": 0,
+                            "round_locked": False,
+                            "round_timer_end": None
+                        })
                     
-                    state.advance_round(st.session_state.join_code)
+                        state.advance_round(st.session_state.join_code)
                     
-                    duration = game["settings"]["round_duration"]
-                    state.start_round_timer(st.session_state.join_code, duration)
+                        duration = game["settings"]["round_duration"]
+                        state.start_round_timer(st.session_state.join_code, duration)
                     
-                    st.success(f"✅ Game started! Round 1 timer: {duration}s")
-                    time.sleep(0.8)
-                    st.rerun()
+                        st.success(f"✅ Game started! Round 1 timer: {duration}s")
+                        time.sleep(0.8)
+                        st.rerun()
 
-with tab2:
-    st.markdown("### 🎮 Round Control")
+    with tab2:
+        st.markdown("### 🎮 Round Control")
     
-    if game["status"] != "running":
-        st.info("ℹ️ Start the game first from Team Management tab")
-    else:
-        st.markdown(f"""
+        if game["status"] != "running":
+            st.info("ℹ️ Start the game first from Team Management tab")
+        else:
+            st.markdown(f"""
         <div style="text-align: center;">
             <span class="round-badge">Round {game['current_round']} / {game['settings']['num_rounds']}</span>
         </div>
         """, unsafe_allow_html=True)
         
-        timer_active, remaining = state.check_round_timer(st.session_state.join_code)
-        
-        if timer_active and remaining > 0:
-            st.markdown(f"""
-            <div class="timer-display">
-                ⏱️ {state.format_time_remaining(remaining)}
-            </div>
-            """, unsafe_allow_html=True)
-        
-        elif timer_active and remaining == 0:
-            st.markdown("""
-            <div class="timer-display" style="color: #ff4757;">
-                ⏰ TIME'S UP!
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if game["settings"]["auto_lock"] and not game["round_locked"]:
-                state.lock_round(st.session_state.join_code)
-                st.rerun()
-        
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            lock_status = "🔒 LOCKED" if game["round_locked"] else "🔓 UNLOCKED"
-            st.markdown(f"""
-            <div class="admin-card">
-                <h3 style="color: #667eea;">Round Status</h3>
-                <p style="font-size: 24px; font-weight: 800; color: #333; margin: 6px 0 0 0;">
-                    {lock_status}
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
-        
-        with col2:
-            current_round = game.get("current_round", 1)
-            saved_count = sum(1 for t in game["teams"].values() if t.get("decision_saved_round") == current_round)
-            total_teams = len(game["teams"])
-            all_saved = (total_teams > 0 and saved_count == total_teams)
-            
-            st.markdown(f"""
-            <div class="admin-card">
-                <h3 style="color: #667eea;">Decisions Saved</h3>
-                <p style="font-size: 24px; font-weight: 800; color: {'#00ff88' if all_saved else '#ffa502'}; margin: 6px 0 0 0;">
-                    {saved_count} / {total_teams}
-                </p>
-            </div>
-            """, unsafe_allow_html=True)
+            round_timer_panel()
         
-        if game["teams"]:
-            current_round = game.get("current_round", 1)
-            missing = [name for name, t in game["teams"].items() if t.get("decision_saved_round") != current_round]
-            if missing:
-                st.info("⏳ Waiting on: " + ", ".join(missing))
-            else:
-                st.success("✅ All teams have saved decisions!")
+            round_readiness_panel()
         
-        st.markdown("---")
+            st.markdown("---")
         
-        st.markdown("#### ⏱️ Timer Control")
+            st.markdown("#### ⏱️ Timer Control")
         
-        timer_col1, timer_col2 = st.columns([2, 1])
+            timer_col1, timer_col2 = st.columns([2, 1])
         
-        with timer_col1:
-            if timer_active and remaining > 0:
-                st.info(f"⏱️ Timer running: {state.format_time_remaining(remaining)} remaining")
-            elif timer_active and remaining == 0:
-                st.warning("⏰ Timer expired!")
-            else:
-                st.info("⏱️ No timer active for this round")
+            with timer_col1:
+                if timer_active and remaining > 0:
+                    timer_end = datetime.fromisoformat(game["round_timer_end"]).strftime("%H:%M:%S")
+                    st.info(f"⏱️ Timer running until {timer_end}")
+                elif timer_active and remaining == 0:
+                    st.warning("⏰ Timer expired!")
+                else:
+                    st.info("⏱️ No timer active for this round")
         
-        with timer_col2:
-            if (not timer_active) or (remaining <= 0):
-                if st.button("▶️ Start Timer", use_container_width=True, type="primary", key="start_timer_btn"):
-                    duration = game["settings"]["round_duration"]
-                    state.start_round_timer(st.session_state.join_code, duration)
-                    st.success(f"✅ Timer started: {duration}s")
-                    time.sleep(0.5)
-                    st.rerun()
-            else:
-                if st.button("⏹️ Stop Timer", use_container_width=True, key="stop_timer_btn"):
-                    state.update_game_session(st.session_state.join_code, {"round_timer_end": None})
-                    st.success("✅ Timer stopped")
-                    time.sleep(0.5)
-                    st.rerun()
+            with timer_col2:
+                if (not timer_active) or (remaining <= 0):
+                    if st.button("▶️ Start Timer", width="stretch", type="primary", key="start_timer_btn"):
+                        duration = game["settings"]["round_duration"]
+                        state.start_round_timer(st.session_state.join_code, duration)
+                        st.success(f"✅ Timer started: {duration}s")
+                        time.sleep(0.5)
+                        st.rerun()
+                else:
+                    if st.button("⏹️ Stop Timer", width="stretch", key="stop_timer_btn"):
+                        state.update_game_session(st.session_state.join_code, {"round_timer_end": None})
+                        st.success("✅ Timer stopped")
+                        time.sleep(0.5)
+                        st.rerun()
         
-        st.markdown("---")
+            st.markdown("---")
         
-        btn1, btn2 = st.columns(2)
+            btn1, btn2 = st.columns(2)
         
-        with btn1:
-            if game["round_locked"]:
-                if st.button("🔓 Unlock Round", use_container_width=True):
-                    state.unlock_round(st.session_state.join_code)
-                    st.rerun()
-            else:
-                if st.button("🔒 Lock Round", use_container_width=True):
-                    state.lock_round(st.session_state.join_code)
-                    st.rerun()
+            with btn1:
+                if game["round_locked"]:
+                    if st.button("🔓 Unlock Round", width="stretch"):
+                        state.unlock_round(st.session_state.join_code)
+                        st.rerun()
+                else:
+                    if st.button("🔒 Lock Round", width="stretch"):
+                        state.lock_round(st.session_state.join_code)
+                        st.rerun()
         
-        with btn2:
-            if game["current_round"] < game["settings"]["num_rounds"]:
-                if st.button("⏭️ Next Round", use_container_width=True, type="primary"):
-                    state.advance_round(st.session_state.join_code)
+            with btn2:
+                if game["current_round"] < game["settings"]["num_rounds"]:
+                    if st.button("⏭️ Next Round", width="stretch", type="primary"):
+                        state.advance_round(st.session_state.join_code)
                     
-                    duration = game["settings"]["round_duration"]
-                    state.start_round_timer(st.session_state.join_code, duration)
+                        duration = game["settings"]["round_duration"]
+                        state.start_round_timer(st.session_state.join_code, duration)
                     
-                    st.success("✅ Next round started! Timer running.")
-                    time.sleep(0.8)
-                    st.rerun()
-            else:
-                if st.button("🏁 Finish Game", use_container_width=True, type="primary"):
-                    state.process_current_round(st.session_state.join_code)
-                    # Store final round history snapshot
-                    state._store_round_snapshot(st.session_state.join_code, game["current_round"])
-
-                    state.update_game_session(st.session_state.join_code, {
-                        "status": "finished",
-                        "round_locked": True,
-                        "round_timer_end": None
-                    })
+                        st.success("✅ Next round started! Timer running.")
+                        time.sleep(0.8)
+                        st.rerun()
+                else:
+                    if st.button("🏁 Finish Game", width="stretch", type="primary"):
+                        state.process_current_round(st.session_state.join_code)
+                        # Store final round history snapshot
+                        state._store_round_snapshot(st.session_state.join_code, game["current_round"])
+
+                        state.update_game_session(st.session_state.join_code, {
+                            "status": "finished",
+                            "round_locked": True,
+                            "round_timer_end": None
+                        })
+
+                        if config.ARCHIVE_ON_FINISH:
+                            import warehouse  # pyarrow is slow to import: only when archiving
+                            warehouse.archive_session(st.session_state.join_code)
                     
-                    st.success("🎉 Game finished! Final results saved.")
-                    time.sleep(0.8)
-                    st.rerun()
+                        st.success("🎉 Game finished! Final results saved.")
+                        time.sleep(0.8)
+                        st.rerun()
 
-# ✅ NEW TAB: Team QR Codes
-with tab3:
-    st.markdown("### 🔗 Team QR Codes & Links")
-    st.info("💡 **Use this if teams lose their QR codes or close their browser**")
+    # ✅ NEW TAB: Team QR Codes
+    with tab3:
+        st.markdown("### 🔗 Team QR Codes & Links")
+        st.info("💡 **Use this if teams lose their QR codes or close their browser**")
     
-    if not game.get("team_codes"):
-        st.warning("⚠️ No team codes found for this game.")
-    else:
-        # Get base URL
-        origin = st_javascript("await window.location.origin")
-        base_url = origin or "http://localhost:8501"
+        if not game.get("team_codes"):
+            st.warning("⚠️ No team codes found for this game.")
+        else:
+            # Get base URL
+            from streamlit_javascript import st_javascript
+            origin = st_javascript("await window.location.origin")
+            base_url = origin or "http://localhost:8501"
+        
+            team_codes_list = sorted(game["team_codes"].items(), key=lambda x: x[1]["team_slot"])
+            shown_codes_list = team_codes_list
         
-        team_codes_list = sorted(game["team_codes"].items(), key=lambda x: x[1]["team_slot"])
+            if len(team_codes_list) > config.LARGE_CLASS_THRESHOLD:
+                # Lecture hall: look teams up instead of rendering every QR code
+                code_query = st.text_input(
+                    "🔎 Find team (slot, name or code)",
+                    key="admin_qr_search",
+                    placeholder="e.g. 42, Awesome Economists, AB12CD"
+                ).strip().lower()
+            
+                if code_query:
+                    shown_codes_list = [
+                        (code, info) for code, info in team_codes_list
+                        if code_query in (str(info["team_slot"]), code.lower(), (info.get("team_name") or "").lower())
+                        or code_query in (info.get("team_name") or "").lower()
+                    ][:config.ADMIN_TEAM_LIST_LIMIT]
+                else:
+                    shown_codes_list = []
+                    st.caption(f"{len(team_codes_list)} team codes - search for a team, or use the printable sheet below.")
         
-        # Display in 2 columns
-        cols_per_row = 2
+            # Display in 2 columns
+            cols_per_row = 2
         
-        for i in range(0, len(team_codes_list), cols_per_row):
-            cols = st.columns(cols_per_row)
+            for i in range(0, len(shown_codes_list), cols_per_row):
+                cols = st.columns(cols_per_row)
             
-            for j, col in enumerate(cols):
-                if i + j >= len(team_codes_list):
-                    continue
+                for j, col in enumerate(cols):
+                    if i + j >= len(shown_codes_list):
+                        continue
                 
-                code, info = team_codes_list[i + j]
-                team_slot = info["team_slot"]
-                team_name = info.get("team_name", "Not joined yet")
-                assigned = info["assigned"]
-                team_url = f"{base_url}/?team_code={code}"
+                    code, info = shown_codes_list[i + j]
+                    team_slot = info["team_slot"]
+                    team_name = info.get("team_name", "Not joined yet")
+                    assigned = info["assigned"]
+                    team_url = f"{base_url}/?team_code={code}"
                 
-                with col:
-                    # Status color
-                    status_color = "#00ff88" if assigned else "#ffa502"
-                    status_text = f"✅ {team_name}" if assigned else "⏳ Waiting to join"
+                    with col:
+                        # Status color
+                        status_color = "#00ff88" if assigned else "#ffa502"
+                        status_text = f"✅ {team_name}" if assigned else "⏳ Waiting to join"
                     
-                    st.markdown(f"""
+                        st.markdown(f"""
                     <div class="qr-mini-card">
                         <h3 style="color: #667eea; margin: 0 0 10px 0;">Team {team_slot}</h3>
                         <p style="color: {status_color}; font-weight: 700; margin: 5px 0;">
@@ -566,38 +674,75 @@ with tab3:
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    # Generate and display QR code
-                    qr_img = generate_qr_code(team_url)
+                        # Generate and display QR code
+                        qr_img = generate_qr_code(team_url)
                     
-                    st.markdown(
-                        f"""
+                        st.markdown(
+                            f"""
                         <div style="text-align: center; margin: 10px 0;">
                             <a href="{team_url}" target="_blank" class="qr-clickable">
                                 <img src="{qr_img}" width="180" style="border-radius: 10px; border: 2px solid #667eea;">
                             </a>
                         </div>
                         """,
-                        unsafe_allow_html=True
-                    )
+                            unsafe_allow_html=True
+                        )
                     
-                    # Copyable link
-                    st.text_input(
-                        f"Team {team_slot} Link",
-                        value=team_url,
-                        key=f"link_{code}",
-                        label_visibility="collapsed"
-                    )
+                        # Copyable link
+                        st.text_input(
+                            f"Team {team_slot} Link",
+                            value=team_url,
+                            key=f"link_{code}",
+                            label_visibility="collapsed"
+                        )
                     
-                    # Copy button
-                    if st.button(f"📋 Copy Link", key=f"copy_{code}", use_container_width=True):
-                        st.success("✅ Link copied! (Share with team)")
+                        # Copy button
+                        if st.button(f"📋 Copy Link", key=f"copy_{code}", width="stretch"):
+                            st.success("✅ Link copied! (Share with team)")
         
-        st.markdown("---")
+            st.markdown("---")
         
-        # All links in one text area for bulk sharing
-        st.markdown("### 📋 All Team Links (for bulk sharing)")
-        all_links = "\n".join([
-            f"Team {info['team_slot']}: {base_url}/?team_code={code}"
-            for code, info in sorted(team_codes_list, key=lambda x: x[1]["team_slot"])
-        ])
-        st.text_area("Copy all links:", value=all_links, height=150, label_visibility="collapsed")
\ No newline at end of file
+            # All links in one text area for bulk sharing
+            st.markdown("### 📋 All Team Links (for bulk sharing)")
+            all_links = "\n".join([
+                f"Team {info['team_slot']}: {base_url}/?team_code={code}"
+                for code, info in sorted(team_codes_list, key=lambda x: x[1]["team_slot"])
+            ])
+            st.text_area("Copy all links:", value=all_links, height=150, label_visibility="collapsed")        
+            st.markdown("---")
+        
+            # Printable sheet with every team's QR code (rendered in bulk, cached)
+            st.markdown("### 🖨️ Printable Team Code Sheet")
+            sheet_col1, sheet_col2 = st.columns([1, 2])
+        
+            with sheet_col1:
+                sheet_format = st.radio(
+                    "Sheet format",
+                    ["PDF", "ZIP"],
+                    horizontal=True,
+                    key="team_sheet_format",
+                    label_visibility="collapsed"
+                )
+        
+            with sheet_col2:
+                if st.button("🖨️ Build Team Code Sheet", width="stretch", key="build_team_sheet"):
+                    try:
+                        import qr_codes
+
+                        with st.spinner("Rendering team QR codes..."):
+                            sheet_data = qr_codes.build_team_code_sheet(
+                                game["team_codes"],
+                                base_url,
+                                fmt=sheet_format.lower(),
+                                title=f"Team Join Codes - Game {st.session_state.join_code}"
+                            )
+                    
+                        st.download_button(
+                            label=f"💾 Download {sheet_format}",
+                            data=sheet_data,
+                            file_name=f"team_codes_{st.session_state.join_code}.{sheet_format.lower()}",
+                            mime="application/pdf" if sheet_format == "PDF" else "application/zip",
+                            width="stretch"
+                        )
+                    except Exception as e:
+                        st.error(f"❌ Error: {str(e)}")
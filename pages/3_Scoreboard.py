@@ -4,7 +4,10 @@ Scoreboard Page - Live view of all team standings and scores
 
 import streamlit as st
 import shared_state as state
+import profiling
+import config
 import time
+from html import escape
 
 from streamlit_autorefresh import st_autorefresh
 
@@ -16,12 +19,12 @@ st.set_page_config(
 
 # Initialize
 state.init_user_session()
+with state.page_view("Scoreboard"), profiling.page_profile("Scoreboard"):
+    # Auto-refresh every 3 seconds
+    st_autorefresh(interval=3000, key="scoreboard_refresh")
 
-# Auto-refresh every 3 seconds
-st_autorefresh(interval=3000, key="scoreboard_refresh")
-
-# Custom CSS
-st.markdown("""
+    # Custom CSS
+    st.markdown("""
 <style>
     @import url('https://fonts.googleapis.com/css2?family=Orbitron:wght@700;900&family=Poppins:wght@600;700&display=swap');.main {
         background: linear-gradient(135deg, #0f2027 0%, #203a43 50%, #2c5364 100%);
@@ -84,138 +87,169 @@ st.markdown("""
         margin: 5px 0;
         font-size: 14px;
         color: #1a1a1a;
+    }.lb-table {
+        width: 100%;
+        border-collapse: collapse;
+        font-family: 'Poppins', sans-serif;
+        color: #e8e8e8;
+    }.lb-table th {
+        text-align: left;
+        color: #00ff88;
+        font-size: 14px;
+        text-transform: uppercase;
+        letter-spacing: 1px;
+        padding: 8px 12px;
+        border-bottom: 2px solid #00ff88;
+    }.lb-table td {
+        padding: 8px 12px;
+        font-size: 18px;
+        border-bottom: 1px solid rgba(255, 255, 255, 0.08);
+    }.lb-top td {
+        font-size: 22px;
+        font-weight: 700;
+    }.lb-highlight td {
+        background: rgba(255, 215, 0, 0.25);
+        color: #ffd700;
+    }.lb-section td {
+        color: #aaa;
+        font-size: 14px;
+        text-align: center;
+        padding-top: 16px;
     }
 </style>
 """, unsafe_allow_html=True)
 
-# ============================================================================
-# SCOREBOARD DISPLAY FUNCTIONS (DISPLAY ONLY - NO STORAGE)
-# ============================================================================
-
-def show_build_country_scoreboard(game):
-    if not game.get("teams"):
-        st.info("⏳ Waiting for teams to join...")
-        return
-
-    # Calculate current scores (USE SHARED scoring function)
-    scores = []
-    for team_name, team_data in game["teams"].items():
-        score = float(state.compute_build_country_score(team_data))
-        scores.append({
-            "team": team_name,
-            "score": score,
-            "data": team_data
-        })
-
-    scores.sort(key=lambda x: x["score"], reverse=True)
-
-    # Display rankings
-    for rank, item in enumerate(scores, 1):
-        team_name = item["team"]
-        team_data = item["data"]
-        score = item["score"]
-
-        medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
-        card_class = f"rank-{rank}" if rank <= 3 else "scoreboard-card"
-        name_color = "#0f2027" if rank <= 3 else "#00ff88"
+    # ============================================================================
+    # SCOREBOARD DISPLAY FUNCTIONS (DISPLAY ONLY - NO STORAGE)
+    # ============================================================================
 
-        st.markdown(f"""
+    def rank_change_badge(entry: dict) -> str:
+        """Small ▲/▼ marker for rank movement since the previous round"""
+        delta = entry.get("rank_delta", 0)
+        if delta > 0:
+            return f'<span style="font-size:20px; color:#00c96b; margin-left:10px;">▲{delta}</span>'
+        if delta < 0:
+            return f'<span style="font-size:20px; color:#ff4757; margin-left:10px;">▼{-delta}</span>'
+        return ""
+
+
+    def show_build_country_scoreboard(game):
+        if not game.get("teams"):
+            st.info("⏳ Waiting for teams to join...")
+            return
+
+        # Ranks are maintained by shared_state when rounds are processed
+        leaderboard = state.get_ranked_leaderboard(game)
+
+        # Display rankings
+        for entry in leaderboard["entries"]:
+            rank = entry["rank"]
+            team_name = entry["team"]
+            team_data = game["teams"][team_name]
+            score = entry["score"]
+
+            medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
+            card_class = f"rank-{rank}" if rank <= 3 else "scoreboard-card"
+            name_color = "#0f2027" if rank <= 3 else "#00ff88"
+
+            st.markdown(f"""
         <div class="{card_class}">
             <div style="display:flex; justify-content:space-between; align-items:center;">
                 <div>
                     <span style="font-size:48px;">{medal}</span>
                     <span class="team-name-display" style="color:{name_color};">{team_name}</span>
+                    {rank_change_badge(entry)}
                 </div>
                 <div class="metric-value" style="color:{name_color};">{score:.1f}</div>
             </div>
         </div>
         """, unsafe_allow_html=True)
 
-        # Current metrics (+ fiscal)
-        metrics = team_data.get("metrics", {})
-        fiscal = team_data.get("fiscal", {})
+            # Current metrics (+ fiscal)
+            metrics = team_data.get("metrics", {})
+            fiscal = team_data.get("fiscal", {})
 
-        cols = st.columns(6)
-        with cols[0]:
-            st.markdown(f"""
+            cols = st.columns(6)
+            with cols[0]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{float(metrics.get('gdp', 100)):.1f}</div>
                 <div class="metric-label">💰 GDP</div>
             </div>
             """, unsafe_allow_html=True)
-        with cols[1]:
-            st.markdown(f"""
+            with cols[1]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{float(metrics.get('employment', 75)):.1f}%</div>
                 <div class="metric-label">👷 Employment</div>
             </div>
             """, unsafe_allow_html=True)
-        with cols[2]:
-            st.markdown(f"""
+            with cols[2]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{float(metrics.get('inequality', 50)):.1f}</div>
                 <div class="metric-label">⚖️ Inequality</div>
             </div>
             """, unsafe_allow_html=True)
-        with cols[3]:
-            st.markdown(f"""
+            with cols[3]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{float(metrics.get('approval', 50)):.1f}%</div>
                 <div class="metric-label">❤️ Approval</div>
             </div>
             """, unsafe_allow_html=True)
-        with cols[4]:
-            st.markdown(f"""
+            with cols[4]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{float(metrics.get('debt', 0)):.0f}%</div>
                 <div class="metric-label">🏦 Debt %GDP</div>
             </div>
             """, unsafe_allow_html=True)
-        with cols[5]:
-            st.markdown(f"""
+            with cols[5]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{float(fiscal.get('deficit_pct_gdp', 0)):+.1f}%</div>
                 <div class="metric-label">📉 Deficit %GDP</div>
             </div>
             """, unsafe_allow_html=True)
 
-        # Round History (now also show fiscal + debt if present)
-        with st.expander(f"📊 {team_name} - Round History", expanded=False):
-            round_history = team_data.get("round_history", {})
-            if not round_history:
-                st.info("No history available yet - play at least one round")
-            else:
-                sorted_rounds = sorted([int(r) for r in round_history.keys()])
-                for round_num in sorted_rounds:
-                    round_data = round_history.get(str(round_num), {})
-                    if not round_data:
-                        continue
-
-                    decisions = round_data.get("decisions", {})
-                    round_metrics = round_data.get("metrics", {})
-                    round_fiscal = round_data.get("fiscal", {})
-                    round_score = float(round_data.get("score", 0))
+            # Round History (now also show fiscal + debt if present)
+            with st.expander(f"📊 {team_name} - Round History", expanded=False):
+                round_history = team_data.get("round_history", {})
+                if not round_history:
+                    st.info("No history available yet - play at least one round")
+                else:
+                    sorted_rounds = sorted([int(r) for r in round_history.keys()])
+                    for round_num in sorted_rounds:
+                        round_data = round_history.get(str(round_num), {})
+                        if not round_data:
+                            continue
+
+                        decisions = round_data.get("decisions", {})
+                        round_metrics = round_data.get("metrics", {})
+                        round_fiscal = round_data.get("fiscal", {})
+                        round_score = float(round_data.get("score", 0))
 
-                    st.markdown(f"""
+                        st.markdown(f"""
                     <div class="round-history-card">
                         <h4 style="color: #00ff88; margin: 0 0 10px 0;">Round {round_num} - Score: {round_score:.1f}</h4>
                     </div>
                     """, unsafe_allow_html=True)
 
-                    col1, col2 = st.columns(2)
+                        col1, col2 = st.columns(2)
 
-                    with col1:
-                        st.markdown("**Decisions:**")
-                        st.markdown(f"""
+                        with col1:
+                            st.markdown("**Decisions:**")
+                            st.markdown(f"""
                         <div class="decision-item">💵 Tax Rate: {decisions.get('tax_rate', 30)}%</div>
                         <div class="decision-item">📚 Education (slider): {decisions.get('education_spending', 25)}</div>
                         <div class="decision-item">🏗️ Infrastructure (slider): {decisions.get('infrastructure_spending', 25)}</div>
                         <div class="decision-item">🌱 Climate: {decisions.get('climate_policy', 'Moderate')}</div>
                         """, unsafe_allow_html=True)
 
-                    with col2:
-                        st.markdown("**Results:**")
-                        st.markdown(f"""
+                        with col2:
+                            st.markdown("**Results:**")
+                            st.markdown(f"""
                         <div class="decision-item">💰 GDP: {float(round_metrics.get('gdp', 100)):.1f}</div>
                         <div class="decision-item">👷 Employment: {float(round_metrics.get('employment', 75)):.1f}%</div>
                         <div class="decision-item">⚖️ Inequality: {float(round_metrics.get('inequality', 50)):.1f}</div>
@@ -224,274 +258,254 @@ def show_build_country_scoreboard(game):
                         <div class="decision-item">📉 Deficit %GDP: {float(round_fiscal.get('deficit_pct_gdp', 0)):+.1f}%</div>
                         """, unsafe_allow_html=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown("<br>", unsafe_allow_html=True)
 
 
 
-def show_beat_market_scoreboard(game):
-    if not game.get("teams"):
-        st.info("⏳ Waiting for teams to join...")
-        return
+    def show_beat_market_scoreboard(game):
+        if not game.get("teams"):
+            st.info("⏳ Waiting for teams to join...")
+            return
 
-    esg_mode = bool(game.get("settings", {}).get("esg_mode"))
+        esg_mode = bool(game.get("settings", {}).get("esg_mode"))
     
-    scores = []
-    for team_name, team_data in game["teams"].items():
-        portfolio_value = team_data.get("portfolio_value", {})
-        returns = float(portfolio_value.get("returns", 0.0))
-        risk = float(portfolio_value.get("risk", 50.0))
-        score = (returns / max(1.0, risk)) * 100.0 if risk > 0 else returns
-
-        scores.append({
-            "team": team_name,
-            "score": score,
-            "data": team_data
-        })
-
-    scores.sort(key=lambda x: x["score"], reverse=True)
-
-    for rank, item in enumerate(scores, 1):
-        team_name = item["team"]
-        team_data = item["data"]
-        score = item["score"]
+        leaderboard = state.get_ranked_leaderboard(game)
+
+        for entry in leaderboard["entries"]:
+            rank = entry["rank"]
+            team_name = entry["team"]
+            team_data = game["teams"][team_name]
+            score = entry["score"]
         
-        medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
-        card_class = f"rank-{rank}" if rank <= 3 else "scoreboard-card"
-        name_color = "#0f2027" if rank <= 3 else "#00ff88"
+            medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
+            card_class = f"rank-{rank}" if rank <= 3 else "scoreboard-card"
+            name_color = "#0f2027" if rank <= 3 else "#00ff88"
 
-        st.markdown(f"""
+            st.markdown(f"""
         <div class="{card_class}">
             <div style="display:flex; justify-content:space-between; align-items:center;">
                 <div>
                     <span style="font-size:48px;">{medal}</span>
                     <span class="team-name-display" style="color:{name_color};">{team_name}</span>
+                    {rank_change_badge(entry)}
                 </div>
                 <div class="metric-value" style="color:{name_color};">{score:.2f}</div>
             </div>
         </div>
         """, unsafe_allow_html=True)
 
-        portfolio_value = team_data.get("portfolio_value", {})
-        cols = st.columns(5 if esg_mode else 4)
+            portfolio_value = team_data.get("portfolio_value", {})
+            cols = st.columns(5 if esg_mode else 4)
 
-        with cols[0]:
-            st.markdown(f"""
+            with cols[0]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">${portfolio_value.get('value', 1000000):,.0f}</div>
                 <div class="metric-label">💼 VALUE</div>
             </div>
             """, unsafe_allow_html=True)
 
-        with cols[1]:
-            returns = portfolio_value.get("returns", 0)
-            returns_color = "#00ff88" if returns >= 0 else "#ff4757"
-            st.markdown(f"""
+            with cols[1]:
+                returns = portfolio_value.get("returns", 0)
+                returns_color = "#00ff88" if returns >= 0 else "#ff4757"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{returns_color};">{returns:+.1f}%</div>
                 <div class="metric-label">📈 RETURNS</div>
             </div>
             """, unsafe_allow_html=True)
 
-        with cols[2]:
-            risk = portfolio_value.get("risk", 50)
-            risk_color = "#ff4757" if risk > 70 else "#ffa502" if risk > 40 else "#00ff88"
-            st.markdown(f"""
+            with cols[2]:
+                risk = portfolio_value.get("risk", 50)
+                risk_color = "#ff4757" if risk > 70 else "#ffa502" if risk > 40 else "#00ff88"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{risk_color};">{risk:.0f}/100</div>
                 <div class="metric-label">⚠️ RISK</div>
             </div>
             """, unsafe_allow_html=True)
 
-        with cols[3]:
-            st.markdown(f"""
+            with cols[3]:
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value">{score:.2f}</div>
                 <div class="metric-label">🎯 RISK-ADJ</div>
             </div>
             """, unsafe_allow_html=True)
 
-        if esg_mode:
-            with cols[4]:
-                esg = portfolio_value.get("esg", 50)
-                esg_color = "#00ff88" if esg > 70 else "#ffa502" if esg > 40 else "#ff4757"
-                st.markdown(f"""
+            if esg_mode:
+                with cols[4]:
+                    esg = portfolio_value.get("esg", 50)
+                    esg_color = "#00ff88" if esg > 70 else "#ffa502" if esg > 40 else "#ff4757"
+                    st.markdown(f"""
                 <div class="metric-display">
                     <div class="metric-value" style="color:{esg_color};">{esg:.0f}/100</div>
                     <div class="metric-label">🌱 ESG</div>
                 </div>
                 """, unsafe_allow_html=True)
 
-        # Round history
-        with st.expander(f"📊 {team_name} - Round History", expanded=False):
-            round_history = team_data.get("round_history", {})
+            # Round history
+            with st.expander(f"📊 {team_name} - Round History", expanded=False):
+                round_history = team_data.get("round_history", {})
             
-            if not round_history:
-                st.info("No history available yet - play at least one round")
-            else:
-                sorted_rounds = sorted([int(r) for r in round_history.keys()])
+                if not round_history:
+                    st.info("No history available yet - play at least one round")
+                else:
+                    sorted_rounds = sorted([int(r) for r in round_history.keys()])
                 
-                for round_num in sorted_rounds:
-                    round_data = round_history.get(str(round_num), {})
+                    for round_num in sorted_rounds:
+                        round_data = round_history.get(str(round_num), {})
                     
-                    if not round_data:
-                        continue
+                        if not round_data:
+                            continue
                     
-                    decisions = round_data.get("decisions", {})
-                    pv = round_data.get("portfolio_value", {})
-                    round_score = round_data.get("score", 0)
+                        decisions = round_data.get("decisions", {})
+                        pv = round_data.get("portfolio_value", {})
+                        round_score = round_data.get("score", 0)
                     
-                    st.markdown(f"""
+                        st.markdown(f"""
                     <div class="round-history-card">
                         <h4 style="color: #00ff88; margin: 0 0 10px 0;">Round {round_num} - Risk-Adj Score: {round_score:.2f}</h4>
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    col1, col2 = st.columns(2)
+                        col1, col2 = st.columns(2)
                     
-                    with col1:
-                        st.markdown("**Portfolio Allocation:**")
-                        st.markdown(f"""
+                        with col1:
+                            st.markdown("**Portfolio Allocation:**")
+                            st.markdown(f"""
                         <div class="decision-item">💵 Cash: {decisions.get('cash_pct', 25)}%</div>
                         <div class="decision-item">📊 Shares: {decisions.get('shares_pct', 25)}%</div>
                         <div class="decision-item">₿ Crypto: {decisions.get('crypto_pct', 25)}%</div>
                         <div class="decision-item">🏦 Bonds: {decisions.get('bonds_pct', 25)}%</div>
                         """, unsafe_allow_html=True)
                     
-                    with col2:
-                        st.markdown("**Results:**")
-                        st.markdown(f"""
+                        with col2:
+                            st.markdown("**Results:**")
+                            st.markdown(f"""
                         <div class="decision-item">💼 Value: ${pv.get('value', 1000000):,.0f}</div>
                         <div class="decision-item">📈 Returns: {pv.get('returns', 0):+.1f}%</div>
                         <div class="decision-item">⚠️ Risk: {pv.get('risk', 50):.0f}/100</div>
                         """, unsafe_allow_html=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
-
+            st.markdown("<br>", unsafe_allow_html=True)
 
-def show_crypto_crash_scoreboard(game):
-    if not game.get("teams"):
-        st.info("⏳ Waiting for teams to join...")
-        return
 
-    scores = []
-    for team_name, team_data in game["teams"].items():
-        cp = team_data.get("crypto_portfolio", {"equity": 1000.0})
-        equity = float(cp.get("equity", 1000.0))
+    def show_crypto_crash_scoreboard(game):
+        if not game.get("teams"):
+            st.info("⏳ Waiting for teams to join...")
+            return
 
-        scores.append({
-            "team": team_name,
-            "equity": equity,
-            "data": team_data
-        })
+        leaderboard = state.get_ranked_leaderboard(game)
 
-    scores.sort(key=lambda x: x["equity"], reverse=True)
-
-    for rank, item in enumerate(scores, 1):
-        team_name = item["team"]
-        team_data = item["data"]
-        equity = item["equity"]
+        for entry in leaderboard["entries"]:
+            rank = entry["rank"]
+            team_name = entry["team"]
+            team_data = game["teams"][team_name]
+            equity = entry["score"]
         
-        medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
-        card_class = f"rank-{rank}" if rank <= 3 else "scoreboard-card"
-        name_color = "#0f2027" if rank <= 3 else "#00ff88"
+            medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
+            card_class = f"rank-{rank}" if rank <= 3 else "scoreboard-card"
+            name_color = "#0f2027" if rank <= 3 else "#00ff88"
 
-        st.markdown(f"""
+            st.markdown(f"""
         <div class="{card_class}">
             <div style="display:flex; justify-content:space-between; align-items:center;">
                 <div>
                     <span style="font-size:48px;">{medal}</span>
                     <span class="team-name-display" style="color:{name_color};">{team_name}</span>
+                    {rank_change_badge(entry)}
                 </div>
                 <div class="metric-value" style="color:{name_color};">{equity:,.0f}</div>
             </div>
         </div>
         """, unsafe_allow_html=True)
 
-        cp = team_data.get("crypto_portfolio", {})
-        cols = st.columns(5)
+            cp = team_data.get("crypto_portfolio", {})
+            cols = st.columns(5)
         
-        with cols[0]:
-            equity_color = "#00ff88" if equity >= 1000 else "#ffa502" if equity >= 500 else "#ff4757"
-            st.markdown(f"""
+            with cols[0]:
+                equity_color = "#00ff88" if equity >= 1000 else "#ffa502" if equity >= 500 else "#ff4757"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{equity_color};">{equity:,.0f}</div>
                 <div class="metric-label">💼 EQUITY</div>
             </div>
             """, unsafe_allow_html=True)
         
-        with cols[1]:
-            total_ret = cp.get("total_return_pct", 0)
-            ret_color = "#00ff88" if total_ret >= 0 else "#ff4757"
-            st.markdown(f"""
+            with cols[1]:
+                total_ret = cp.get("total_return_pct", 0)
+                ret_color = "#00ff88" if total_ret >= 0 else "#ff4757"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{ret_color};">{total_ret:+.1f}%</div>
                 <div class="metric-label">📈 TOTAL RETURN</div>
             </div>
             """, unsafe_allow_html=True)
         
-        with cols[2]:
-            risk_exposure = cp.get("risk_exposure", 0)
-            risk_label = cp.get("risk_label", "Low")
-            risk_color = "#00ff88" if risk_exposure < 30 else "#ffa502" if risk_exposure < 60 else "#ff4757"
-            st.markdown(f"""
+            with cols[2]:
+                risk_exposure = cp.get("risk_exposure", 0)
+                risk_label = cp.get("risk_label", "Low")
+                risk_color = "#00ff88" if risk_exposure < 30 else "#ffa502" if risk_exposure < 60 else "#ff4757"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{risk_color};">{risk_label}</div>
                 <div class="metric-label">⚠️ RISK ({risk_exposure:.0f}/100)</div>
             </div>
             """, unsafe_allow_html=True)
         
-        with cols[3]:
-            leverage = cp.get("leverage", 1)
-            lev_color = "#00ff88" if leverage <= 2 else "#ffa502" if leverage <= 3 else "#ff4757"
-            st.markdown(f"""
+            with cols[3]:
+                leverage = cp.get("leverage", 1)
+                lev_color = "#00ff88" if leverage <= 2 else "#ffa502" if leverage <= 3 else "#ff4757"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{lev_color};">{leverage:.0f}x</div>
                 <div class="metric-label">⚡ LEVERAGE</div>
             </div>
             """, unsafe_allow_html=True)
         
-        with cols[4]:
-            liquidations = cp.get("liquidations", 0)
-            liq_color = "#00ff88" if liquidations == 0 else "#ff4757"
-            st.markdown(f"""
+            with cols[4]:
+                liquidations = cp.get("liquidations", 0)
+                liq_color = "#00ff88" if liquidations == 0 else "#ff4757"
+                st.markdown(f"""
             <div class="metric-display">
                 <div class="metric-value" style="color:{liq_color};">{liquidations}</div>
                 <div class="metric-label">🚨 LIQUIDATIONS</div>
             </div>
             """, unsafe_allow_html=True)
 
-        # Round history
-        with st.expander(f"📊 {team_name} - Round History", expanded=False):
-            round_history = team_data.get("round_history", {})
+            # Round history
+            with st.expander(f"📊 {team_name} - Round History", expanded=False):
+                round_history = team_data.get("round_history", {})
             
-            if not round_history:
-                st.info("No history available yet - play at least one round")
-            else:
-                sorted_rounds = sorted([int(r) for r in round_history.keys()])
+                if not round_history:
+                    st.info("No history available yet - play at least one round")
+                else:
+                    sorted_rounds = sorted([int(r) for r in round_history.keys()])
                 
-                for round_num in sorted_rounds:
-                    round_data = round_history.get(str(round_num), {})
+                    for round_num in sorted_rounds:
+                        round_data = round_history.get(str(round_num), {})
                     
-                    if not round_data:
-                        continue
+                        if not round_data:
+                            continue
                     
-                    decisions = round_data.get("decisions", {})
-                    alloc = decisions.get("allocations", {})
-                    leverage_used = decisions.get("leverage", 1)
-                    cp_round = round_data.get("crypto_portfolio", {})
-                    round_equity = round_data.get("score", 1000)
+                        decisions = round_data.get("decisions", {})
+                        alloc = decisions.get("allocations", {})
+                        leverage_used = decisions.get("leverage", 1)
+                        cp_round = round_data.get("crypto_portfolio", {})
+                        round_equity = round_data.get("score", 1000)
                     
-                    st.markdown(f"""
+                        st.markdown(f"""
                     <div class="round-history-card">
                         <h4 style="color: #00ff88; margin: 0 0 10px 0;">Round {round_num} - Equity: {round_equity:,.0f}</h4>
                     </div>
                     """, unsafe_allow_html=True)
                     
-                    col1, col2 = st.columns(2)
+                        col1, col2 = st.columns(2)
                     
-                    with col1:
-                        st.markdown("**Allocation:**")
-                        st.markdown(f"""
+                        with col1:
+                            st.markdown("**Allocation:**")
+                            st.markdown(f"""
                         <div class="decision-item">🟠 BTC: {alloc.get('btc', 40)}%</div>
                         <div class="decision-item">🔵 ETH: {alloc.get('eth', 30)}%</div>
                         <div class="decision-item">🟡 DOGE: {alloc.get('doge', 20)}%</div>
@@ -499,43 +513,112 @@ def show_crypto_crash_scoreboard(game):
                         <div class="decision-item">⚡ Leverage: {leverage_used}x</div>
                         """, unsafe_allow_html=True)
                     
-                    with col2:
-                        st.markdown("**Results:**")
-                        st.markdown(f"""
+                        with col2:
+                            st.markdown("**Results:**")
+                            st.markdown(f"""
                         <div class="decision-item">💼 Equity: {cp_round.get('equity', 1000):,.0f}</div>
                         <div class="decision-item">📈 Return: {cp_round.get('last_return_pct', 0):+.1f}%</div>
                         <div class="decision-item">⚠️ Risk: {cp_round.get('risk_label', 'Low')}</div>
                         <div class="decision-item">🚨 Liquidations: {cp_round.get('liquidations', 0)}</div>
                         """, unsafe_allow_html=True)
 
-        st.markdown("<br>", unsafe_allow_html=True)
+            st.markdown("<br>", unsafe_allow_html=True)
+
+
+    def _large_class_columns(game):
+        """(score header, score format, extra header, extra value fn) per game type"""
+        if game["game_type"] == "build_country":
+            return "Score", "{:.1f}", "GDP", lambda t: f"{float(t.get('metrics', {}).get('gdp', 100)):.1f}"
+        if game["game_type"] == "beat_market":
+            return "Risk-Adj", "{:.2f}", "Returns", lambda t: f"{float(t.get('portfolio_value', {}).get('returns', 0)):+.1f}%"
+        return "Equity", "{:,.0f}", "Total Return", lambda t: f"{float(t.get('crypto_portfolio', {}).get('total_return_pct', 0)):+.1f}%"
+
+
+    def show_large_class_scoreboard(game):
+        """
+    Lecture-hall scoreboard: top N, then one rotating page of the remaining
+    ranks, plus a search box - rendered as a single HTML table.
+    """
+        if not game.get("teams"):
+            st.info("⏳ Waiting for teams to join...")
+            return
+
+        entries = state.get_ranked_leaderboard(game)["entries"]
+        score_header, score_fmt, extra_header, extra_value = _large_class_columns(game)
+
+        query = st.text_input("🔎 Find your team", key="scoreboard_search", placeholder="Team name").strip().lower()
+        found = [e for e in entries if query in e["team"].lower()][:5] if query else []
+        found_teams = {e["team"] for e in found}
+
+        top_n = config.SCOREBOARD_TOP_N
+        rest = entries[top_n:]
+        page_size = config.SCOREBOARD_PAGE_SIZE
+        num_pages = max(1, -(-len(rest) // page_size))
+        page = int(time.time() // config.SCOREBOARD_PAGE_ROTATE_SECONDS) % num_pages
+        page_entries = rest[page * page_size:(page + 1) * page_size]
+
+        def row(entry, css_class=""):
+            rank = entry["rank"]
+            medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"#{rank}"
+            if entry["team"] in found_teams:
+                css_class = "lb-highlight"
+            team_data = game["teams"].get(entry["team"], {})
+            return (
+                f'<tr class="{css_class}"><td>{medal}</td>'
+                f'<td>{escape(entry["team"])}{rank_change_badge(entry)}</td>'
+                f'<td>{score_fmt.format(entry["score"])}</td>'
+                f'<td>{extra_value(team_data)}</td></tr>'
+            )
+
+        rows = [row(e, "lb-top") for e in entries[:top_n]]
+
+        if page_entries:
+            first, last = page_entries[0]["rank"], page_entries[-1]["rank"]
+            rows.append(f'<tr class="lb-section"><td colspan="4">Ranks {first}–{last} · page {page + 1} of {num_pages}</td></tr>')
+            rows.extend(row(e) for e in page_entries)
+
+        shown = {e["team"] for e in entries[:top_n]} | {e["team"] for e in page_entries}
+        extra_found = [e for e in found if e["team"] not in shown]
+        if extra_found:
+            rows.append('<tr class="lb-section"><td colspan="4">Search results</td></tr>')
+            rows.extend(row(e) for e in extra_found)
+        elif query and not found:
+            rows.append('<tr class="lb-section"><td colspan="4">No team matches your search</td></tr>')
+
+        st.markdown(f"""
+    <table class="lb-table">
+        <thead><tr><th>Rank</th><th>Team</th><th>{score_header}</th><th>{extra_header}</th></tr></thead>
+        <tbody>{"".join(rows)}</tbody>
+    </table>
+    <p style="color: #aaa; text-align: center; margin-top: 10px;">{len(entries)} teams</p>
+    """, unsafe_allow_html=True)
 
 
-# ============================================================================
-# MAIN
-# ============================================================================
+    # ============================================================================
+    # MAIN
+    # ============================================================================
 
-game = None
+    game = None
 
-# Persist which game code the scoreboard is watching
-if st.session_state.get("join_code"):
-    st.session_state["scoreboard_code"] = st.session_state["join_code"]
+    # Persist which game code the scoreboard is watching
+    if st.session_state.get("join_code"):
+        st.session_state["scoreboard_code"] = st.session_state["join_code"]
 
-# If no game code set, try to find the most recent running game
-if not st.session_state.get("scoreboard_code"):
-    all_games = state.get_all_game_sessions()
+    # If no game code set, try to find the most recent running game
+    if not st.session_state.get("scoreboard_code"):
+        all_games = state.get_all_game_sessions()
 
-    running_games = []
-    for code, g in all_games.items():
-        if g.get("status") in ["running", "finished"]:
-            running_games.append((code, g, g.get("created_at", "")))
+        running_games = []
+        for code, g in all_games.items():
+            if g.get("status") in ["running", "finished"]:
+                running_games.append((code, g, g.get("created_at", "")))
 
-    running_games.sort(key=lambda x: x[2], reverse=True)
+        running_games.sort(key=lambda x: x[2], reverse=True)
 
-    if len(running_games) >= 1:
-        st.session_state["scoreboard_code"] = running_games[0][0]
-    else:
-        st.markdown("""
+        if len(running_games) >= 1:
+            st.session_state["scoreboard_code"] = running_games[0][0]
+        else:
+            st.markdown("""
         <div style="text-align: center; padding: 20px;">
             <h1>📊 LIVE SCOREBOARD</h1>
             <p style="color: #aaa; font-size: 18px;">
@@ -543,24 +626,26 @@ if not st.session_state.get("scoreboard_code"):
             </p>
         </div>
         """, unsafe_allow_html=True)
-        st.stop()
-
-# Always re-fetch game from shared storage
-if st.session_state.get("scoreboard_code"):
-    game = state.get_game_session(st.session_state["scoreboard_code"])
-
-if not game:
-    st.session_state["scoreboard_code"] = None
-    st.rerun()
-
-# Header
-game_names = {
-    "build_country": "🌍 Build a Country",
-    "beat_market": "📈 Beat the Market",
-    "crypto_crash": "₿ Crypto Crash or Boom?"
-}
+            st.stop()
+
+    # One copy of the session per process, shared by every scoreboard viewer and
+    # re-fetched only when its version (revision or queued saves) has moved
+    if st.session_state.get("scoreboard_code"):
+        version, game = state.get_game_session_cached(st.session_state["scoreboard_code"])
+        st.session_state["scoreboard_version"] = version
+
+    if not game:
+        st.session_state["scoreboard_code"] = None
+        st.rerun()
+
+    # Header
+    game_names = {
+        "build_country": "🌍 Build a Country",
+        "beat_market": "📈 Beat the Market",
+        "crypto_crash": "₿ Crypto Crash or Boom?"
+    }
 
-st.markdown(f"""
+    st.markdown(f"""
 <div style="text-align: center; padding: 20px;">
     <h1 style="font-size: 56px;">📊 LIVE SCOREBOARD</h1>
     <h2>{game_names.get(game['game_type'], game['game_type'])}</h2>
@@ -571,23 +656,25 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-if game.get("status") == "finished":
-    st.success("🏁 Game finished — final results below.")
-
-# Scoreboard content
-if game["game_type"] == "build_country":
-    show_build_country_scoreboard(game)
-elif game["game_type"] == "beat_market":
-    show_beat_market_scoreboard(game)
-elif game["game_type"] == "crypto_crash":
-    show_crypto_crash_scoreboard(game)
-
-# Footer
-st.markdown("---")
-st.markdown(f"""
+    if game.get("status") == "finished":
+        st.success("🏁 Game finished — final results below.")
+
+    # Scoreboard content
+    if state.is_large_class(game):
+        show_large_class_scoreboard(game)
+    elif game["game_type"] == "build_country":
+        show_build_country_scoreboard(game)
+    elif game["game_type"] == "beat_market":
+        show_beat_market_scoreboard(game)
+    elif game["game_type"] == "crypto_crash":
+        show_crypto_crash_scoreboard(game)
+
+    # Footer
+    st.markdown("---")
+    st.markdown(f"""
 <div style="text-align: center; padding: 20px;">
     <p style="color: #00ff88; font-size: 14px;">
         🔄 Auto-refreshing every 3 seconds | Last update: {time.strftime("%H:%M:%S")}
     </p>
 </div>
-""", unsafe_allow_html=True)
\ No newline at end of file
+""", unsafe_allow_html=True)
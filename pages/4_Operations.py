@@ -0,0 +1,243 @@
+"""
+Operations Page - Live latency, I/O and traffic metrics of the state layer
+"""
+
+import streamlit as st
+import shared_state as state
+import instrumentation
+import memory_usage
+import config
+import tracemalloc
+import time
+from datetime import datetime
+
+st.set_page_config(
+    page_title="Operations",
+    page_icon="🛠️",
+    layout="wide"
+)
+
+state.init_user_session()
+with state.page_view("Operations"):
+
+    st.title("🛠️ Operations")
+
+    if not st.session_state.get("operations_authenticated"):
+        with st.form("operations_login"):
+            password = st.text_input("Admin Password", type="password")
+
+            if st.form_submit_button("Open Dashboard"):
+                if password != config.ADMIN_PASSWORD:
+                    st.error("❌ Invalid admin password!")
+                else:
+                    st.session_state.operations_authenticated = True
+                    st.rerun()
+        st.stop()
+
+    if not instrumentation.ENABLED:
+        st.warning(
+            "Instrumentation is off, so there is nothing to show. Set `INSTRUMENTATION_ENABLED = True` in "
+            "`config.py` (or `ECONOMICS_GAMES_INSTRUMENTATION=1`) and restart, or turn it on for this server "
+            "process until the next restart."
+        )
+        if st.button("▶️ Turn On Now"):
+            instrumentation.ENABLED = True
+            st.rerun()
+        st.stop()
+
+    DAEMON, WORKER = "State daemon", "This worker"
+    source = WORKER
+    if state.STATE_BACKEND == "server":
+        source = st.radio("State calls measured in", [DAEMON, WORKER], horizontal=True,
+                          help="The daemon does the state work (I/O, locks, scoring); "
+                               "workers only see round trips. Page traffic is always this worker's.")
+
+
+    def _format_bytes(n: float) -> str:
+        for unit in ("B", "KB", "MB", "GB"):
+            if n < 1024 or unit == "GB":
+                return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+            n /= 1024
+
+
+    def _format_bound(ms: float) -> str:
+        return f"> {instrumentation.LATENCY_BUCKETS_MS[-1]}" if ms == float("inf") else f"≤ {ms:g}"
+
+
+    def _calls_per_second(key: str, calls: int) -> float:
+        """Rate since this viewer's previous refresh"""
+        now = time.time()
+        previous = st.session_state.get(key)
+        st.session_state[key] = (now, calls)
+        if previous is None or now <= previous[0] or calls < previous[1]:
+            return 0.0
+        return (calls - previous[1]) / (now - previous[0])
+
+
+    @st.fragment(run_every=config.OPERATIONS_REFRESH_INTERVAL)
+    @state.fragment_view("Operations", "show_dashboard")
+    def show_dashboard(source: str):
+        # In-memory counters only; nothing here reads the state files
+        snapshot = state.get_instrumentation_snapshot() if source == DAEMON else instrumentation.snapshot()
+        activity = instrumentation.activity()
+        functions = snapshot["functions"]
+
+        # Only top-level calls, so nested calls aren't counted twice
+        total_calls = sum(s["calls"] for s in snapshot["sessions"].values())
+        lock_wait_ms = sum(s["lock_wait_s"] for s in functions.values()) * 1000
+
+        col1, col2, col3, col4, col5 = st.columns(5)
+        col1.metric("👀 Active Viewers", sum(activity["viewers"].values()))
+        col2.metric("🎮 Active Sessions", len(activity["sessions"]))
+        col3.metric("🔁 Reruns / s", f"{sum(activity['reruns_per_second'].values()):.1f}")
+        col4.metric("⚙️ Session Calls / s", f"{_calls_per_second(f'ops_rate_{source}', total_calls):.1f}")
+        col5.metric("🔒 Lock Wait", f"{lock_wait_ms:.0f} ms")
+
+        st.caption(f"Counting since {datetime.fromtimestamp(snapshot['since']).strftime('%H:%M:%S')}; "
+                   f"viewers and reruns over the last {config.OPERATIONS_ACTIVE_WINDOW_SECONDS}s; "
+                   f"refreshes every {config.OPERATIONS_REFRESH_INTERVAL}s")
+
+        st.markdown("### 🔁 Page Traffic")
+        pages = sorted(set(activity["reruns_per_second"]) | set(activity["viewers"]))
+        if pages:
+            st.dataframe([{"Page": page,
+                           "Reruns / s": round(activity["reruns_per_second"].get(page, 0.0), 2),
+                           "Viewers": activity["viewers"].get(page, 0)} for page in pages],
+                         hide_index=True, width="stretch")
+        else:
+            st.info("No page views yet.")
+
+        st.markdown("### ⏱️ State Operations")
+        if not functions:
+            st.info("No state calls recorded yet.")
+            return
+
+        ranked = sorted(functions.items(), key=lambda kv: kv[1]["wall_s"], reverse=True)
+        st.dataframe([{
+            "Operation": name,
+            "Calls": s["calls"],
+            "Errors": s["errors"],
+            "Mean ms": round(s["mean_ms"], 2),
+            "p50 ms": _format_bound(instrumentation.histogram_percentile(s["histogram"], 50)),
+            "p95 ms": _format_bound(instrumentation.histogram_percentile(s["histogram"], 95)),
+            "Total s": round(s["wall_s"], 2),
+            "Lock wait ms": round(s["lock_wait_s"] * 1000, 1),
+            "JSON parse ms": round(s["parse_s"] * 1000, 1),
+            "Read": _format_bytes(s["bytes_read"]),
+            "Written": _format_bytes(s["bytes_written"]),
+        } for name, s in ranked], hide_index=True, width="stretch")
+
+        names = [name for name, _ in ranked]
+        selected = st.selectbox("Latency histogram", names, key=f"ops_histogram_{source}")
+        bounds = [f"≤ {b:g} ms" for b in instrumentation.LATENCY_BUCKETS_MS] + [f"> {instrumentation.LATENCY_BUCKETS_MS[-1]} ms"]
+        st.bar_chart([{"Latency": f"{i:02d} {bound}", "Calls": count}
+                      for i, (bound, count) in enumerate(zip(bounds, functions[selected]["histogram"]))],
+                     x="Latency", y="Calls", height=220)
+
+        st.markdown("### 🎮 Sessions")
+        sessions = snapshot["sessions"]
+        codes = sorted(set(sessions) | set(activity["sessions"]),
+                       key=lambda c: sessions.get(c, {}).get("wall_s", 0.0), reverse=True)
+        if codes:
+            st.dataframe([{
+                "Join Code": code,
+                "Viewers": activity["sessions"].get(code, 0),
+                "Calls": sessions.get(code, {}).get("calls", 0),
+                "Total s": round(sessions.get(code, {}).get("wall_s", 0.0), 2),
+                "Lock wait ms": round(sessions.get(code, {}).get("lock_wait_s", 0.0) * 1000, 1),
+                "Read": _format_bytes(sessions.get(code, {}).get("bytes_read", 0)),
+                "Written": _format_bytes(sessions.get(code, {}).get("bytes_written", 0)),
+                "Size in State File": (_format_bytes(snapshot["session_bytes"][code])
+                                       if code in snapshot["session_bytes"] else "-"),
+            } for code in codes], hide_index=True, width="stretch")
+
+        st.markdown(f"### 🐢 Slowest Recent Operations (≥ {config.SLOW_CALL_MS} ms)")
+        slow = sorted(snapshot["slow_calls"], key=lambda c: c["ms"], reverse=True)[:20]
+        if slow:
+            st.dataframe([{"Time": datetime.fromtimestamp(c["at"]).strftime("%H:%M:%S"),
+                           "Operation": c["function"],
+                           "Join Code": c["join_code"] or "-",
+                           "ms": round(c["ms"], 1),
+                           "Trace": c["trace_id"] or "-"} for c in slow],
+                         hide_index=True, width="stretch")
+        else:
+            st.success("✅ No slow operations.")
+        st.caption(f"Slow page runs and their state calls, by trace: `{instrumentation.slow_log_path()}`"
+                   + (" (this worker's; the daemon writes its own)" if source == DAEMON else ""))
+
+
+    show_dashboard(source)
+
+    st.markdown("---")
+    st.markdown("### 🧠 Memory")
+    st.caption("Measured on demand: it walks every session in the state. Session sizes are for one parsed copy; "
+               "the copies Scoreboard viewers share and each viewer's st.session_state are counted separately.")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("📏 Measure Memory", width="stretch"):
+            st.session_state.ops_memory_report = memory_usage.memory_report()
+    with col2:
+        if tracemalloc.is_tracing():
+            if st.button("⏹️ Stop tracemalloc", width="stretch"):
+                memory_usage.stop_tracing()
+                st.rerun()
+        elif st.button("▶️ Start tracemalloc", width="stretch",
+                       help="Records allocation sites for the next measurements; slows the server while on"):
+            memory_usage.start_tracing()
+            st.rerun()
+
+    report = st.session_state.get("ops_memory_report")
+    if report:
+        process = report["process"]
+        col1, col2, col3 = st.columns(3)
+        col1.metric("🖥️ Process RSS", _format_bytes(process["rss_bytes"]) if process["rss_bytes"] else "-")
+        col2.metric("🆓 Available RAM", _format_bytes(process["available_bytes"]) if process["available_bytes"] else "-")
+        col3.metric("🎮 Sessions (parsed)", _format_bytes(report["sessions_total_bytes"]))
+
+        if report["sessions"]:
+            st.dataframe([{
+                "Join Code": s["join_code"],
+                "Game": s["game_type"],
+                "Status": s["status"],
+                "Teams": s["teams"],
+                "Size": _format_bytes(s["total_bytes"]),
+                "Narrative text": _format_bytes(s["narrative_bytes"]),
+                "Repeated dicts": _format_bytes(s["duplicate_dict_bytes"]),
+                "Largest field": f"{s['fields'][0][0]} ({_format_bytes(s['fields'][0][1])})" if s["fields"] else "-",
+            } for s in report["sessions"]], hide_index=True, width="stretch")
+
+            for s in [s for s in report["sessions"] if s["fields"]]:
+                with st.expander(f"{s['join_code']}: {_format_bytes(s['total_bytes'])} by field"):
+                    st.dataframe([{"Field": path, "Size": _format_bytes(size),
+                                   "Share": f"{size / s['total_bytes']:.0%}"} for path, size in s["fields"]],
+                                 hide_index=True, width="stretch")
+
+        cache = report["session_cache"]
+        if cache["sessions"]:
+            st.caption(f"Shared session cache: {cache['sessions']} session(s), {_format_bytes(cache['bytes'])}")
+
+        if report["viewer_state"]:
+            st.markdown("#### 👀 Viewer session_state by page")
+            st.dataframe([{"Page": page, "Viewers": v["viewers"], "Total": _format_bytes(v["bytes"]),
+                           "Per viewer": _format_bytes(v["bytes"] / v["viewers"])}
+                          for page, v in sorted(report["viewer_state"].items())], hide_index=True, width="stretch")
+
+        traced = report["tracemalloc"]
+        if traced:
+            st.markdown(f"#### 🔬 tracemalloc: {_format_bytes(traced['traced_bytes'])} traced "
+                        f"(peak {_format_bytes(traced['peak_bytes'])})")
+            st.dataframe([{"Allocated at": where, "Size": _format_bytes(size), "Blocks": count}
+                          for where, size, count in traced["top"]], hide_index=True, width="stretch")
+            if traced["growth"]:
+                st.markdown("Growth since the previous measurement")
+                st.dataframe([{"Allocated at": where, "Change": ("+" if delta > 0 else "-") + _format_bytes(abs(delta))}
+                              for where, delta in traced["growth"]], hide_index=True, width="stretch")
+
+    st.markdown("---")
+    if st.button("🔄 Reset Counters", help=f"Start counting from zero ({source.lower()})"):
+        if source == DAEMON:
+            state.reset_instrumentation()
+        else:
+            instrumentation.reset()
+        st.rerun()
@@ -0,0 +1,183 @@
+"""
+Per-rerun profiling of the pages
+
+A page body inside `with profiling.page_profile(page):` (start_page_profile()
+and finish_page_profile() around it) is run under cProfile when profiling is on: for 1 in
+PROFILING_SAMPLE_EVERY runs with config.PROFILING_ENABLED, or for every run of
+a logged-in admin who adds ?profile=1 to the page URL. At most one run per
+process is profiled at a time, so it's safe to leave on during a class.
+
+Each profile is written in the background to PROFILING_DIRECTORY as
+<page>-<time>.prof (pstats, snakeviz) and <page>-<time>.collapsed ("a;b;c
+microseconds" per stack, for flamegraph.pl or speedscope). cProfile records
+caller/callee pairs rather than whole stacks, so the collapsed stacks split
+each function's time between its callers in proportion.
+
+cProfile and pstats are imported on the first sampled run, so pages that are
+never profiled don't load them.
+
+A run that leaves the page body early (st.stop(), st.rerun(), an error) is
+written marked "-early". The active profile belongs to a viewer (Streamlit
+session), not a thread, since every run gets a new script thread; one left open
+anyway is written by that viewer's next run, or by whichever run finds it older
+than PROFILING_MAX_SECONDS.
+"""
+
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+import streamlit as st
+
+import config
+import shared_state as state
+
+PROFILE_DIR = config.PROFILING_DIRECTORY or os.path.join(state.DATA_DIR, "profiles")
+
+_RUNS = itertools.count(1)
+_LOCK = threading.Lock()
+_ACTIVE = None  # (profile, page, started, viewer) of the profile running in this process
+
+
+def _viewer():
+    """The Streamlit session id of this script run (the thread, outside Streamlit)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else threading.get_ident()
+
+
+def _wanted() -> bool:
+    if st.query_params.get("profile") in ("1", "true") and state.is_admin():
+        return True
+    return config.PROFILING_ENABLED and next(_RUNS) % max(1, config.PROFILING_SAMPLE_EVERY) == 0
+
+
+def start_page_profile(page: str):
+    """Profile this script run if it's sampled (or requested by an admin)"""
+    global _ACTIVE
+
+    viewer = _viewer()
+    now = time.time()
+    with _LOCK:
+        # This viewer's last run ended early, or another viewer's run was abandoned (session closed after st.stop)
+        stale = _ACTIVE is not None and (_ACTIVE[3] == viewer or now - _ACTIVE[2] >= config.PROFILING_MAX_SECONDS)
+        if stale:
+            _stop(early=True)
+
+    if not _wanted():
+        return
+
+    import cProfile
+
+    profile = cProfile.Profile()
+    with _LOCK:
+        if _ACTIVE is not None:
+            return
+        _ACTIVE = (profile, page, now, viewer)
+    profile.enable()
+
+
+def finish_page_profile(early: bool = False):
+    """Stop this run's profile (if any) and write it out in the background"""
+    viewer = _viewer()
+    with _LOCK:
+        if _ACTIVE is not None and _ACTIVE[3] == viewer:
+            _stop(early)
+
+
+@contextmanager
+def page_profile(page: str):
+    """Profile the page body run inside it (if sampled); finished on every way out"""
+    start_page_profile(page)
+    try:
+        yield
+    except BaseException:  # st.stop() and st.rerun() raise through the page body
+        finish_page_profile(early=True)
+        raise
+    finish_page_profile()
+
+
+def _stop(early: bool):
+    """Disable the active profile and write it out in the background (called with _LOCK held)"""
+    global _ACTIVE
+
+    profile, page, started, _ = _ACTIVE
+    _ACTIVE = None
+    profile.disable()
+    name = f"{page}-{datetime.fromtimestamp(started).strftime('%Y%m%d-%H%M%S-%f')}{'-early' if early else ''}"
+    threading.Thread(target=_write, args=(profile, name), name="profile-writer", daemon=True).start()
+
+
+def _write(profile: "cProfile.Profile", name: str):
+    import pstats
+
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    base = os.path.join(PROFILE_DIR, name)
+
+    profile.dump_stats(base + ".prof")
+    with open(base + ".collapsed", "w") as f:
+        f.writelines(f"{stack} {us}\n" for stack, us in collapsed_stacks(pstats.Stats(profile)).items())
+
+    _prune()
+
+
+def _prune():
+    """Keep the newest PROFILING_KEEP profiles"""
+    profiles = sorted((entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".prof")),
+                      key=lambda entry: entry.stat().st_mtime)
+    for entry in profiles[:max(0, len(profiles) - config.PROFILING_KEEP)]:
+        for path in (entry.path, entry.path[:-len(".prof")] + ".collapsed"):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _frame_name(func: tuple) -> str:
+    filename, line, function = func
+    if filename == "~":  # built-ins, e.g. "<built-in method time.sleep>"
+        return function
+    return f"{function} ({os.path.basename(filename)}:{line})"
+
+
+def collapsed_stacks(stats: "pstats.Stats", max_depth: int = 64, resolution: float = 1e-4) -> dict:
+    """
+    {"root;caller;callee": self time in microseconds} from pstats, walking the
+    call graph from its roots and splitting each function's time between its
+    callers in proportion to their share of it. Paths with less than
+    resolution of the total time are dropped (keeps the walk bounded).
+    """
+    children = {}
+    for callee, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, _, _, edge_cumulative) in callers.items():
+            children.setdefault(caller, []).append((callee, edge_cumulative))
+
+    stacks = {}
+    min_time = max(1e-6, resolution * stats.total_tt)
+
+    def walk(func, time_on_path: float, path: list):
+        _, _, own, cumulative, _ = stats.stats[func]
+        scale = time_on_path / cumulative if cumulative else 0.0
+        path.append(_frame_name(func))
+
+        self_us = int(round(own * scale * 1e6))
+        if self_us:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0) + self_us
+
+        if len(path) < max_depth:
+            on_path = set(path)
+            for callee, edge_cumulative in children.get(func, ()):
+                if _frame_name(callee) not in on_path and edge_cumulative * scale >= min_time:
+                    walk(callee, edge_cumulative * scale, path)
+        path.pop()
+
+    for func, (_, _, _, cumulative, callers) in stats.stats.items():
+        if not callers:
+            walk(func, cumulative, [])
+
+    return stacks
@@ -0,0 +1,229 @@
+"""
+QR code generation for team join links (cached) and printable team-code sheets
+"""
+
+import base64
+import hashlib
+import multiprocessing
+import threading
+import zipfile
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from io import BytesIO
+
+import qrcode
+
+import config
+
+# Content-addressed cache: sha256(url) -> {"png": bytes, "data_uri": str or None}
+_QR_CACHE = OrderedDict()
+_QR_CACHE_LOCK = threading.Lock()
+_QR_CACHE_STATS = {"hits": 0, "misses": 0, "evictions": 0}
+
+
+# ============================================================================
+# SINGLE QR CODES (CACHED)
+# ============================================================================
+
+def _cache_key(url: str) -> str:
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+
+def render_qr_png(url: str) -> bytes:
+    """Render a QR code for url as PNG bytes (uncached)"""
+    qr = qrcode.QRCode(version=1, box_size=10, border=4)
+    qr.add_data(url)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    return buffered.getvalue()
+
+
+def _cache_put(key: str, png: bytes) -> dict:
+    with _QR_CACHE_LOCK:
+        entry = _QR_CACHE.get(key)
+        if entry is None:
+            entry = {"png": png, "data_uri": None}
+            _QR_CACHE[key] = entry
+        _QR_CACHE.move_to_end(key)
+
+        while len(_QR_CACHE) > config.QR_CACHE_MAX_ENTRIES:
+            _QR_CACHE.popitem(last=False)
+            _QR_CACHE_STATS["evictions"] += 1
+
+        return entry
+
+
+def _cache_get(key: str):
+    with _QR_CACHE_LOCK:
+        entry = _QR_CACHE.get(key)
+        if entry is None:
+            _QR_CACHE_STATS["misses"] += 1
+            return None
+        _QR_CACHE.move_to_end(key)
+        _QR_CACHE_STATS["hits"] += 1
+        return entry
+
+
+def get_qr_png(url: str) -> bytes:
+    """Get QR code PNG bytes for url, rendering only on a cache miss"""
+    key = _cache_key(url)
+    entry = _cache_get(key)
+    if entry is None:
+        entry = _cache_put(key, render_qr_png(url))
+    return entry["png"]
+
+
+def get_qr_data_uri(url: str) -> str:
+    """Get QR code for url as a base64 PNG data URI (encoded once per cache entry)"""
+    key = _cache_key(url)
+    entry = _cache_get(key)
+    if entry is None:
+        entry = _cache_put(key, render_qr_png(url))
+
+    if entry["data_uri"] is None:
+        entry["data_uri"] = "data:image/png;base64," + base64.b64encode(entry["png"]).decode()
+
+    return entry["data_uri"]
+
+
+def qr_cache_info() -> dict:
+    """Cache size and hit/miss/eviction counters"""
+    with _QR_CACHE_LOCK:
+        return {
+            "entries": len(_QR_CACHE),
+            "max_entries": config.QR_CACHE_MAX_ENTRIES,
+            "bytes": sum(len(e["png"]) for e in _QR_CACHE.values()),
+            **_QR_CACHE_STATS,
+        }
+
+
+def clear_qr_cache():
+    """Drop all cached QR codes"""
+    with _QR_CACHE_LOCK:
+        _QR_CACHE.clear()
+
+
+# ============================================================================
+# BULK TEAM-CODE SHEETS
+# ============================================================================
+
+def _team_urls(team_codes: dict, base_url: str) -> list:
+    """[(team_slot, code, url)] sorted by team slot"""
+    ordered = sorted(team_codes.items(), key=lambda x: x[1]["team_slot"])
+    return [(info["team_slot"], code, f"{base_url}/?team_code={code}") for code, info in ordered]
+
+
+def render_qr_pngs(urls: list) -> list:
+    """
+    Render PNGs for many URLs. Cached codes are reused; large batches of
+    missing codes are rendered in a process pool. Its workers are spawned,
+    not forked: forking the multithreaded server can copy a lock some other
+    thread holds and deadlock the child.
+    """
+    keys = [_cache_key(u) for u in urls]
+    pngs = [None] * len(urls)
+    missing = []
+
+    for i, key in enumerate(keys):
+        entry = _cache_get(key)
+        if entry is None:
+            missing.append(i)
+        else:
+            pngs[i] = entry["png"]
+
+    rendered = None
+    if len(missing) >= config.QR_BULK_PROCESS_THRESHOLD:
+        spawn = multiprocessing.get_context("spawn")
+        try:
+            with ProcessPoolExecutor(max_workers=config.QR_BULK_MAX_WORKERS, mp_context=spawn) as pool:
+                rendered = list(pool.map(render_qr_png, [urls[i] for i in missing], chunksize=8))
+        except BrokenProcessPool:  # workers couldn't start (e.g. __main__ can't be re-imported)
+            rendered = None
+    if rendered is None:
+        rendered = [render_qr_png(urls[i]) for i in missing]
+
+    for i, png in zip(missing, rendered):
+        pngs[i] = png
+        _cache_put(keys[i], png)
+
+    return pngs
+
+
+def _build_pdf(rows: list, pngs: list, title: str) -> bytes:
+    from PIL import Image, ImageDraw, ImageFont
+
+    # A4 at 150 dpi, 2 x 3 codes per page
+    page_w, page_h = 1240, 1754
+    cols, rows_per_page = 2, 3
+    margin = 60
+    cell_w = (page_w - 2 * margin) // cols
+    cell_h = (page_h - 2 * margin - 60) // rows_per_page
+    qr_size = min(cell_w, cell_h) - 120
+
+    title_font = ImageFont.load_default(size=36)
+    label_font = ImageFont.load_default(size=32)
+    url_font = ImageFont.load_default(size=16)
+
+    per_page = cols * rows_per_page
+    output = BytesIO()
+    pages = []
+
+    def write_pages():
+        # Appending adds the pages to the PDF already in output, so only a few pages are held at once
+        pages[0].save(output, format="PDF", save_all=True, append_images=pages[1:], resolution=150.0,
+                      append=output.tell() > 0)
+        pages.clear()
+
+    for start in range(0, len(rows), per_page):
+        page = Image.new("L", (page_w, page_h), "white")
+        draw = ImageDraw.Draw(page)
+        draw.text((margin, margin // 2), title, fill="black", font=title_font)
+
+        for n, ((team_slot, code, url), png) in enumerate(zip(rows[start:start + per_page], pngs[start:start + per_page])):
+            x = margin + (n % cols) * cell_w
+            y = margin + 60 + (n // cols) * cell_h
+
+            qr_img = Image.open(BytesIO(png)).convert("L").resize((qr_size, qr_size))
+            page.paste(qr_img, (x + (cell_w - qr_size) // 2, y))
+
+            draw.text((x + 20, y + qr_size + 10), f"Team {team_slot}  ({code})", fill="black", font=label_font)
+            draw.text((x + 20, y + qr_size + 52), url, fill="#444444", font=url_font)
+
+        pages.append(page)
+        if len(pages) >= config.QR_PDF_PAGES_PER_WRITE:
+            write_pages()
+
+    if pages:
+        write_pages()
+    return output.getvalue()
+
+
+def _build_zip(rows: list, pngs: list) -> bytes:
+    output = BytesIO()
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for (team_slot, code, _), png in zip(rows, pngs):
+            zf.writestr(f"team_{team_slot:03d}_{code}.png", png)
+        zf.writestr("team_links.txt", "\n".join(f"Team {slot}: {url}" for slot, _, url in rows))
+    return output.getvalue()
+
+
+def build_team_code_sheet(team_codes: dict, base_url: str, fmt: str = "pdf", title: str = "Team Join Codes") -> bytes:
+    """
+    Render every team code of a session into one printable file.
+    fmt: "pdf" (6 codes per A4 page) or "zip" (one PNG per team + links.txt)
+    Returns: file contents as bytes (b"" if there are no team codes)
+    """
+    rows = _team_urls(team_codes or {}, base_url)
+    if not rows:
+        return b""
+
+    pngs = render_qr_pngs([url for _, _, url in rows])
+
+    if fmt == "zip":
+        return _build_zip(rows, pngs)
+    return _build_pdf(rows, pngs, title)
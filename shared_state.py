@@ -2,19 +2,40 @@
 Shared state management for Economics Games
 """
 
-import streamlit as st
+import atexit
+import functools
 import json
 import os
+import pickle
+import threading
+import time
+import config
+import instrumentation
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from typing import Optional
 import random
 import string
 import math
 
-# Data file paths
-DATA_DIR = "/tmp/economics_games_data"
+try:
+    import fcntl
+except ImportError:  # Windows: writers are only serialized within one process
+    fcntl = None
+
+# Data file paths (ECONOMICS_GAMES_DATA_DIR overrides config, e.g. for benchmarks)
+DATA_DIR = os.environ.get("ECONOMICS_GAMES_DATA_DIR", config.DATA_DIRECTORY)
 GAMES_FILE = os.path.join(DATA_DIR, "games.json")
 SESSIONS_FILE = os.path.join(DATA_DIR, "sessions.json")
+SUMMARY_FILE = os.path.join(DATA_DIR, "summaries.json")
+LOCK_FILE = os.path.join(DATA_DIR, "state.lock")
+INBOX_DIR = os.path.join(DATA_DIR, "inbox")
+
+# "file", "memory" or "server" (see config.STATE_BACKEND); ECONOMICS_GAMES_STATE_BACKEND overrides config
+STATE_BACKEND = os.environ.get("ECONOMICS_GAMES_STATE_BACKEND", config.STATE_BACKEND)
+
+_STATE_LOCK = threading.RLock()
+_state_lock_depth = 0
 
 
 # ============================================================================
@@ -31,22 +52,285 @@ def init_data_dir():
     if not os.path.exists(SESSIONS_FILE):
         save_json(SESSIONS_FILE, {})
 
+    if not os.path.exists(SUMMARY_FILE):
+        save_json(SUMMARY_FILE, {})
+
 
 def save_json(filepath: str, data: dict):
-    """Save data to JSON file"""
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
+    """Save data to JSON file (compact, written to a temp file then swapped in)"""
+    # json.dumps (unlike json.dump) uses the C encoder
+    _write_json_payload(filepath, json.dumps(data, separators=(",", ":")))
+
+
+def _write_json_payload(filepath: str, payload: str):
+    tmp_path = f"{filepath}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(payload)
+    os.replace(tmp_path, filepath)
+    instrumentation.record_io(bytes_written=len(payload))
 
 
 def load_json(filepath: str) -> dict:
     """Load data from JSON file"""
     try:
-        with open(filepath, "r") as f:
-            return json.load(f)
+        with open(filepath, "rb") as f:
+            raw = f.read()
+        start = time.perf_counter()
+        data = json.loads(raw)
+        instrumentation.record_io(bytes_read=len(raw), parse_s=time.perf_counter() - start)
+        return data
     except (FileNotFoundError, json.JSONDecodeError):
         return {}
 
 
+@contextmanager
+def _state_lock():
+    """
+    Hold the state lock for a whole read-modify-write cycle, so concurrent
+    writers can't overwrite each other's changes. Serializes threads (RLock)
+    and processes (flock on LOCK_FILE); re-entrant within a thread.
+    """
+    global _state_lock_depth
+
+    wait_start = time.perf_counter()
+    with _STATE_LOCK:
+        lock_file = None
+        if _state_lock_depth == 0 and fcntl is not None:
+            os.makedirs(DATA_DIR, exist_ok=True)
+            lock_file = open(LOCK_FILE, "a")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if _state_lock_depth == 0:
+            instrumentation.record_lock_wait(time.perf_counter() - wait_start)
+
+        _state_lock_depth += 1
+        try:
+            yield
+        finally:
+            _state_lock_depth -= 1
+            if lock_file is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+                lock_file.close()
+
+
+def _load_state(filepath: str) -> dict:
+    """
+    State for a read-modify-write cycle (call under _state_lock). With the
+    memory backend this is the live dict, so mutate it only while holding the lock.
+    """
+    if STATE_BACKEND == "memory":
+        return _memory_state(filepath)
+    return load_json(filepath)
+
+
+def _save_state(filepath: str, data: dict, critical: bool = False):
+    """
+    Persist state changed under _state_lock. With the memory backend the file is
+    only marked dirty for the background flusher, unless the change is critical.
+    """
+    if STATE_BACKEND != "memory":
+        save_json(filepath, data)
+        return
+
+    _DIRTY_FILES[filepath] = _DIRTY_FILES.get(filepath, 0) + 1
+    if critical:
+        flush_state()
+
+
+def _read_state(filepath: str, key: str) -> Optional[dict]:
+    """A copy of one entry (e.g. a game session) that callers may modify freely"""
+    if STATE_BACKEND != "memory":
+        entry = load_json(filepath).get(key)
+    else:
+        with _state_lock():
+            entry = _memory_state(filepath).get(key)
+            # pickle round trip: several times faster than copy.deepcopy for game dicts
+            entry = None if entry is None else pickle.loads(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+
+    if entry is not None and filepath == GAMES_FILE and instrumentation.session_size_due(key):
+        instrumentation.record_session_size(key, len(json.dumps(entry, separators=(",", ":"))))
+    return entry
+
+
+def _read_all_state(filepath: str) -> dict:
+    """A copy of a whole state file"""
+    if STATE_BACKEND != "memory":
+        return load_json(filepath)
+
+    with _state_lock():
+        return pickle.loads(pickle.dumps(_memory_state(filepath), pickle.HIGHEST_PROTOCOL))
+
+
+# ============================================================================
+# STATE SERVER (STATE_BACKEND = "server")
+# Several Streamlit workers share one local state daemon (state_server.py).
+# Functions marked @_served run inside the daemon instead of the calling
+# process; results come back as JSON, so tuples arrive as lists.
+# ============================================================================
+
+SERVED_FUNCTIONS = {}
+_STATE_CLIENT = None
+_STATE_CLIENT_LOCK = threading.Lock()
+
+
+def _state_client():
+    global _STATE_CLIENT
+    with _STATE_CLIENT_LOCK:
+        if _STATE_CLIENT is None:
+            from state_server import StateClient
+            _STATE_CLIENT = StateClient()
+        return _STATE_CLIENT
+
+
+def _served(fn):
+    # Instrumented on both sides: round trips in the workers, the real work in the daemon
+    local = instrumentation.instrumented(fn)
+    remote = instrumentation.instrumented(fn, call=lambda *args, **kwargs: _state_client().call(fn.__name__, args, kwargs))
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if STATE_BACKEND == "server":
+            return remote(*args, **kwargs)
+        return local(*args, **kwargs)
+
+    SERVED_FUNCTIONS[fn.__name__] = wrapper
+    return wrapper
+
+
+def call_served(name: str, args: list, kwargs: dict):
+    """Run a served state function by name (used by the state daemon)"""
+    if name not in SERVED_FUNCTIONS:
+        raise ValueError(f"{name!r} is not a served state function")
+    return SERVED_FUNCTIONS[name](*args, **kwargs)
+
+
+@_served
+def run_transaction(calls: list) -> list:
+    """
+    Run several served state calls atomically (no other write in between).
+    calls: [(function_name, args, kwargs)]
+    Returns: their results in order
+    """
+    with _state_lock():
+        return [call_served(name, args, kwargs) for name, args, kwargs in calls]
+
+
+# ============================================================================
+# WRITE-BEHIND STATE (STATE_BACKEND = "memory")
+# The state files are loaded once (from the last flush) and then served from
+# memory. Writes mark their file dirty; a background thread writes all dirty
+# files every STATE_FLUSH_INTERVAL_SECONDS, so a burst of team saves costs one
+# disk write. Critical writes flush before returning, and so does a clean exit.
+# ============================================================================
+
+_MEMORY_STATE = {}   # filepath -> live dict
+_DIRTY_FILES = {}    # filepath -> writes since it was last flushed
+_FLUSH_LOCK = threading.Lock()
+_FLUSHER = None
+_FLUSH_STATS = {"flushes": 0, "writes": 0, "errors": 0, "last_flush_at": None, "last_flush_ms": None, "last_error": None}
+
+
+def _memory_state(filepath: str) -> dict:
+    """Live state for filepath, recovering everything from disk on first use (call under _state_lock)"""
+    if not _MEMORY_STATE:
+        games = load_json(GAMES_FILE)
+        summaries = load_json(SUMMARY_FILE)
+
+        # Summaries are derived and may be a flush behind their games; stale
+        # ones are dropped here and rebuilt on first read
+        for code in [c for c, s in summaries.items() if games.get(c, {}).get("revision") != s.get("revision")]:
+            del summaries[code]
+
+        _MEMORY_STATE.update({GAMES_FILE: games, SUMMARY_FILE: summaries, SESSIONS_FILE: load_json(SESSIONS_FILE)})
+        _start_flusher()
+
+    return _MEMORY_STATE[filepath]
+
+
+def _start_flusher():
+    global _FLUSHER
+    if _FLUSHER is not None:
+        return
+
+    _FLUSHER = threading.Thread(target=_flush_loop, name="state-flusher", daemon=True)
+    _FLUSHER.start()
+    atexit.register(flush_state)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(config.STATE_FLUSH_INTERVAL_SECONDS)
+        try:
+            flush_state()
+        except Exception as e:  # keep flushing; the files stay dirty until a flush succeeds
+            _FLUSH_STATS["errors"] += 1
+            _FLUSH_STATS["last_error"] = str(e)
+
+
+@_served
+def flush_state() -> int:
+    """
+    Write all dirty in-memory state to disk now (no-op for the file backend).
+    Returns: number of files written
+    """
+    if not _DIRTY_FILES:
+        return 0
+
+    start = time.perf_counter()
+    with _state_lock():
+        dirty = dict(_DIRTY_FILES)
+        payloads = {path: json.dumps(_MEMORY_STATE[path], separators=(",", ":")) for path in dirty}
+        _DIRTY_FILES.clear()
+        # Taken before writers get back in, so flushes reach the disk in snapshot order
+        _FLUSH_LOCK.acquire()
+
+    error = None
+    try:
+        for path, payload in payloads.items():
+            _write_json_payload(path, payload)
+    except OSError as e:
+        error = e
+    finally:
+        _FLUSH_LOCK.release()
+
+    if error is not None:
+        with _state_lock():
+            for path, count in dirty.items():
+                _DIRTY_FILES[path] = _DIRTY_FILES.get(path, 0) + count
+        _FLUSH_STATS["errors"] += 1
+        _FLUSH_STATS["last_error"] = str(error)
+        return 0
+
+    _FLUSH_STATS["flushes"] += 1
+    _FLUSH_STATS["writes"] += sum(dirty.values())
+    _FLUSH_STATS["last_flush_at"] = time.time()
+    _FLUSH_STATS["last_flush_ms"] = (time.perf_counter() - start) * 1000
+    return len(payloads)
+
+
+@_served
+def state_backend_info() -> dict:
+    """Backend name, pending (unflushed) writes and flush counters"""
+    return {
+        "backend": STATE_BACKEND,
+        "flush_interval_seconds": config.STATE_FLUSH_INTERVAL_SECONDS,
+        "dirty_files": len(_DIRTY_FILES),
+        "pending_writes": sum(_DIRTY_FILES.values()),
+        **_FLUSH_STATS,
+    }
+
+
+@_served
+def get_instrumentation_snapshot() -> dict:
+    """instrumentation.snapshot() of the process running the state functions (the daemon with the server backend)"""
+    return instrumentation.snapshot()
+
+
+@_served
+def reset_instrumentation():
+    """instrumentation.reset() in the process running the state functions"""
+    instrumentation.reset()
+
+
 def generate_code(length: int = 6) -> str:
     """Generate random alphanumeric code"""
     return "".join(random.choices(string.ascii_uppercase + string.digits, k=length))
@@ -56,6 +340,7 @@ def generate_code(length: int = 6) -> str:
 # GAME SESSION MANAGEMENT
 # ============================================================================
 
+@_served
 def create_game_session(game_type: str, admin_name: str, settings: dict) -> str:
     """Create a new game session and return join code"""
     init_data_dir()
@@ -63,190 +348,500 @@ def create_game_session(game_type: str, admin_name: str, settings: dict) -> str:
     # Clean up old sessions (older than 4 hours)
     cleanup_old_sessions(hours=4)
 
-    games = load_json(GAMES_FILE)
-    join_code = generate_code()
-
-    # Ensure unique code
-    while join_code in games:
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
         join_code = generate_code()
 
-    games[join_code] = {
-        "game_type": game_type,
-        "admin_name": admin_name,
-        "created_at": datetime.now().isoformat(),
-        "status": "setup",
-        "settings": settings,
-        "teams": {},
-        "team_codes": {},
-        "current_round": 0,
-        "round_locked": False,
-        "round_timer_end": None,
-        "game_state": {}
-    }
+        # Ensure unique code
+        while join_code in games:
+            join_code = generate_code()
+
+        games[join_code] = {
+            "game_type": game_type,
+            "admin_name": admin_name,
+            "created_at": datetime.now().isoformat(),
+            "status": "setup",
+            "settings": settings,
+            "teams": {},
+            "team_codes": {},
+            "current_round": 0,
+            "round_locked": False,
+            "round_timer_end": None,
+            "game_state": {},
+            "revision": 0
+        }
 
-    save_json(GAMES_FILE, games)
+        _bump_revision(games[join_code])
+        _save_state(GAMES_FILE, games, critical=True)
+        _refresh_summary(join_code, games[join_code])
     return join_code
 
 
+@_served
 def generate_team_codes(join_code: str, num_teams: int) -> dict:
     """Generate unique team codes for a game session"""
     init_data_dir()
 
-    games = load_json(GAMES_FILE)
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
 
-    if join_code not in games:
-        return {}
+        if join_code not in games:
+            return {}
 
-    team_codes = {}
-    used_codes = set()
+        team_codes = {}
 
-    for i in range(1, num_teams + 1):
-        team_code = generate_code()
-        while team_code in used_codes or team_code in games:
-            team_code = generate_code()
+        # Team codes are looked up across all sessions, so keep them globally unique
+        used_codes = set(games)
+        for other in games.values():
+            used_codes.update(other.get("team_codes", {}) or {})
 
-        used_codes.add(team_code)
-        team_codes[team_code] = {
-            "team_slot": i,
-            "team_name": None,
-            "assigned": False
-        }
+        for i in range(1, num_teams + 1):
+            team_code = generate_code()
+            while team_code in used_codes:
+                team_code = generate_code()
+
+            used_codes.add(team_code)
+            team_codes[team_code] = {
+                "team_slot": i,
+                "team_name": None,
+                "assigned": False
+            }
 
-    games[join_code]["team_codes"] = team_codes
-    save_json(GAMES_FILE, games)
+        games[join_code]["team_codes"] = team_codes
+        _bump_revision(games[join_code])
+        _save_state(GAMES_FILE, games, critical=True)
+        _refresh_summary(join_code, games[join_code])
 
     return team_codes
 
 
+@_served
 def get_game_session(join_code: str) -> Optional[dict]:
-    """Get game session by join code"""
+    """Get game session by join code (with not-yet-merged inbox decisions applied)"""
     init_data_dir()
-    games = load_json(GAMES_FILE)
-    return games.get(join_code.upper() if join_code else "")
+    join_code = join_code.upper() if join_code else ""
+    game = _read_state(GAMES_FILE, join_code)
+    if game:
+        _rescore_teams(game, _apply_inbox(game, _read_inbox(join_code)))
+    return game
 
 
+@_served
 def update_game_session(join_code: str, updates: dict):
     """Update game session"""
+    _update_game_session(join_code, updates)
+
+
+@_served
+def update_game_session_cas(join_code: str, updates: dict, expected_revision: int) -> tuple:
+    """
+    Update game session only if nothing changed it since expected_revision.
+    Returns: (success: bool, message: str, revision: int) - the new revision,
+    or the current one on a conflict
+    """
+    return _update_game_session(join_code, updates, expected_revision)
+
+
+def _update_game_session(join_code: str, updates: dict, expected_revision: Optional[int] = None) -> tuple:
     init_data_dir()
-    games = load_json(GAMES_FILE)
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
 
-    if join_code in games:
-        games[join_code].update(updates)
-        save_json(GAMES_FILE, games)
+        if join_code not in games:
+            return False, "Game not found", 0
 
+        game = games[join_code]
+        if expected_revision is not None and game.get("revision", 0) != expected_revision:
+            return False, "Game was changed by someone else", game.get("revision", 0)
 
+        game.update(updates)
+        _bump_revision(game)
+        _save_state(GAMES_FILE, games, critical="status" in updates)
+        _refresh_summary(join_code, game)
+        if "current_round" in updates:
+            # Set directly (e.g. starting a game): saves follow the new round, not the last merge's
+            with _inbox_lock(join_code) as inbox_lock:
+                _set_open_round(inbox_lock, game.get("current_round", 0))
+        return True, "Game updated", game["revision"]
+
+
+@_served
 def delete_game_session(join_code: str):
     """Delete a game session"""
     init_data_dir()
-    games = load_json(GAMES_FILE)
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
 
-    if join_code in games:
-        del games[join_code]
-        save_json(GAMES_FILE, games)
+        if join_code in games:
+            del games[join_code]
+            _save_state(GAMES_FILE, games, critical=True)
+            _drop_summaries([join_code])
+            _drop_inboxes([join_code])
 
 
+@_served
 def get_all_game_sessions() -> dict:
     """Get all game sessions"""
     init_data_dir()
-    return load_json(GAMES_FILE)
+    return _read_all_state(GAMES_FILE)
 
 
 # ============================================================================
 # TEAM MANAGEMENT
 # ============================================================================
 
+@_served
 def add_team_to_game(join_code: str, team_name: str, team_code: str = None, team_data: dict = None) -> tuple:
     """
     Add a team to a game session using a team code
     Returns: (success: bool, message: str, team_slot: int or None)
     """
-    init_data_dir()
-    games = load_json(GAMES_FILE)
+    success, message, team_slot, _ = _add_team_to_game(join_code, team_name, team_code, team_data)
+    return success, message, team_slot
 
-    if join_code not in games:
-        return False, "Game not found", None
 
-    game = games[join_code]
+@_served
+def add_team_to_game_cas(join_code: str, team_name: str, expected_revision: int,
+                         team_code: str = None, team_data: dict = None) -> tuple:
+    """
+    Add a team only if the session hasn't changed since expected_revision.
+    Returns: (success: bool, message: str, team_slot: int or None, revision: int)
+    """
+    return _add_team_to_game(join_code, team_name, team_code, team_data, expected_revision)
 
-    if game.get("team_codes"):
-        if not team_code:
-            return False, "Team code required for this game", None
 
-        if team_code not in game["team_codes"]:
-            return False, "Invalid team code", None
+def _add_team_to_game(join_code: str, team_name: str, team_code: str = None, team_data: dict = None,
+                      expected_revision: Optional[int] = None) -> tuple:
+    init_data_dir()
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
 
-        team_code_info = game["team_codes"][team_code]
+        if join_code not in games:
+            return False, "Game not found", None, 0
 
-        if team_code_info["assigned"]:
-            return False, "This team code has already been used", None
+        game = games[join_code]
+        revision = game.get("revision", 0)
 
-        team_slot = team_code_info["team_slot"]
-        team_code_info["team_name"] = team_name
-        team_code_info["assigned"] = True
+        if expected_revision is not None and revision != expected_revision:
+            return False, "Game was changed by someone else", None, revision
 
-        games[join_code]["teams"][team_name] = team_data or {
-            "joined_at": datetime.now().isoformat(),
-            "ready": False,
-            "team_code": team_code,
-            "team_slot": team_slot
-        }
+        if game.get("team_codes"):
+            if not team_code:
+                return False, "Team code required for this game", None, revision
 
-        save_json(GAMES_FILE, games)
-        return True, f"Joined as Team {team_slot}", team_slot
+            if team_code not in game["team_codes"]:
+                return False, "Invalid team code", None, revision
 
-    # Old system
-    if team_name in game["teams"]:
-        return False, "Team name already taken", None
+            team_code_info = game["team_codes"][team_code]
 
-    games[join_code]["teams"][team_name] = team_data or {
-        "joined_at": datetime.now().isoformat(),
-        "ready": False
-    }
+            if team_code_info["assigned"]:
+                return False, "This team code has already been used", None, revision
 
-    save_json(GAMES_FILE, games)
-    return True, "Joined successfully", None
+            team_slot = team_code_info["team_slot"]
+            team_code_info["team_name"] = team_name
+            team_code_info["assigned"] = True
 
+            previous = game["teams"].get(team_name)
+            game["teams"][team_name] = team_data or {
+                "joined_at": datetime.now().isoformat(),
+                "ready": False,
+                "team_code": team_code,
+                "team_slot": team_slot
+            }
+            message = f"Joined as Team {team_slot}"
 
+        else:
+            # Old system
+            if team_name in game["teams"]:
+                return False, "Team name already taken", None, revision
+
+            team_slot = None
+            previous = None
+            game["teams"][team_name] = team_data or {
+                "joined_at": datetime.now().isoformat(),
+                "ready": False
+            }
+            message = "Joined successfully"
+
+        game["teams"][team_name]["revision"] = _bump_revision(game)
+        _rescore_teams(game, [team_name])
+        _save_state(GAMES_FILE, games)
+        _update_summary_for_team(join_code, game, team_name, previous, game["teams"][team_name])
+        return True, message, team_slot, game["revision"]
+
+
+@_served
 def update_team_data(join_code: str, team_name: str, team_data: dict):
     """Update team data"""
+    _update_team_data(join_code, team_name, team_data)
+
+
+@_served
+def update_team_data_cas(join_code: str, team_name: str, team_data: dict, expected_revision: int) -> tuple:
+    """
+    Update team data only if this team hasn't been written since
+    expected_revision (the session revision the caller read). Writes to other
+    teams don't conflict, so a class saving at once doesn't retry.
+    Returns: (success: bool, message: str, revision: int) - the new session
+    revision, or the current one on a conflict
+    """
+    return _update_team_data(join_code, team_name, team_data, expected_revision)
+
+
+def _update_team_data(join_code: str, team_name: str, team_data: dict,
+                      expected_revision: Optional[int] = None) -> tuple:
     init_data_dir()
-    games = load_json(GAMES_FILE)
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
+
+        if join_code not in games or team_name not in games[join_code]["teams"]:
+            return False, "Team not found", games.get(join_code, {}).get("revision", 0)
+
+        game = games[join_code]
+        team = game["teams"][team_name]
+
+        if expected_revision is not None and team.get("revision", 0) > expected_revision:
+            return False, "Team data was changed by someone else", game.get("revision", 0)
 
-    if join_code in games and team_name in games[join_code]["teams"]:
-        games[join_code]["teams"][team_name].update(team_data)
-        save_json(GAMES_FILE, games)
+        previous = dict(team)
+        team.update(team_data)
+        team["revision"] = _bump_revision(game)
+        _rescore_teams(game, [team_name])
+        _save_state(GAMES_FILE, games)
+        _update_summary_for_team(join_code, game, team_name, previous, team)
+        return True, "Team updated", game["revision"]
 
 
+@_served
 def remove_team_from_game(join_code: str, team_name: str):
     """Remove a team from game"""
     init_data_dir()
-    games = load_json(GAMES_FILE)
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
+
+        if join_code in games and team_name in games[join_code]["teams"]:
+            previous = games[join_code]["teams"].pop(team_name)
+            _bump_revision(games[join_code])
+            _rescore_teams(games[join_code], [team_name])
+            _save_state(GAMES_FILE, games)
+            _update_summary_for_team(join_code, games[join_code], team_name, previous, None)
+
+
+# ============================================================================
+# DECISION INBOX
+# Team saves are appended to a per-session JSONL inbox instead of rewriting
+# the shared session; advance_round/process_current_round merge it in one
+# pass (last write wins per team and round). Readers see pending decisions
+# through get_game_session. A per-session lock file keeps saves out while a
+# merge rotates, reads and deletes the batch, and records the round the merge
+# left the session in, so saves for a round that's already closed are refused.
+# ============================================================================
+
+def _inbox_path(join_code: str) -> str:
+    return os.path.join(INBOX_DIR, f"{join_code}.jsonl")
+
+
+@contextmanager
+def _inbox_lock(join_code: str):
+    """
+    Hold the session's inbox lock file (flock, exclusive): merges from rotating
+    the inbox until the merged batch is deleted, saves for their checks and append
+    """
+    os.makedirs(INBOX_DIR, exist_ok=True)
+    with open(_inbox_path(join_code) + ".lock", "a+") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield lock_file
+
+
+def _open_round(lock_file) -> int:
+    """The round the last merge (or round change) left the session in (0 before any)"""
+    lock_file.seek(0)
+    value = lock_file.read().strip()
+    return int(value) if value.isdigit() else 0
+
+
+def _set_open_round(lock_file, round_num: int):
+    lock_file.seek(0)
+    lock_file.truncate()
+    lock_file.write(str(round_num))
+    lock_file.flush()
+
+
+@_served
+def submit_team_decision(join_code: str, team_name: str, updates: dict, round_num: int,
+                         if_unsaved: bool = False) -> tuple:
+    """
+    Queue a team's decision (team_data updates) for round_num as one appended
+    inbox record. Doesn't touch the session document or take the state lock.
+    Refused once round_num has been merged and closed.
+    if_unsaved: refuse if this team already has a queued decision for round_num
+    (e.g. saved from another device).
+    Returns: (success: bool, message: str)
+    """
+    join_code = join_code.upper()
+    path = _inbox_path(join_code)
+
+    record = json.dumps({
+        "team": team_name,
+        "round": round_num,
+        "updates": updates,
+        "at": datetime.now().isoformat(),
+    }, separators=(",", ":")) + "\n"
+
+    # Saves of the session take turns too, so the checks below and the append are one step
+    with _inbox_lock(join_code) as lock_file:
+        while True:
+            fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_ino == os.stat(path).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            os.close(fd)  # the inbox was rotated or removed after we opened it
+
+        try:
+            if round_num < _open_round(lock_file):
+                return False, f"Round {round_num} is already closed"
+            if if_unsaved and (team_name, round_num) in _read_inbox(join_code):
+                return False, "Decision already saved for this round"
+            instrumentation.record_io(bytes_written=os.write(fd, record.encode("utf-8")))
+        finally:
+            os.close(fd)
+
+    return True, "Decision saved"
+
+
+def _read_inbox_file(path: str) -> dict:
+    """{(team, round): record} from one inbox file, later records replacing earlier ones"""
+    records = {}
+    try:
+        with open(path, "r") as f:
+            lines = f.readlines()
+    except FileNotFoundError:
+        return records
+
+    start = time.perf_counter()
+    for line in lines:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        records[(record["team"], record["round"])] = record
+    instrumentation.record_io(bytes_read=sum(map(len, lines)), parse_s=time.perf_counter() - start)
+    return records
+
+
+def _read_inbox(join_code: str) -> dict:
+    """Pending records of a session, including a batch that is being merged right now"""
+    path = _inbox_path(join_code)
+    records = {}
+    for inbox in (path + ".merging", path + ".incoming", path):
+        records.update(_read_inbox_file(inbox))
+    return records
+
+
+def _take_inbox(join_code: str) -> tuple:
+    """
+    Rotate the inbox out for merging (new saves start a fresh file). Call
+    holding the session's inbox lock.
+    Returns: (records, merged_path) - delete merged_path once the merge is saved
+    """
+    path = _inbox_path(join_code)
+    merging = path + ".merging"
+    incoming = path + ".incoming"
+
+    if not os.path.exists(merging) and not os.path.exists(incoming):
+        if os.path.exists(path):
+            os.replace(path, merging)
+        return _read_inbox_file(merging), merging
+
+    # A leftover batch from an interrupted merge is merged first; later saves are
+    # rotated out too and folded into it, so the batch stays one file
+    records = _read_inbox_file(merging)
+    while os.path.exists(incoming) or os.path.exists(path):
+        if not os.path.exists(incoming):
+            os.replace(path, incoming)
+        records.update(_read_inbox_file(incoming))
+        lines = [json.dumps(r, separators=(",", ":")) + "\n" for r in records.values()]
+        with open(merging + ".tmp", "w") as f:
+            f.writelines(lines)
+        instrumentation.record_io(bytes_written=sum(map(len, lines)))
+        os.replace(merging + ".tmp", merging)
+        os.remove(incoming)
+
+    return records, merging
+
+
+def _apply_inbox(game: dict, records: dict) -> list:
+    """Apply records for the game's current round to its teams. Returns the team names changed"""
+    current_round = game.get("current_round", 0)
+    changed = []
+    for (team_name, round_num), record in records.items():
+        team = game.get("teams", {}).get(team_name)
+        if team is None or round_num != current_round:
+            continue
+        team.update(record["updates"])
+        changed.append(team_name)
+    return changed
+
+
+def _merge_inbox_in_place(join_code: str, game: dict) -> tuple:
+    """
+    Merge the session's inbox into an already-loaded game (caller holds the
+    state lock and the inbox lock, and saves). Merged teams are
+    stamped with the revision the caller's save will get.
+    Returns: (team names changed, path to pass to _close_merge after saving)
+    """
+    records, merged_path = _take_inbox(join_code)
+    changed = _apply_inbox(game, records)
+    for team_name in changed:
+        game["teams"][team_name]["revision"] = game.get("revision", 0) + 1
+    _rescore_teams(game, changed)
+    return changed, merged_path
+
 
-    if join_code in games and team_name in games[join_code]["teams"]:
-        del games[join_code]["teams"][team_name]
-        save_json(GAMES_FILE, games)
+def _close_merge(lock_file, merged_path: str, game: dict):
+    """After the merged game is saved: record its open round and delete the merged batch"""
+    _set_open_round(lock_file, game.get("current_round", 0))
+    if os.path.exists(merged_path):
+        os.remove(merged_path)
+
+
+def _drop_inboxes(join_codes: list):
+    for code in join_codes:
+        with _inbox_lock(code):
+            for suffix in ("", ".merging", ".incoming"):
+                if os.path.exists(_inbox_path(code) + suffix):
+                    os.remove(_inbox_path(code) + suffix)
+        if os.path.exists(_inbox_path(code) + ".lock"):
+            os.remove(_inbox_path(code) + ".lock")
 
 
 # ============================================================================
 # ROUND MANAGEMENT
 # ============================================================================
 
+@_served
 def lock_round(join_code: str):
     """Lock the current round (teams can't edit)"""
     update_game_session(join_code, {"round_locked": True})
 
 
+@_served
 def unlock_round(join_code: str):
     """Unlock the current round"""
     update_game_session(join_code, {"round_locked": False})
 
 
+@_served
 def start_round_timer(join_code: str, duration_seconds: int):
     """Start a timer for the current round"""
     end_time = datetime.now() + timedelta(seconds=duration_seconds)
     update_game_session(join_code, {"round_timer_end": end_time.isoformat()})
 
 
+@_served
 def check_round_timer(join_code: str) -> tuple[bool, int]:
     """Check if round timer is active and get remaining seconds"""
     game = get_game_session(join_code)
@@ -263,11 +858,13 @@ def check_round_timer(join_code: str) -> tuple[bool, int]:
     return True, remaining
 
 
+@_served
 def clear_round_timer(join_code: str):
     """Clear the round timer"""
     update_game_session(join_code, {"round_timer_end": None})
 
 
+@_served
 def is_round_locked(join_code: str) -> bool:
     """Check if current round is locked"""
     game = get_game_session(join_code)
@@ -351,18 +948,37 @@ def compute_build_country_score(team_data: dict) -> float:
     return float(_clamp(raw, 0.0, 100.0))
 
 
+@_served
 def process_current_round(join_code: str):
     """
     Applies team decisions for the CURRENT round and writes updated metrics/performance back to storage.
     Prevents double-processing via game_state["processed_round"].
     """
-    game = get_game_session(join_code)
-    if not game:
-        return
+    init_data_dir()
+    with _state_lock(), _inbox_lock(join_code) as inbox_lock:
+        games = _load_state(GAMES_FILE)
+        game = games.get(join_code)
+        if not game:
+            return
+
+        merged, merged_path = _merge_inbox_in_place(join_code, game)
 
+        if _process_round_in_place(game) or merged:
+            _bump_revision(game)
+            _save_state(GAMES_FILE, games, critical=True)
+            _refresh_summary(join_code, game)
+
+        _close_merge(inbox_lock, merged_path, game)
+
+
+def _process_round_in_place(game: dict) -> bool:
+    """
+    Run the round engine on an already-loaded game (no I/O).
+    Returns False if the current round was already processed.
+    """
     processed_round = game.get("game_state", {}).get("processed_round")
     if processed_round == game.get("current_round"):
-        return
+        return False
 
     game_type = game.get("game_type")
 
@@ -376,11 +992,11 @@ def process_current_round(join_code: str):
     game.setdefault("game_state", {})
     game["game_state"]["processed_round"] = game.get("current_round")
 
-    games = load_json(GAMES_FILE)
-    games[join_code] = game
-    save_json(GAMES_FILE, games)
+    _update_leaderboard(game)
+    return True
 
 
+@instrumentation.instrumented
 def _process_build_country_round(game: dict):
     """
     Realistic-ish build-country engine + fiscal constraint.
@@ -546,6 +1162,7 @@ def ineq_sh_toggle(x: float) -> float:
     return float(x)
 
 
+@instrumentation.instrumented
 def _process_beat_market_round(game: dict):
     """Beat-market toy mechanics with event shock."""
     event = game.get("game_state", {}).get("current_event", {})
@@ -617,6 +1234,7 @@ def _process_beat_market_round(game: dict):
         }
 
 
+@instrumentation.instrumented
 def _process_crypto_crash_round(game: dict):
     """
     Student-friendly crypto game:
@@ -786,10 +1404,143 @@ def _process_crypto_crash_round(game: dict):
         }
 
 
+# ============================================================================
+# LEADERBOARD
+# Ranked once per processed round (process_current_round/_store_round_snapshot)
+# and stored on the game as game["leaderboard"], so renders read ranks directly.
+# Between rounds, a team whose data changes (team writes, inbox decisions) is
+# re-scored and moved in place, so stored scores follow the live team data.
+# ============================================================================
+
+def compute_team_score(game_type: str, team_data: dict) -> float:
+    """
+    Ranking score for one team:
+    - build_country: Goldilocks score (compute_build_country_score)
+    - beat_market: risk-adjusted returns
+    - crypto_crash: equity
+    """
+    if game_type == "build_country":
+        return float(compute_build_country_score(team_data))
+
+    if game_type == "beat_market":
+        portfolio_value = team_data.get("portfolio_value", {}) or {}
+        returns = float(portfolio_value.get("returns", 0.0))
+        risk = float(portfolio_value.get("risk", 50.0))
+        return (returns / max(1.0, risk)) * 100.0 if risk > 0 else returns
+
+    if game_type == "crypto_crash":
+        cp = team_data.get("crypto_portfolio", {}) or {}
+        return float(cp.get("equity", 1000.0))
+
+    return 0.0
+
+
+def _rank_leaderboard(game: dict, previous_ranks: Optional[dict] = None, scores: Optional[dict] = None) -> dict:
+    """
+    Score and rank every team. Ties are broken by team slot, then join time,
+    then team name, so equal scores always come out in the same order.
+    scores: {team_name: score} already known; the other teams are scored here.
+    """
+    game_type = game.get("game_type")
+    previous_ranks = previous_ranks or {}
+    scores = scores or {}
+
+    scored = []
+    for team_name, team_data in game.get("teams", {}).items():
+        score = scores[team_name] if team_name in scores else compute_team_score(game_type, team_data)
+        scored.append((
+            -score,
+            team_data.get("team_slot") or 0,
+            team_data.get("joined_at", ""),
+            team_name,
+        ))
+    scored.sort()
+
+    entries = []
+    ranks = {}
+    for rank, (neg_score, _, _, team_name) in enumerate(scored, 1):
+        previous_rank = previous_ranks.get(team_name)
+        entries.append({
+            "team": team_name,
+            "score": -neg_score,
+            "rank": rank,
+            "previous_rank": previous_rank,
+            "rank_delta": (previous_rank - rank) if previous_rank else 0,
+        })
+        ranks[team_name] = rank
+
+    return {
+        "round": game.get("current_round", 0),
+        "entries": entries,
+        "ranks": ranks,
+        "previous_ranks": previous_ranks,
+    }
+
+
+def _update_leaderboard(game: dict):
+    """Re-rank the game's teams; rank deltas are relative to the previous round's ranks"""
+    old = game.get("leaderboard") or {}
+    current_round = game.get("current_round", 0)
+
+    if old and old.get("round") != current_round:
+        previous_ranks = old.get("ranks", {})
+    else:
+        previous_ranks = old.get("previous_ranks", {})
+
+    game["leaderboard"] = _rank_leaderboard(game, previous_ranks)
+
+
+def _rescore_teams(game: dict, team_names) -> None:
+    """
+    Re-score the given teams in the stored leaderboard (after their data
+    changed) and re-sort it; the other teams keep their stored scores.
+    Nothing is stored before the first processed round.
+    """
+    leaderboard = game.get("leaderboard")
+    if not leaderboard or not team_names:
+        return
+
+    changed = set(team_names)
+    known = {entry["team"]: entry["score"] for entry in leaderboard["entries"] if entry["team"] not in changed}
+    rescored = _rank_leaderboard(game, leaderboard.get("previous_ranks"), known)
+    rescored["round"] = leaderboard.get("round", rescored["round"])  # still the round it was ranked for
+    game["leaderboard"] = rescored
+
+
+def get_ranked_leaderboard(game: dict) -> dict:
+    """
+    Get the stored leaderboard for a game, or rank on the fly if it is missing
+    or out of date with the team list (e.g. before round 1 is processed).
+    Returns: {"round", "entries" (sorted by rank), "ranks", "previous_ranks"}
+    """
+    leaderboard = game.get("leaderboard")
+    teams = game.get("teams", {})
+
+    if leaderboard and len(leaderboard.get("ranks", {})) == len(teams) and all(
+        name in teams for name in leaderboard["ranks"]
+    ):
+        return leaderboard
+
+    return _rank_leaderboard(game, (leaderboard or {}).get("ranks"))
+
+
+def get_leaderboard_top(game: dict, k: int = 10) -> list:
+    """Top-k leaderboard entries"""
+    return get_ranked_leaderboard(game)["entries"][:k]
+
+
+def get_team_leaderboard_entry(game: dict, team_name: str) -> Optional[dict]:
+    """Leaderboard entry (rank, score, rank_delta, ...) for one team"""
+    leaderboard = get_ranked_leaderboard(game)
+    rank = leaderboard["ranks"].get(team_name)
+    return leaderboard["entries"][rank - 1] if rank else None
+
+
 # ============================================================================
 # ROUND HISTORY SNAPSHOTS
 # ============================================================================
 
+@_served
 def _store_round_snapshot(join_code: str, round_num: int):
     """
     Store a snapshot of current round data for history tracking.
@@ -799,9 +1550,33 @@ def _store_round_snapshot(join_code: str, round_num: int):
     if round_num == 0:
         return
 
-    game = get_game_session(join_code)
-    if not game:
-        return
+    init_data_dir()
+    with _state_lock():
+        games = _load_state(GAMES_FILE)
+        game = games.get(join_code)
+        if not game:
+            return
+
+        _snapshot_round_in_place(game, round_num)
+
+        _bump_revision(game)
+        _save_state(GAMES_FILE, games, critical=True)
+        _refresh_summary(join_code, game)
+
+
+def _round_scenario_name(game: dict) -> Optional[str]:
+    """Name of the scenario/event the current round was played under (None if the game has none)"""
+    gs = game.get("game_state", {}) or {}
+    if game.get("game_type") == "build_country":
+        return (gs.get("current_scenario") or {}).get("name")
+    if game.get("game_type") == "beat_market":
+        return (gs.get("current_event") or {}).get("name")
+    return None
+
+
+def _snapshot_round_in_place(game: dict, round_num: int):
+    """Add round_num to every team's round_history on an already-loaded game (no I/O)"""
+    scenario_name = _round_scenario_name(game)
 
     for _, team_data in game.get("teams", {}).items():
         team_data.setdefault("round_history", {})
@@ -838,6 +1613,7 @@ def _store_round_snapshot(join_code: str, round_num: int):
                 },
                 "fiscal": dict(team_data.get("fiscal", {}) or {}),
                 "score": float(score),
+                "scenario": scenario_name,
             }
 
         elif game["game_type"] == "beat_market":
@@ -860,7 +1636,8 @@ def _store_round_snapshot(join_code: str, round_num: int):
                     "risk": risk,
                     "esg": portfolio_value.get("esg", 50.0)
                 },
-                "score": score
+                "score": score,
+                "scenario": scenario_name,
             }
 
         elif game["game_type"] == "crypto_crash":
@@ -885,14 +1662,14 @@ def _store_round_snapshot(join_code: str, round_num: int):
                     "risk_label": cp.get("risk_label", "Low"),
                     "liquidations": cp.get("liquidations", 0)
                 },
-                "score": float(cp.get("equity", 1000.0))
+                "score": float(cp.get("equity", 1000.0)),
+                "scenario": scenario_name,
             }
 
-    games = load_json(GAMES_FILE)
-    games[join_code] = game
-    save_json(GAMES_FILE, games)
+    _update_leaderboard(game)
 
 
+@_served
 def advance_round(join_code: str):
     """
     Advance to next round:
@@ -900,14 +1677,24 @@ def advance_round(join_code: str):
     2) Process current round outcomes
     3) Store round history snapshot (only if round >= 1)
     4) Generate next scenario/event/indicators + narrative hints
-    5) Persist updated state
+    5) Persist updated state (one read and one write for the whole advance)
     """
-    game = get_game_session(join_code)
+    init_data_dir()
+    with _state_lock(), _inbox_lock(join_code) as inbox_lock:
+        _advance_round(join_code, inbox_lock)
+
+
+def _advance_round(join_code: str, inbox_lock):
+    games = _load_state(GAMES_FILE)
+    game = games.get(join_code)
     if not game:
         return
 
     current_round = game.get("current_round", 1)
 
+    # Merge queued team decisions before auto-submitting for the rest
+    _, merged_path = _merge_inbox_in_place(join_code, game)
+
     # Auto-submit missing decisions before processing
     for _, team_data in game.get("teams", {}).items():
         decision_saved_round = team_data.get("decision_saved_round", 0)
@@ -952,21 +1739,12 @@ def advance_round(join_code: str):
                 team_data["decision_saved_round"] = current_round
                 team_data["auto_submitted"] = True
 
-    # Save auto-submitted decisions
-    games = load_json(GAMES_FILE)
-    games[join_code] = game
-    save_json(GAMES_FILE, games)
-
     # Process current round
-    process_current_round(join_code)
+    _process_round_in_place(game)
 
     # Store snapshot after processing
-    _store_round_snapshot(join_code, current_round)
-
-    # Reload after processing
-    game = get_game_session(join_code)
-    if not game:
-        return
+    if current_round != 0:
+        _snapshot_round_in_place(game, current_round)
 
     game.setdefault("game_state", {})
 
@@ -1118,24 +1896,323 @@ def advance_round(join_code: str):
             "hype": {"text": hype_text, "hint": hype_hint},
         }
 
-    update_game_session(join_code, {
+    game.update({
         "current_round": game.get("current_round", 0) + 1,
         "round_locked": False,
         "round_timer_end": None,
-        "game_state": game["game_state"]
     })
 
+    _bump_revision(game)
+    _save_state(GAMES_FILE, games, critical=True)
+    _refresh_summary(join_code, game)
+    _close_merge(inbox_lock, merged_path, game)
+
 
 # ============================================================================
 # EXCEL EXPORT
 # ============================================================================
 
-def export_game_results_to_excel(join_code: str):
+def _export_summary_rows(game: dict):
+    """Game Summary sheet: header row, then one value row"""
+    yield ["Game Type", "Admin", "Created At", "Status", "Total Rounds", "Current Round", "Number of Teams"]
+    yield [
+        game.get("game_type", "Unknown"),
+        game.get("admin_name", "Unknown"),
+        game.get("created_at", "Unknown"),
+        game.get("status", "Unknown"),
+        game.get("settings", {}).get("num_rounds", 0),
+        game.get("current_round", 0),
+        len(game.get("teams", {})),
+    ]
+
+
+def _final_score_row(game_type: str, team_name: str, team_data: dict) -> Optional[dict]:
+    if game_type == "build_country":
+        metrics = team_data.get("metrics", {}) or {}
+        fiscal = team_data.get("fiscal", {}) or {}
+
+        score = compute_build_country_score(team_data)
+
+        return {
+            "Team": team_name,
+            "Final Score": round(score, 2),
+            "GDP": round(float(metrics.get("gdp", 100.0)), 2),
+            "Employment": round(float(metrics.get("employment", 75.0)), 2),
+            "Inequality": round(float(metrics.get("inequality", 50.0)), 2),
+            "Approval": round(float(metrics.get("approval", 50.0)), 2),
+            "Debt (%GDP)": round(float(metrics.get("debt", 0.0)), 2),
+            "Deficit (%GDP)": round(float(fiscal.get("deficit_pct_gdp", 0.0)), 2),
+            "Revenue (%GDP)": round(float(fiscal.get("revenue_pct_gdp", 0.0)), 2),
+            "Spend (%GDP)": round(float(fiscal.get("total_spend_pct_gdp", 0.0)), 2),
+        }
+
+    elif game_type == "beat_market":
+        pv = team_data.get("portfolio_value", {}) or {}
+        returns = float(pv.get("returns", 0))
+        risk = float(pv.get("risk", 50))
+        score = (returns / max(1.0, risk)) * 100.0 if risk > 0 else returns
+        return {
+            "Team": team_name,
+            "Risk-Adj Score": round(score, 2),
+            "Portfolio Value": round(float(pv.get("value", 1000000)), 2),
+            "Returns (%)": round(returns, 2),
+            "Risk": round(risk, 2)
+        }
+
+    elif game_type == "crypto_crash":
+        cp = team_data.get("crypto_portfolio", {}) or {}
+        return {
+            "Team": team_name,
+            "Final Equity": round(float(cp.get("equity", 1000)), 2),
+            "Total Return (%)": round(float(cp.get("total_return_pct", 0)), 2),
+            "Risk Exposure": round(float(cp.get("risk_exposure", 0)), 2),
+            "Risk Label": cp.get("risk_label", "Low"),
+            "Leverage": cp.get("leverage", 1),
+            "Liquidations": cp.get("liquidations", 0)
+        }
+
+    return None
+
+
+def _export_final_score_rows(game: dict) -> list:
+    """Final Scores rows (dicts), ranked by the game's headline score"""
+    rows = []
+    for team_name, team_data in game.get("teams", {}).items():
+        row = _final_score_row(game.get("game_type"), team_name, team_data)
+        if row:
+            rows.append(row)
+
+    if not rows:
+        return []
+
+    score_key = list(rows[0].keys())[1]
+    rows.sort(key=lambda r: r[score_key], reverse=True)
+    return [{"Rank": i, **row} for i, row in enumerate(rows, start=1)]
+
+
+def _round_detail_row(game_type: str, round_num: int, rd: dict) -> Optional[dict]:
+    if game_type == "build_country":
+        d = rd.get("decisions", {}) or {}
+        m = rd.get("metrics", {}) or {}
+        f = rd.get("fiscal", {}) or {}
+        return {
+            "Round": round_num,
+            "Tax Rate (slider)": d.get("tax_rate", 30),
+            "Education (slider)": d.get("education_spending", 25),
+            "Infrastructure (slider)": d.get("infrastructure_spending", 25),
+            "Climate Policy": d.get("climate_policy", "Moderate"),
+            "GDP": round(float(m.get("gdp", 100.0)), 2),
+            "Employment": round(float(m.get("employment", 75.0)), 2),
+            "Inequality": round(float(m.get("inequality", 50.0)), 2),
+            "Approval": round(float(m.get("approval", 50.0)), 2),
+            "Debt (%GDP)": round(float(m.get("debt", 0.0)), 2),
+            "Deficit (%GDP)": round(float(f.get("deficit_pct_gdp", 0.0)), 2),
+            "Score": round(float(rd.get("score", 0.0)), 2),
+        }
+
+    elif game_type == "beat_market":
+        d = rd.get("decisions", {}) or {}
+        pv = rd.get("portfolio_value", {}) or {}
+        return {
+            "Round": round_num,
+            "Cash (%)": d.get("cash_pct", 25),
+            "Shares (%)": d.get("shares_pct", 25),
+            "Crypto (%)": d.get("crypto_pct", 25),
+            "Bonds (%)": d.get("bonds_pct", 25),
+            "Portfolio Value": round(float(pv.get("value", 1000000)), 2),
+            "Returns (%)": round(float(pv.get("returns", 0.0)), 2),
+            "Risk": round(float(pv.get("risk", 50.0)), 2),
+            "Risk-Adj Score": round(float(rd.get("score", 0.0)), 2)
+        }
+
+    elif game_type == "crypto_crash":
+        d = rd.get("decisions", {}) or {}
+        alloc = d.get("allocations", {}) or {}
+        cp = rd.get("crypto_portfolio", {}) or {}
+        return {
+            "Round": round_num,
+            "BTC (%)": alloc.get("btc", 40),
+            "ETH (%)": alloc.get("eth", 30),
+            "DOGE (%)": alloc.get("doge", 20),
+            "Stable (%)": alloc.get("stable", 10),
+            "Leverage": d.get("leverage", 1),
+            "Equity": round(float(cp.get("equity", 1000.0)), 2),
+            "Round Return (%)": round(float(cp.get("last_return_pct", 0.0)), 2),
+            "Risk Label": cp.get("risk_label", "Low"),
+            "Liquidations": cp.get("liquidations", 0),
+        }
+
+    return None
+
+
+def _export_round_rows(game: dict, team_data: dict):
+    """Round-by-round rows (dicts) for one team, generated from round history"""
+    round_history = team_data.get("round_history", {}) or {}
+    for round_num in sorted(int(r) for r in round_history.keys()):
+        row = _round_detail_row(game.get("game_type"), round_num, round_history.get(str(round_num), {}) or {})
+        if row:
+            yield row
+
+
+def _excel_sheet_name(team_name: str) -> str:
+    sheet_name = team_name[:28] + "..." if len(team_name) > 31 else team_name
+    return "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in sheet_name)
+
+
+def _write_dict_rows(ws, rows) -> bool:
+    """Append dict rows to a write-only sheet (header from the first row). Returns True if anything was written"""
+    wrote = False
+    for row in rows:
+        if not wrote:
+            ws.append(list(row.keys()))
+            wrote = True
+        ws.append(list(row.values()))
+    return wrote
+
+
+def write_game_results_excel(game: dict, fileobj, progress=None):
+    """
+    Stream a game's results workbook into fileobj.
+    Uses openpyxl's write-only mode, so rows go straight from round history to
+    the sheet's temp file instead of being held as DataFrames/cell objects.
+    progress: optional callback(sheets_done, sheets_total)
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    teams = game.get("teams", {})
+    total_sheets = 2 + len(teams)
+
+    # Sheet 1: Game Summary
+    ws = wb.create_sheet("Game Summary")
+    for row in _export_summary_rows(game):
+        ws.append(row)
+    ws.close()
+
+    # Sheet 2: Final Scores
+    final_scores = _export_final_score_rows(game)
+    if final_scores:
+        ws = wb.create_sheet("Final Scores")
+        _write_dict_rows(ws, final_scores)
+        ws.close()
+
+    # Sheet 3-N: Round-by-Round Details for Each Team
+    for n, (team_name, team_data) in enumerate(teams.items(), start=2):
+        if progress:
+            progress(n, total_sheets)
+        if not team_data.get("round_history"):
+            continue
+        ws = wb.create_sheet(_excel_sheet_name(team_name))
+        if _write_dict_rows(ws, _export_round_rows(game, team_data)):
+            # Finish the sheet now so its XML writer is released before the next team
+            ws.close()
+        else:
+            wb.remove(ws)
+
+    wb.save(fileobj)
+    if progress:
+        progress(total_sheets, total_sheets)
+
+
+@instrumentation.instrumented
+def export_game_results_to_excel(join_code: str, progress=None) -> Optional[bytes]:
     """
     Export complete game results to Excel format with multiple sheets.
-    Returns: BytesIO object containing Excel file
+    The workbook is built in a spooled temp file (spills to disk above
+    config.EXPORT_SPOOL_MAX_BYTES). progress: see write_game_results_excel.
+    Returns: xlsx file contents as bytes, or None if the game doesn't exist
+    """
+    from tempfile import SpooledTemporaryFile
+
+    game = get_game_session(join_code)
+    if not game:
+        return None
+
+    with SpooledTemporaryFile(max_size=config.EXPORT_SPOOL_MAX_BYTES) as output:
+        write_game_results_excel(game, output, progress=progress)
+        output.seek(0)
+        return output.read()
+
+
+# ============================================================================
+# ANALYTICS EXPORT (CSV / PARQUET / ARROW)
+# The summary, final-score and round tables are built once as Arrow tables
+# and each format writer serializes the same tables into a zip bundle.
+# ============================================================================
+
+EXPORT_FORMATS = ("xlsx", "csv", "parquet", "arrow")
+
+
+def build_export_tables(join_code: str, game: dict) -> dict:
+    """
+    Arrow tables for a game, keyed by file name stem:
+    game_summary, final_scores, round_details (long format: one row per team
+    per round). Every table starts with a Join Code column so bundles from
+    many sessions can be concatenated.
+    """
+    import pyarrow as pa
+
+    header, values = list(_export_summary_rows(game))
+    summary = {"Join Code": join_code, **dict(zip(header, values))}
+
+    final_scores = [{"Join Code": join_code, **row} for row in _export_final_score_rows(game)]
+
+    round_details = []
+    for team_name, team_data in game.get("teams", {}).items():
+        for row in _export_round_rows(game, team_data):
+            round_details.append({"Join Code": join_code, "Team": team_name, **row})
+
+    return {
+        "game_summary": pa.Table.from_pylist([summary]),
+        "final_scores": pa.Table.from_pylist(final_scores),
+        "round_details": pa.Table.from_pylist(round_details),
+    }
+
+
+def _table_to_bytes(table, fmt: str) -> bytes:
+    import pyarrow as pa
+
+    sink = pa.BufferOutputStream()
+    if fmt == "csv":
+        import pyarrow.csv as pa_csv
+        pa_csv.write_csv(table, sink)
+    elif fmt == "parquet":
+        import pyarrow.parquet as pq
+        pq.write_table(table, sink, compression="zstd")
+    else:
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_file(sink, table.schema, options=options) as writer:
+            writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def write_export_bundle(tables: dict, fmt: str, fileobj, progress=None):
+    """Write Arrow tables into fileobj as a zip of .csv/.parquet/.arrow files"""
+    import zipfile
+
+    # Parquet and Arrow IPC are already compact; only CSV is worth deflating
+    compression = zipfile.ZIP_DEFLATED if fmt == "csv" else zipfile.ZIP_STORED
+
+    with zipfile.ZipFile(fileobj, "w", compression=compression) as zf:
+        for n, (name, table) in enumerate(tables.items(), start=1):
+            zf.writestr(f"{name}.{fmt}", _table_to_bytes(table, fmt))
+            if progress:
+                progress(n, len(tables))
+
+
+@instrumentation.instrumented
+def export_game_results(join_code: str, fmt: str = "xlsx", progress=None) -> Optional[bytes]:
+    """
+    Export game results as "xlsx" (same as export_game_results_to_excel) or as a
+    zip bundle of "csv", "parquet" or "arrow" (IPC file) tables.
+    Returns: file contents as bytes, or None if the game or format doesn't exist
     """
-    import pandas as pd
+    if fmt == "xlsx":
+        return export_game_results_to_excel(join_code, progress=progress)
+
+    if fmt not in EXPORT_FORMATS:
+        return None
+
     from io import BytesIO
 
     game = get_game_session(join_code)
@@ -1143,202 +2220,513 @@ def export_game_results_to_excel(join_code: str):
         return None
 
     output = BytesIO()
+    write_export_bundle(build_export_tables(join_code.upper(), game), fmt, output, progress=progress)
+    return output.getvalue()
 
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-
-        # Sheet 1: Game Summary
-        game_summary = {
-            "Game Type": [game.get("game_type", "Unknown")],
-            "Admin": [game.get("admin_name", "Unknown")],
-            "Created At": [game.get("created_at", "Unknown")],
-            "Status": [game.get("status", "Unknown")],
-            "Total Rounds": [game.get("settings", {}).get("num_rounds", 0)],
-            "Current Round": [game.get("current_round", 0)],
-            "Number of Teams": [len(game.get("teams", {}))]
-        }
-        pd.DataFrame(game_summary).to_excel(writer, sheet_name="Game Summary", index=False)
-
-        # Sheet 2: Final Scores
-        final_scores = []
-        for team_name, team_data in game.get("teams", {}).items():
-            if game["game_type"] == "build_country":
-                metrics = team_data.get("metrics", {}) or {}
-                fiscal = team_data.get("fiscal", {}) or {}
-
-                score = compute_build_country_score(team_data)
-
-                final_scores.append({
-                    "Team": team_name,
-                    "Final Score": round(score, 2),
-                    "GDP": round(float(metrics.get("gdp", 100.0)), 2),
-                    "Employment": round(float(metrics.get("employment", 75.0)), 2),
-                    "Inequality": round(float(metrics.get("inequality", 50.0)), 2),
-                    "Approval": round(float(metrics.get("approval", 50.0)), 2),
-                    "Debt (%GDP)": round(float(metrics.get("debt", 0.0)), 2),
-                    "Deficit (%GDP)": round(float(fiscal.get("deficit_pct_gdp", 0.0)), 2),
-                    "Revenue (%GDP)": round(float(fiscal.get("revenue_pct_gdp", 0.0)), 2),
-                    "Spend (%GDP)": round(float(fiscal.get("total_spend_pct_gdp", 0.0)), 2),
-                })
-
-            elif game["game_type"] == "beat_market":
-                pv = team_data.get("portfolio_value", {}) or {}
-                returns = float(pv.get("returns", 0))
-                risk = float(pv.get("risk", 50))
-                score = (returns / max(1.0, risk)) * 100.0 if risk > 0 else returns
-                final_scores.append({
-                    "Team": team_name,
-                    "Risk-Adj Score": round(score, 2),
-                    "Portfolio Value": round(float(pv.get("value", 1000000)), 2),
-                    "Returns (%)": round(returns, 2),
-                    "Risk": round(risk, 2)
-                })
-
-            elif game["game_type"] == "crypto_crash":
-                cp = team_data.get("crypto_portfolio", {}) or {}
-                final_scores.append({
-                    "Team": team_name,
-                    "Final Equity": round(float(cp.get("equity", 1000)), 2),
-                    "Total Return (%)": round(float(cp.get("total_return_pct", 0)), 2),
-                    "Risk Exposure": round(float(cp.get("risk_exposure", 0)), 2),
-                    "Risk Label": cp.get("risk_label", "Low"),
-                    "Leverage": cp.get("leverage", 1),
-                    "Liquidations": cp.get("liquidations", 0)
-                })
-
-        if final_scores:
-            df_final = pd.DataFrame(final_scores)
-            df_final = df_final.sort_values(by=df_final.columns[1], ascending=False)
-            df_final.insert(0, "Rank", range(1, len(df_final) + 1))
-            df_final.to_excel(writer, sheet_name="Final Scores", index=False)
-
-        # Sheet 3-N: Round-by-Round Details for Each Team
-        for team_name, team_data in game.get("teams", {}).items():
-            round_history = team_data.get("round_history", {}) or {}
-            if not round_history:
-                continue
-
-            rows = []
-            for round_num in sorted([int(r) for r in round_history.keys()]):
-                rd = round_history.get(str(round_num), {}) or {}
-
-                if game["game_type"] == "build_country":
-                    d = rd.get("decisions", {}) or {}
-                    m = rd.get("metrics", {}) or {}
-                    f = rd.get("fiscal", {}) or {}
-                    rows.append({
-                        "Round": round_num,
-                        "Tax Rate (slider)": d.get("tax_rate", 30),
-                        "Education (slider)": d.get("education_spending", 25),
-                        "Infrastructure (slider)": d.get("infrastructure_spending", 25),
-                        "Climate Policy": d.get("climate_policy", "Moderate"),
-                        "GDP": round(float(m.get("gdp", 100.0)), 2),
-                        "Employment": round(float(m.get("employment", 75.0)), 2),
-                        "Inequality": round(float(m.get("inequality", 50.0)), 2),
-                        "Approval": round(float(m.get("approval", 50.0)), 2),
-                        "Debt (%GDP)": round(float(m.get("debt", 0.0)), 2),
-                        "Deficit (%GDP)": round(float(f.get("deficit_pct_gdp", 0.0)), 2),
-                        "Score": round(float(rd.get("score", 0.0)), 2),
-                    })
-
-                elif game["game_type"] == "beat_market":
-                    d = rd.get("decisions", {}) or {}
-                    pv = rd.get("portfolio_value", {}) or {}
-                    rows.append({
-                        "Round": round_num,
-                        "Cash (%)": d.get("cash_pct", 25),
-                        "Shares (%)": d.get("shares_pct", 25),
-                        "Crypto (%)": d.get("crypto_pct", 25),
-                        "Bonds (%)": d.get("bonds_pct", 25),
-                        "Portfolio Value": round(float(pv.get("value", 1000000)), 2),
-                        "Returns (%)": round(float(pv.get("returns", 0.0)), 2),
-                        "Risk": round(float(pv.get("risk", 50.0)), 2),
-                        "Risk-Adj Score": round(float(rd.get("score", 0.0)), 2)
-                    })
-
-                elif game["game_type"] == "crypto_crash":
-                    d = rd.get("decisions", {}) or {}
-                    alloc = d.get("allocations", {}) or {}
-                    cp = rd.get("crypto_portfolio", {}) or {}
-                    rows.append({
-                        "Round": round_num,
-                        "BTC (%)": alloc.get("btc", 40),
-                        "ETH (%)": alloc.get("eth", 30),
-                        "DOGE (%)": alloc.get("doge", 20),
-                        "Stable (%)": alloc.get("stable", 10),
-                        "Leverage": d.get("leverage", 1),
-                        "Equity": round(float(cp.get("equity", 1000.0)), 2),
-                        "Round Return (%)": round(float(cp.get("last_return_pct", 0.0)), 2),
-                        "Risk Label": cp.get("risk_label", "Low"),
-                        "Liquidations": cp.get("liquidations", 0),
-                    })
-
-            if rows:
-                df_team = pd.DataFrame(rows)
-                sheet_name = team_name[:28] + "..." if len(team_name) > 31 else team_name
-                sheet_name = "".join(c if c.isalnum() or c in (' ', '_') else '_' for c in sheet_name)
-                df_team.to_excel(writer, sheet_name=sheet_name, index=False)
-
-    output.seek(0)
-    return output
+
+# ============================================================================
+# SESSION SUMMARY (MATERIALIZED COUNTERS)
+# Small per-session counters kept in SUMMARY_FILE so readers don't have to
+# load and scan team payloads. Team writers apply deltas; other session
+# writers rebuild from the game they already hold in memory. saved_teams names
+# the teams behind saved_count, so pending inbox saves aren't counted twice.
+# ============================================================================
+
+def _empty_summary() -> dict:
+    return {
+        "team_count": 0,
+        "ready_count": 0,
+        "saved_count": 0,
+        "auto_submitted_count": 0,
+        "current_round": 0,
+        "revision": 0,
+        "pending_count": 0,
+        "saved_teams": [],
+    }
+
+
+def _team_flags(team_data: Optional[dict], current_round) -> dict:
+    """Which summary counters a team contributes to (all 0 for a missing team)"""
+    if team_data is None:
+        return {"team_count": 0, "ready_count": 0, "saved_count": 0, "auto_submitted_count": 0}
+
+    saved = team_data.get("decision_saved_round") == current_round
+    return {
+        "team_count": 1,
+        "ready_count": int(bool(team_data.get("ready", False))),
+        "saved_count": int(saved),
+        "auto_submitted_count": int(saved and bool(team_data.get("auto_submitted", False))),
+    }
+
+
+def _summarize_game(game: dict) -> dict:
+    """Rebuild all counters from a game session (ignores revision)"""
+    summary = _empty_summary()
+    current_round = game.get("current_round", 0)
+    summary["current_round"] = current_round
+
+    for team_name, team_data in game.get("teams", {}).items():
+        flags = _team_flags(team_data, current_round)
+        for key, value in flags.items():
+            summary[key] += value
+        if flags["saved_count"]:
+            summary["saved_teams"].append(team_name)
+
+    return summary
+
+
+def _refresh_summary(join_code: str, game: dict):
+    """Rebuild a session's summary after a non-team write (revision follows the game's)"""
+    summaries = _load_state(SUMMARY_FILE)
+
+    summary = _summarize_game(game)
+    summary["revision"] = game.get("revision", 0)
+
+    summaries[join_code] = summary
+    _save_state(SUMMARY_FILE, summaries)
+
+
+def _update_summary_for_team(join_code: str, game: dict, team_name: str,
+                             before: Optional[dict], after: Optional[dict]):
+    """Apply one team's before/after change to the session summary incrementally"""
+    summaries = _load_state(SUMMARY_FILE)
+    summary = summaries.get(join_code)
+    current_round = game.get("current_round", 0)
+
+    if summary is None or summary.get("current_round") != current_round or "saved_teams" not in summary:
+        # Missing, from another round or from before saved_teams: fall back to a full rebuild
+        summary = _summarize_game(game)
+    else:
+        old_flags = _team_flags(before, current_round)
+        new_flags = _team_flags(after, current_round)
+        for key in old_flags:
+            summary[key] += new_flags[key] - old_flags[key]
+        saved_teams = [name for name in summary["saved_teams"] if name != team_name]
+        summary["saved_teams"] = saved_teams + [team_name] if new_flags["saved_count"] else saved_teams
+
+    summary["revision"] = game.get("revision", 0)
+    summaries[join_code] = summary
+    _save_state(SUMMARY_FILE, summaries)
+
+
+def _drop_summaries(join_codes: list):
+    summaries = _load_state(SUMMARY_FILE)
+    for code in join_codes:
+        summaries.pop(code, None)
+    _save_state(SUMMARY_FILE, summaries)
+
+
+@_served
+def get_session_summary(join_code: str) -> dict:
+    """
+    Get materialized counters for a session:
+    team_count, ready_count, saved_count (decisions saved this round,
+    including pending_count decisions still in the inbox),
+    auto_submitted_count, current_round, revision, and saved_teams (the
+    teams counted in saved_count before inbox decisions).
+    Returns zeroed counters if the session does not exist.
+    """
+    init_data_dir()
+    join_code = join_code.upper() if join_code else ""
+    summary = _read_state(SUMMARY_FILE, join_code)
+
+    if summary is None or "saved_teams" not in summary:
+        # Sessions created before summaries (or saved_teams) existed: build once on demand
+        with _state_lock():
+            game = _load_state(GAMES_FILE).get(join_code)
+            if not game:
+                return _empty_summary()
+            _refresh_summary(join_code, game)
+        summary = _read_state(SUMMARY_FILE, join_code) or _empty_summary()
+
+    pending = {team for team, round_num in _read_inbox(join_code) if round_num == summary["current_round"]}
+    summary["pending_count"] = len(pending)
+    summary["saved_count"] += len(pending - set(summary["saved_teams"]))
+    return summary
+
+
+@_served
+def get_all_session_summaries() -> dict:
+    """Stored counters of every session ({join_code: summary}, without inbox counts; for monitoring)"""
+    init_data_dir()
+    return _read_all_state(SUMMARY_FILE)
+
+
+# ============================================================================
+# REVISIONS (OPTIMISTIC CONCURRENCY)
+# Every write bumps game["revision"]; team writes also stamp it on the team.
+# The *_cas writers refuse stale updates, and pollers can skip reloading a
+# session whose revision hasn't moved.
+# ============================================================================
+
+def _bump_revision(game: dict) -> int:
+    game["revision"] = game.get("revision", 0) + 1
+    return game["revision"]
+
+
+@_served
+def get_revision(join_code: str) -> int:
+    """Current revision of a session (0 if it doesn't exist); reads the small summary file"""
+    return get_session_summary(join_code).get("revision", 0)
+
+
+def _inbox_bytes(join_code: str) -> int:
+    """Size of the session's queued saves; grows with every save until a merge, which bumps the revision"""
+    path = _inbox_path(join_code)
+    total = 0
+    for inbox in (path, path + ".merging", path + ".incoming"):
+        try:
+            total += os.path.getsize(inbox)
+        except OSError:
+            pass
+    return total
+
+
+@_served
+def get_version(join_code: str) -> tuple:
+    """
+    (revision, inbox bytes): what readers of the session see changes whenever
+    this does. Saves queued in the inbox don't bump the revision, so the
+    revision alone misses them.
+    """
+    join_code = join_code.upper()
+    return get_revision(join_code), _inbox_bytes(join_code)
+
+
+@_served
+def get_game_session_if_changed(join_code: str, known_version: Optional[tuple]) -> tuple:
+    """
+    known_version: get_version() of the copy the caller has (None = none yet).
+    Returns: (version, game) - game is None when the session is still at
+    known_version (or doesn't exist), so callers can keep what they have
+    """
+    version = get_version(join_code)
+    if known_version is not None and tuple(known_version) == version:
+        return version, None
+
+    game = get_game_session(join_code)
+    # Read the version first: a save landing in between only costs the caller one more reload
+    return version if game else (0, 0), game
+
+
+_SESSION_CACHE = {}  # join_code -> (version, game), least recently used first
+_SESSION_CACHE_LOCK = threading.Lock()
+
+
+def get_game_session_cached(join_code: str) -> tuple:
+    """
+    The session as one copy shared by every viewer in this process, reloaded
+    only when its version moves. For read-only callers: don't modify it.
+    Returns: (version, game) - game is None if the session doesn't exist
+    """
+    join_code = join_code.upper() if join_code else ""
+    with _SESSION_CACHE_LOCK:
+        cached = _SESSION_CACHE.get(join_code)
+
+    version, game = get_game_session_if_changed(join_code, cached[0] if cached else None)
+    version = tuple(version)  # a list when it comes from the state server
+    if game is None:
+        return version, cached[1] if cached and version == cached[0] else None
+
+    with _SESSION_CACHE_LOCK:
+        _SESSION_CACHE.pop(join_code, None)
+        _SESSION_CACHE[join_code] = (version, game)
+        while len(_SESSION_CACHE) > config.SESSION_CACHE_MAX_ENTRIES:
+            _SESSION_CACHE.pop(next(iter(_SESSION_CACHE)))
+    return version, game
+
+
+# ============================================================================
+# CHANGE SUBSCRIPTIONS
+# subscribe() yields typed change events instead of callers polling
+# get_game_session. Each session has one watcher per event loop, shared by all
+# of its subscribers: it notices changes (state server push, or one summary
+# poll per interval), loads the session once and diffs it against the previous
+# copy, then fans the events out to every subscriber's queue. asyncio is
+# imported in the functions, as only async callers need it.
+# ============================================================================
+
+_WATCHERS = {}  # (event loop, join_code) -> {"task", "queues", "game"}
+_WATCHERS_LOCK = threading.Lock()
+
+
+def _change_events(join_code: str, old: Optional[dict], new: Optional[dict]) -> list:
+    """Typed events between two copies of a session (old None = first load)"""
+    if old is None:
+        return []
+
+    def event(kind: str, **fields) -> dict:
+        return {"type": kind, "join_code": join_code, "revision": (new or {}).get("revision", 0),
+                "round": (new or old).get("current_round", 0), **fields}
+
+    if new is None:
+        return [event("session_deleted")]
+
+    events = []
+    if new.get("status") != old.get("status"):
+        events.append(event("status_changed", status=new.get("status"), previous=old.get("status")))
+    if new.get("current_round", 0) > old.get("current_round", 0):
+        events.append(event("round_advanced", previous=old.get("current_round", 0)))
+    if new.get("round_locked") and not old.get("round_locked"):
+        events.append(event("round_locked"))
+    elif old.get("round_locked") and not new.get("round_locked") and new.get("current_round") == old.get("current_round"):
+        events.append(event("round_unlocked"))
+
+    old_teams = old.get("teams", {})
+    current_round = new.get("current_round", 0)
+    for team_name, team in new.get("teams", {}).items():
+        before = old_teams.get(team_name)
+        if before is None:
+            events.append(event("team_joined", team=team_name, team_slot=team.get("team_slot")))
+            before = {}
+        if team.get("decision_saved_round") == current_round != before.get("decision_saved_round"):
+            events.append(event("decision_saved", team=team_name))
+
+    for team_name in old_teams.keys() - new.get("teams", {}).keys():
+        events.append(event("team_left", team=team_name))
+
+    if not events and new.get("revision") != old.get("revision"):
+        events.append(event("updated"))
+    return events
+
+
+def _offer(q: "asyncio.Queue", event: dict):
+    import asyncio
+    try:
+        q.put_nowait(event)
+    except asyncio.QueueFull:
+        # Slow subscriber: drop its backlog and tell it to reload
+        while not q.empty():
+            q.get_nowait()
+        q.put_nowait(dict(event, type="resync"))
+
+
+async def _listen_for_changes(join_code: str, changed: "asyncio.Event"):
+    """Set changed whenever the session's revision or queued decisions move"""
+    import asyncio
+    if STATE_BACKEND == "server":
+        from state_server import subscribe_revisions
+        async for _ in subscribe_revisions(join_code):
+            changed.set()
+        return
+
+    last = None
+    while True:
+        summary = await asyncio.to_thread(get_session_summary, join_code)
+        version = (summary.get("revision", 0), summary.get("pending_count", 0))
+        if version != last:
+            last = version
+            changed.set()
+        await asyncio.sleep(config.SUBSCRIBE_POLL_INTERVAL_SECONDS)
+
+
+async def _watch_session(join_code: str, watcher: dict):
+    import asyncio
+    changed = asyncio.Event()
+    listener = asyncio.ensure_future(_listen_for_changes(join_code, changed))
+    try:
+        while True:
+            waiter = asyncio.ensure_future(changed.wait())
+            await asyncio.wait({waiter, listener}, return_when=asyncio.FIRST_COMPLETED)
+            if not waiter.done():
+                waiter.cancel()
+                listener.result()  # re-raise why the change feed stopped
+                raise ConnectionError("change feed closed")
+            changed.clear()  # changes arriving during the load below are coalesced into the next one
+
+            game = await asyncio.to_thread(get_game_session, join_code)
+            events = _change_events(join_code, watcher["game"], game)
+            watcher["game"] = game
+            for event in events:
+                for q in list(watcher["queues"]):
+                    _offer(q, event)
+    except Exception as e:
+        for q in list(watcher["queues"]):
+            _offer(q, {"type": "error", "join_code": join_code, "revision": None, "round": None, "error": str(e)})
+    finally:
+        listener.cancel()
+
+
+async def subscribe(join_code: str, since_revision: Optional[int] = None):
+    """
+    Async iterator of change events for a session, e.g.
+        async for event in state.subscribe("ABC123", revision): ...
+    Events are dicts with type (team_joined, team_left, decision_saved,
+    round_locked, round_unlocked, round_advanced, status_changed, updated,
+    session_deleted, resync or error), join_code, revision, round and, for
+    team events, team. If the session is already past since_revision, the
+    first event is a resync (reload it). Iteration ends after session_deleted
+    or error (e.g. the state server went away).
+    """
+    import asyncio
+
+    join_code = join_code.upper()
+    loop = asyncio.get_running_loop()
+    key = (loop, join_code)
+    q = asyncio.Queue(maxsize=config.SUBSCRIBER_QUEUE_SIZE)
+
+    with _WATCHERS_LOCK:
+        watcher = _WATCHERS.get(key)
+        if watcher is None or watcher["task"].done():
+            watcher = {"task": None, "queues": set(), "game": None}
+            watcher["task"] = asyncio.ensure_future(_watch_session(join_code, watcher))
+            _WATCHERS[key] = watcher
+        watcher["queues"].add(q)
+
+    try:
+        if since_revision is not None:
+            revision = await asyncio.to_thread(get_revision, join_code)
+            if revision != since_revision:
+                yield {"type": "resync", "join_code": join_code, "revision": revision, "round": None}
+
+        while True:
+            event = await q.get()
+            yield event
+            if event["type"] in ("session_deleted", "error"):
+                return
+    finally:
+        with _WATCHERS_LOCK:
+            watcher["queues"].discard(q)
+            if not watcher["queues"]:
+                watcher["task"].cancel()
+                # A subscriber that arrived after this watcher's task ended has already installed its own
+                if _WATCHERS.get(key) is watcher:
+                    del _WATCHERS[key]
 
 
 # ============================================================================
 # USER SESSION MANAGEMENT
 # ============================================================================
 
+def _session_state():
+    """st.session_state (Streamlit is imported here, not at the top, so workers and CLIs don't need it)"""
+    import streamlit as st
+    return st.session_state
+
+
 def init_user_session():
     """Initialize user session state."""
-    if "user_type" not in st.session_state:
-        st.session_state.user_type = None
+    session = _session_state()
+    if "user_type" not in session:
+        session.user_type = None
+
+    if "join_code" not in session:
+        session.join_code = None
 
-    if "join_code" not in st.session_state:
-        st.session_state.join_code = None
+    if "team_name" not in session:
+        session.team_name = None
 
-    if "team_name" not in st.session_state:
-        st.session_state.team_name = None
+    if "admin_name" not in session:
+        session.admin_name = None
 
-    if "admin_name" not in st.session_state:
-        st.session_state.admin_name = None
+    # Every page calls this first; starts the metrics thread once per process if configured
+    import metrics_exporter
+    metrics_exporter.start()
 
 
 def set_user_as_admin(admin_name: str, join_code: str):
     """Set current user as admin."""
-    st.session_state.user_type = "admin"
-    st.session_state.admin_name = admin_name
-    st.session_state.join_code = join_code.upper()
-    st.session_state.team_name = None
+    session = _session_state()
+    session.user_type = "admin"
+    session.admin_name = admin_name
+    session.join_code = join_code.upper()
+    session.team_name = None
 
 
 def set_user_as_team(team_name: str, join_code: str):
     """Set current user as team"""
-    st.session_state.user_type = "team"
-    st.session_state.team_name = team_name
-    st.session_state.join_code = join_code.upper()
-    st.session_state.admin_name = None
+    session = _session_state()
+    session.user_type = "team"
+    session.team_name = team_name
+    session.join_code = join_code.upper()
+    session.admin_name = None
 
 
 def clear_user_session():
     """Clear user session"""
-    st.session_state.user_type = None
-    st.session_state.join_code = None
-    st.session_state.team_name = None
-    st.session_state.admin_name = None
+    session = _session_state()
+    session.user_type = None
+    session.join_code = None
+    session.team_name = None
+    session.admin_name = None
 
 
 def is_admin() -> bool:
     """Check if current user is admin."""
-    return st.session_state.get("user_type") == "admin"
+    return _session_state().get("user_type") == "admin"
 
 
 def is_team() -> bool:
     """Check if current user is team"""
-    return st.session_state.get("user_type") == "team"
+    return _session_state().get("user_type") == "team"
+
+
+def _page_context() -> tuple:
+    """(viewer session id, trace context) of this script run"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+    ctx = get_script_run_ctx()
+    session = _session_state()
+    return ctx.session_id if ctx else None, {"join_code": session.get("join_code"),
+                                             "user_type": session.get("user_type"),
+                                             "team_name": session.get("team_name")}
+
+
+def track_page_view(page: str):
+    """
+    Count this run of a page for the Operations page and trace its state calls
+    until finish_page_view() (no-op unless instrumentation is on)
+    """
+    if not instrumentation.ENABLED:
+        return
+    viewer, context = _page_context()
+    instrumentation.record_rerun(page, viewer, context["join_code"])
+    instrumentation.begin_trace("rerun", owner=viewer, page=page, **context)
+
+
+def finish_page_view():
+    """End this page run's trace, logging it if it was slow"""
+    instrumentation.end_trace()
+
+
+@contextmanager
+def page_view(page: str):
+    """
+    Wrap a page's script body: track_page_view() on entry and finish_page_view()
+    on every way out, including st.stop(), st.rerun() and errors
+    """
+    track_page_view(page)
+    try:
+        yield
+    finally:
+        finish_page_view()
+
+
+def fragment_view(page: str, fragment: str):
+    """
+    Decorator for st.fragment functions (below @st.fragment): a fragment rerun
+    on its own is traced as a "fragment" run; during a full page run the
+    fragment's calls are part of the page's trace
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not instrumentation.ENABLED or instrumentation.current_trace_id() is not None:
+                return func(*args, **kwargs)
+            viewer, context = _page_context()
+            instrumentation.begin_trace("fragment", owner=viewer, page=page, fragment=fragment, **context)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                instrumentation.end_trace()
+        return wrapper
+    return decorate
 
 
 def get_current_game() -> Optional[dict]:
     """Get current user's game session"""
-    if st.session_state.get("join_code"):
-        return get_game_session(st.session_state.join_code)
+    session = _session_state()
+    if session.get("join_code"):
+        return get_game_session(session.join_code)
     return None
 
 
@@ -1346,35 +2734,38 @@ def get_current_game() -> Optional[dict]:
 # HELPER FUNCTIONS
 # ============================================================================
 
+@_served
 def get_team_count(join_code: str) -> int:
     """Get number of teams in game"""
-    game = get_game_session(join_code)
-    return len(game.get("teams", {})) if game else 0
+    return get_session_summary(join_code)["team_count"]
 
 
+@_served
 def get_ready_team_count(join_code: str) -> int:
     """Get number of teams marked as ready"""
-    game = get_game_session(join_code)
-    if not game:
-        return 0
-
-    return sum(1 for team in game.get("teams", {}).values() if team.get("ready", False))
+    return get_session_summary(join_code)["ready_count"]
 
 
+@_served
 def are_all_teams_ready(join_code: str) -> bool:
     """Check if all teams are ready"""
-    game = get_game_session(join_code)
-    if not game or not game.get("teams"):
-        return False
-
-    return all(team.get("ready", False) for team in game["teams"].values())
+    summary = get_session_summary(join_code)
+    return summary["team_count"] > 0 and summary["ready_count"] == summary["team_count"]
 
 
+@_served
 def set_team_ready(join_code: str, team_name: str, ready: bool = True):
     """Mark team as ready or not ready"""
     update_team_data(join_code, team_name, {"ready": ready})
 
 
+def is_large_class(game: dict) -> bool:
+    """Large-class (lecture hall) mode: opted in at creation or more teams than LARGE_CLASS_THRESHOLD"""
+    if game.get("settings", {}).get("large_class"):
+        return True
+    return len(game.get("teams", {})) > config.LARGE_CLASS_THRESHOLD
+
+
 def format_time_remaining(seconds: int) -> str:
     """Format seconds into MM:SS"""
     minutes = seconds // 60
@@ -1382,10 +2773,29 @@ def format_time_remaining(seconds: int) -> str:
     return f"{minutes:02d}:{secs:02d}"
 
 
+@_served
 def cleanup_old_sessions(hours: int = 24):
     """Clean up game sessions older than specified hours"""
     init_data_dir()
-    games = load_json(GAMES_FILE)
+    with _state_lock():
+        deleted, finished = _cleanup_old_sessions(hours)
+
+    # Keep finished games in the analytics warehouse; Parquet writes are slow, so not under the lock
+    if finished:
+        import warehouse
+        for code, game in finished.items():
+            try:
+                warehouse.archive_session(code, game)
+            except Exception as e:  # one bad archive mustn't stop the cleanup or session creation
+                import logging
+                logging.getLogger("economics_games.archive").warning("archiving session %s failed: %s", code, e)
+
+    return deleted
+
+
+def _cleanup_old_sessions(hours: int) -> tuple:
+    """Drop sessions older than hours; returns (count, {code: game} of the finished ones to archive)"""
+    games = _load_state(GAMES_FILE)
     cutoff = datetime.now() - timedelta(hours=hours)
 
     to_delete = []
@@ -1394,10 +2804,14 @@ def cleanup_old_sessions(hours: int = 24):
         if created < cutoff:
             to_delete.append(code)
 
+    finished = {code: games[code] for code in to_delete if games[code].get("status") == "finished"}
+
     for code in to_delete:
         del games[code]
 
     if to_delete:
-        save_json(GAMES_FILE, games)
+        _save_state(GAMES_FILE, games, critical=True)
+        _drop_summaries(to_delete)
+        _drop_inboxes(to_delete)
 
-    return len(to_delete)
+    return len(to_delete), finished
@@ -0,0 +1,446 @@
+"""
+Local state daemon for running several Streamlit workers against one game state
+
+The daemon owns all sessions in memory (the "memory" backend, flushed to the
+data directory in the background) and runs the shared_state functions on
+behalf of its clients. Workers set STATE_BACKEND = "server" and shared_state
+forwards its state calls here through StateClient's connection pool.
+
+Protocol: one JSON object per line in each direction.
+    {"id": 1, "op": "get", "join_code": "ABC123"}
+    {"id": 2, "op": "update", "join_code": "ABC123", "updates": {...}, "expected_revision": 7}
+    {"id": 3, "op": "call", "fn": "update_team_data", "args": [...], "kwargs": {...}}
+    {"id": 4, "op": "transaction", "calls": [["lock_round", ["ABC123"], {}], ...]}
+    {"id": 5, "op": "subscribe", "join_code": "ABC123", "since_revision": 7}
+    {"id": 6, "op": "ping"}
+Requests may carry the caller's "trace" ID, under which the daemon logs its
+slow state work. Replies are {"id", "ok": true, "result"} or {"id", "ok": false, "error"}. After
+a subscribe reply the connection only carries
+{"event": "revision", "join_code", "revision", "pending_count"} lines (sent
+when the session's revision or number of queued inbox decisions changes)
+until it is closed.
+
+Usage:
+    python state_server.py                      # Unix socket <data dir>/state.sock
+    python state_server.py --address 127.0.0.1:8765
+"""
+
+import argparse
+import asyncio
+import functools
+import inspect
+import json
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+
+import config
+import instrumentation
+
+ENCODING = "utf-8"
+
+
+def default_address() -> str:
+    """config.STATE_SERVER_ADDRESS (ECONOMICS_GAMES_STATE_SERVER overrides), or a socket in the data dir"""
+    address = os.environ.get("ECONOMICS_GAMES_STATE_SERVER", config.STATE_SERVER_ADDRESS)
+    if address:
+        return address
+    data_dir = os.environ.get("ECONOMICS_GAMES_DATA_DIR", config.DATA_DIRECTORY)
+    return "unix:" + os.path.join(data_dir, "state.sock")
+
+
+def parse_address(address: str) -> tuple:
+    """
+    "unix:/path/state.sock" or "/path/state.sock" -> ("unix", path)
+    "host:port" -> ("tcp", (host, port))
+    """
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    if address.startswith("/"):
+        return "unix", address
+
+    host, _, port = address.rpartition(":")
+    return "tcp", (host or "127.0.0.1", int(port))
+
+
+# Served functions that take no join code and change no session (others, like cleanup, may change any)
+_NO_SESSION_CHANGES = frozenset({"flush_state", "state_backend_info", "get_instrumentation_snapshot",
+                                 "reset_instrumentation", "get_all_game_sessions", "get_all_session_summaries"})
+
+
+@functools.lru_cache(maxsize=None)
+def _takes_join_code_first(fn) -> bool:
+    parameters = list(inspect.signature(fn).parameters)
+    return bool(parameters) and parameters[0] == "join_code"
+
+
+def _encode(message: dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode(ENCODING) + b"\n"
+
+
+# ============================================================================
+# SERVER
+# ============================================================================
+
+class StateServer:
+    """Serves shared_state calls and revision notifications to worker processes"""
+
+    def __init__(self, address: str = None):
+        import shared_state as state
+
+        # The daemon is the single owner of the state: serve it from memory
+        state.STATE_BACKEND = "memory"
+        state.init_data_dir()
+
+        self.state = state
+        self.address = address or default_address()
+        self._server = None
+        self._connections = set()
+        self._subscribers = {}   # join_code -> set of asyncio.Queue
+        self._versions = {}      # join_code -> last published (revision, pending_count)
+
+    async def start(self):
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.exists(target):
+                os.remove(target)
+            self._server = await asyncio.start_unix_server(self._handle, path=target, limit=2 ** 26)
+        else:
+            self._server = await asyncio.start_server(self._handle, host=target[0], port=target[1], limit=2 ** 26)
+
+    async def serve_forever(self):
+        await self._server.serve_forever()
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self._connections):
+                writer.close()
+            await self._server.wait_closed()
+
+        kind, target = parse_address(self.address)
+        if kind == "unix" and os.path.exists(target):
+            os.remove(target)
+
+        await asyncio.get_running_loop().run_in_executor(None, self.state.flush_state)
+
+    # ------------------------------------------------------------------ requests
+
+    def _execute(self, message: dict):
+        """Run one request against shared_state (in a worker thread), traced under the caller's trace ID"""
+        instrumentation.begin_trace("request", message.get("trace"), op=message.get("op"), function=message.get("fn"))
+        try:
+            return self._run(message)
+        finally:
+            instrumentation.end_trace()
+
+    def _run(self, message: dict):
+        op = message.get("op")
+
+        if op == "ping":
+            return "pong"
+        if op == "get":
+            return self.state.get_game_session(message["join_code"])
+        if op == "update":
+            if message.get("expected_revision") is None:
+                self.state.update_game_session(message["join_code"], message["updates"])
+                return [True, "Game updated", self.state.get_revision(message["join_code"])]
+            return self.state.update_game_session_cas(message["join_code"], message["updates"],
+                                                      message["expected_revision"])
+        if op == "call":
+            return self.state.call_served(message["fn"], message.get("args", []), message.get("kwargs", {}))
+        if op == "transaction":
+            return self.state.run_transaction(message["calls"])
+
+        raise ValueError(f"Unknown op {op!r}")
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        self._connections.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+
+                message = json.loads(line)
+                if message.get("op") == "subscribe":
+                    await self._stream(message, reader, writer)
+                    break
+
+                try:
+                    result = await loop.run_in_executor(None, self._execute, message)
+                    reply = {"id": message.get("id"), "ok": True, "result": result}
+                except Exception as e:
+                    reply = {"id": message.get("id"), "ok": False, "error": f"{type(e).__name__}: {e}"}
+
+                writer.write(_encode(reply))
+                await writer.drain()
+
+                if message.get("op") in ("update", "call", "transaction"):
+                    await self._publish(self._touched(message))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._connections.discard(writer)
+            writer.close()
+
+    # ------------------------------------------------------------------ subscriptions
+
+    async def _current_version(self, join_code: str) -> tuple:
+        """(revision, pending_count): queued inbox decisions don't bump the revision"""
+        loop = asyncio.get_running_loop()
+        summary = await loop.run_in_executor(None, self.state.get_session_summary, join_code)
+        return summary.get("revision", 0), summary.get("pending_count", 0)
+
+    @staticmethod
+    def _event(join_code: str, version: tuple) -> dict:
+        return {"event": "revision", "join_code": join_code, "revision": version[0], "pending_count": version[1]}
+
+    def _touched(self, message: dict):
+        """Join codes a request may have changed, or None if it doesn't name them (e.g. cleanup)"""
+        if message.get("op") == "update":
+            return {message["join_code"].upper()}
+
+        if message.get("op") == "call":
+            calls = [(message["fn"], message.get("args", []), message.get("kwargs", {}))]
+        else:
+            calls = message.get("calls", [])
+
+        join_codes = set()
+        for fn, args, kwargs in calls:
+            if fn not in self.state.SERVED_FUNCTIONS or fn in _NO_SESSION_CHANGES:
+                continue  # refused without running, or read-only
+            if "join_code" in kwargs:
+                join_code = kwargs["join_code"]
+            elif args and _takes_join_code_first(self.state.SERVED_FUNCTIONS[fn]):
+                join_code = args[0]
+            else:
+                return None
+            if join_code:
+                join_codes.add(str(join_code).upper())
+        return join_codes
+
+    async def _publish(self, join_codes: set = None):
+        """Tell the subscribers of the given sessions (None = every session) that changed"""
+        targets = self._subscribers if join_codes is None else {
+            code: self._subscribers[code] for code in join_codes if code in self._subscribers}
+        for join_code, queues in list(targets.items()):
+            if not queues:
+                continue
+            version = await self._current_version(join_code)
+            last = self._versions.get(join_code, (-1, 0))
+            # Publishers race; never send a revision older than one already sent (0 = deleted)
+            if version == last or (version[0] < last[0] and version[0] != 0):
+                continue
+            self._versions[join_code] = version
+            event = self._event(join_code, version)
+            for q in list(queues):
+                q.put_nowait(event)
+
+    async def _stream(self, message: dict, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        join_code = message["join_code"].upper()
+        since = message.get("since_revision")
+
+        q = asyncio.Queue()
+        self._subscribers.setdefault(join_code, set()).add(q)
+        closed = asyncio.ensure_future(reader.read())  # completes when the client hangs up
+        try:
+            version = await self._current_version(join_code)
+            self._versions.setdefault(join_code, version)
+            writer.write(_encode({"id": message.get("id"), "ok": True, "result": version[0]}))
+            if since is None or version[0] != since:
+                writer.write(_encode(self._event(join_code, version)))
+            await writer.drain()
+
+            while True:
+                getter = asyncio.ensure_future(q.get())
+                done, _ = await asyncio.wait({getter, closed}, return_when=asyncio.FIRST_COMPLETED)
+                if getter not in done:
+                    getter.cancel()
+                    break
+                writer.write(_encode(getter.result()))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            closed.cancel()
+            self._subscribers[join_code].discard(q)
+
+
+# ============================================================================
+# CLIENT
+# ============================================================================
+
+class StateServerError(RuntimeError):
+    """The state server could not be reached or failed to run a call"""
+
+
+class StateClient:
+    """Thread-safe blocking client; each call borrows a pooled connection"""
+
+    def __init__(self, address: str = None, pool_size: int = None, timeout: float = None):
+        self.address = address or default_address()
+        self.pool_size = pool_size or config.STATE_SERVER_POOL_SIZE
+        self.timeout = timeout or config.STATE_SERVER_TIMEOUT_SECONDS
+        self._pool = queue.LifoQueue()
+        self._ids = 0
+        self._ids_lock = threading.Lock()
+
+    def _connect(self):
+        kind, target = parse_address(self.address)
+        sock = socket.socket(socket.AF_UNIX if kind == "unix" else socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(target)
+        except OSError as e:
+            sock.close()
+            raise StateServerError(
+                f"State server not reachable at {self.address} ({e}); start it with: python state_server.py"
+            ) from e
+        if kind == "tcp":
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock, sock.makefile("rb")
+
+    def _next_id(self) -> int:
+        with self._ids_lock:
+            self._ids += 1
+            return self._ids
+
+    def request(self, message: dict):
+        """Send one request and wait for its reply; returns the result or raises StateServerError"""
+        message = dict(message, id=self._next_id())
+        trace_id = instrumentation.current_trace_id()
+        if trace_id is not None:
+            message["trace"] = trace_id
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+
+        sock, reader = conn
+        try:
+            sock.sendall(_encode(message))
+            line = reader.readline()
+            if not line:
+                raise ConnectionError("connection closed by state server")
+        except OSError as e:
+            sock.close()
+            raise StateServerError(f"State server request failed: {e}") from e
+
+        if self._pool.qsize() < self.pool_size:
+            self._pool.put(conn)
+        else:
+            sock.close()
+
+        reply = json.loads(line)
+        if not reply.get("ok"):
+            raise StateServerError(reply.get("error", "unknown error"))
+        return reply.get("result")
+
+    def call(self, fn: str, args=(), kwargs: dict = None):
+        """Run shared_state.<fn>(*args, **kwargs) in the server"""
+        return self.request({"op": "call", "fn": fn, "args": list(args), "kwargs": kwargs or {}})
+
+    def get(self, join_code: str):
+        return self.request({"op": "get", "join_code": join_code})
+
+    def update(self, join_code: str, updates: dict, expected_revision: int = None):
+        return self.request({"op": "update", "join_code": join_code, "updates": updates,
+                             "expected_revision": expected_revision})
+
+    def transaction(self, calls: list) -> list:
+        """Run [(fn, args, kwargs), ...] atomically in the server; returns their results"""
+        return self.request({"op": "transaction", "calls": [[fn, list(args), kwargs or {}] for fn, args, kwargs in calls]})
+
+    def ping(self) -> bool:
+        return self.request({"op": "ping"}) == "pong"
+
+    def close(self):
+        while True:
+            try:
+                sock, _ = self._pool.get_nowait()
+            except queue.Empty:
+                return
+            sock.close()
+
+
+async def subscribe_revisions(join_code: str, since_revision: int = None, address: str = None):
+    """
+    Async iterator of {"event": "revision", "join_code", "revision",
+    "pending_count"} from the state server, starting with the current one if
+    its revision differs from since_revision. Uses its own connection for as
+    long as it is iterated.
+    """
+    kind, target = parse_address(address or default_address())
+    if kind == "unix":
+        reader, writer = await asyncio.open_unix_connection(target)
+    else:
+        reader, writer = await asyncio.open_connection(target[0], target[1])
+
+    try:
+        writer.write(_encode({"id": 1, "op": "subscribe", "join_code": join_code, "since_revision": since_revision}))
+        await writer.drain()
+
+        reply = json.loads(await reader.readline() or b"{}")
+        if not reply.get("ok"):
+            raise StateServerError(reply.get("error", "subscribe failed"))
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                return
+            yield json.loads(line)
+    finally:
+        writer.close()
+
+
+# ============================================================================
+# MAIN
+# ============================================================================
+
+async def _run(address: str):
+    server = StateServer(address)
+    await server.start()
+    print(f"State server listening on {server.address} (data dir {server.state.DATA_DIR})", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:  # Windows
+            pass
+
+    serving = asyncio.ensure_future(server.serve_forever())
+    await stop.wait()
+    serving.cancel()
+    await server.stop()
+    print("State server stopped; state flushed.", flush=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local state daemon for multiple Streamlit workers")
+    parser.add_argument("--address", default=None,
+                        help="unix:/path/to.sock or host:port (default: config.STATE_SERVER_ADDRESS)")
+    parser.add_argument("--metrics-port", type=int, default=None,
+                        help="serve the daemon's Prometheus metrics on this local port")
+    args = parser.parse_args()
+
+    if not instrumentation.SLOW_LOG_FILE:
+        # Not the workers' file: rotating it from two processes would lose lines
+        instrumentation.SLOW_LOG_FILE = os.path.join(os.path.dirname(instrumentation.slow_log_path()),
+                                                     "slow_operations.state_server.jsonl")
+    if args.metrics_port is not None:
+        import metrics_exporter
+        metrics_exporter.start(args.metrics_port)
+
+    asyncio.run(_run(args.address or default_address()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,296 @@
+"""
+Cross-session analytics warehouse.
+
+Finished games are appended to a Parquet dataset partitioned by game type and
+session date (game_type=<type>/date=<YYYY-MM-DD>/<JOIN_CODE>-0.parquet), one
+row per team per round. Queries read the dataset, not live state, and filter
+on the partition columns so whole directories are skipped.
+"""
+
+import glob
+import os
+from datetime import datetime
+from typing import Optional
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+import config
+import shared_state as state
+
+PARTITION_SCHEMA = pa.schema([
+    ("game_type", pa.string()),
+    ("date", pa.string()),
+])
+
+PARTITIONING = ds.partitioning(PARTITION_SCHEMA, flavor="hive")
+
+# One schema for all game types; columns that don't apply to a game are null
+WAREHOUSE_SCHEMA = pa.schema([
+    ("join_code", pa.string()),
+    ("created_at", pa.string()),
+    ("archived_at", pa.string()),
+    ("num_teams", pa.int32()),
+    ("team", pa.string()),
+    ("round", pa.int32()),
+    ("scenario", pa.string()),
+    ("score", pa.float64()),
+    # build_country
+    ("tax_rate", pa.float64()),
+    ("education_spending", pa.float64()),
+    ("infrastructure_spending", pa.float64()),
+    ("climate_policy", pa.string()),
+    ("gdp", pa.float64()),
+    ("employment", pa.float64()),
+    ("inequality", pa.float64()),
+    ("approval", pa.float64()),
+    ("debt", pa.float64()),
+    ("deficit_pct_gdp", pa.float64()),
+    # beat_market
+    ("cash_pct", pa.float64()),
+    ("shares_pct", pa.float64()),
+    ("crypto_pct", pa.float64()),
+    ("bonds_pct", pa.float64()),
+    ("portfolio_value", pa.float64()),
+    ("returns_pct", pa.float64()),
+    ("risk", pa.float64()),
+    ("esg", pa.float64()),
+    # crypto_crash
+    ("btc_pct", pa.float64()),
+    ("eth_pct", pa.float64()),
+    ("doge_pct", pa.float64()),
+    ("stable_pct", pa.float64()),
+    ("leverage", pa.int32()),
+    ("equity", pa.float64()),
+    ("round_return_pct", pa.float64()),
+    ("total_return_pct", pa.float64()),
+    ("risk_exposure", pa.float64()),
+    ("risk_label", pa.string()),
+    ("liquidations", pa.int32()),
+    ("liquidated", pa.bool_()),
+]).append(PARTITION_SCHEMA.field("game_type")).append(PARTITION_SCHEMA.field("date"))
+
+
+def warehouse_dir() -> str:
+    """Dataset root (config.WAREHOUSE_DIRECTORY, or <data dir>/warehouse)"""
+    return config.WAREHOUSE_DIRECTORY or os.path.join(state.DATA_DIR, "warehouse")
+
+
+# ============================================================================
+# ARCHIVING
+# ============================================================================
+
+def _float(value) -> Optional[float]:
+    return None if value is None else float(value)
+
+
+def _round_columns(game_type: str, rd: dict) -> dict:
+    d = rd.get("decisions", {}) or {}
+
+    if game_type == "build_country":
+        m = rd.get("metrics", {}) or {}
+        f = rd.get("fiscal", {}) or {}
+        return {
+            "tax_rate": _float(d.get("tax_rate")),
+            "education_spending": _float(d.get("education_spending")),
+            "infrastructure_spending": _float(d.get("infrastructure_spending")),
+            "climate_policy": d.get("climate_policy"),
+            "gdp": _float(m.get("gdp")),
+            "employment": _float(m.get("employment")),
+            "inequality": _float(m.get("inequality")),
+            "approval": _float(m.get("approval")),
+            "debt": _float(m.get("debt")),
+            "deficit_pct_gdp": _float(f.get("deficit_pct_gdp")),
+        }
+
+    if game_type == "beat_market":
+        pv = rd.get("portfolio_value", {}) or {}
+        return {
+            "cash_pct": _float(d.get("cash_pct")),
+            "shares_pct": _float(d.get("shares_pct")),
+            "crypto_pct": _float(d.get("crypto_pct")),
+            "bonds_pct": _float(d.get("bonds_pct")),
+            "portfolio_value": _float(pv.get("value")),
+            "returns_pct": _float(pv.get("returns")),
+            "risk": _float(pv.get("risk")),
+            "esg": _float(pv.get("esg")),
+        }
+
+    if game_type == "crypto_crash":
+        alloc = d.get("allocations", {}) or {}
+        cp = rd.get("crypto_portfolio", {}) or {}
+        return {
+            "btc_pct": _float(alloc.get("btc")),
+            "eth_pct": _float(alloc.get("eth")),
+            "doge_pct": _float(alloc.get("doge")),
+            "stable_pct": _float(alloc.get("stable")),
+            "leverage": int(d.get("leverage", 1)),
+            "equity": _float(cp.get("equity")),
+            "round_return_pct": _float(cp.get("last_return_pct")),
+            "total_return_pct": _float(cp.get("total_return_pct")),
+            "risk_exposure": _float(cp.get("risk_exposure")),
+            "risk_label": cp.get("risk_label"),
+            "liquidations": int(cp.get("liquidations", 0)),
+        }
+
+    return {}
+
+
+def session_rows(join_code: str, game: dict) -> list:
+    """Warehouse rows for one game: one per team per recorded round"""
+    game_type = game.get("game_type", "unknown")
+    created_at = game.get("created_at") or datetime.now().isoformat()
+    archived_at = datetime.now().isoformat()
+    num_teams = len(game.get("teams", {}))
+
+    rows = []
+    for team_name, team_data in game.get("teams", {}).items():
+        round_history = team_data.get("round_history", {}) or {}
+        previous_liquidations = 0
+
+        for round_num in sorted(int(r) for r in round_history.keys()):
+            rd = round_history.get(str(round_num), {}) or {}
+            row = {
+                "join_code": join_code,
+                "created_at": created_at,
+                "archived_at": archived_at,
+                "num_teams": num_teams,
+                "team": team_name,
+                "round": round_num,
+                "scenario": rd.get("scenario"),
+                "score": _float(rd.get("score")),
+                "game_type": game_type,
+                "date": created_at[:10],
+            }
+            row.update(_round_columns(game_type, rd))
+
+            if "liquidations" in row:
+                # Cumulative counter in the snapshot; flag the rounds where it went up
+                row["liquidated"] = row["liquidations"] > previous_liquidations
+                previous_liquidations = row["liquidations"]
+
+            rows.append(row)
+
+    return rows
+
+
+def archive_session(join_code: str, game: dict = None) -> int:
+    """
+    Append (or replace) one game's rows in the warehouse.
+    Each session is its own file, so archiving is incremental and re-archiving
+    the same session overwrites it instead of duplicating rows.
+    Returns: number of rows written (0 if the game has no round history)
+    """
+    join_code = join_code.upper()
+    game = game or state.get_game_session(join_code)
+    if not game:
+        return 0
+
+    rows = session_rows(join_code, game)
+    if not rows:
+        return 0
+
+    table = pa.Table.from_pylist(rows, schema=WAREHOUSE_SCHEMA)
+    ds.write_dataset(
+        table,
+        warehouse_dir(),
+        format="parquet",
+        partitioning=PARTITIONING,
+        basename_template=f"{join_code}-{{i}}.parquet",
+        existing_data_behavior="overwrite_or_ignore",
+    )
+    return len(rows)
+
+
+def is_archived(join_code: str) -> bool:
+    """True if join_code already has rows in the warehouse"""
+    return bool(glob.glob(os.path.join(warehouse_dir(), "*", "*", f"{join_code.upper()}-*.parquet")))
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+def build_filter(game_type: str = None, start_date: str = None, end_date: str = None,
+                 join_codes: list = None, expression=None):
+    """
+    Combine the common filters into one dataset expression.
+    game_type and dates (inclusive, "YYYY-MM-DD") hit the partition columns,
+    so non-matching directories are never opened.
+    """
+    parts = []
+    if game_type:
+        parts.append(ds.field("game_type") == game_type)
+    if start_date:
+        parts.append(ds.field("date") >= start_date)
+    if end_date:
+        parts.append(ds.field("date") <= end_date)
+    if join_codes:
+        parts.append(ds.field("join_code").isin([c.upper() for c in join_codes]))
+    if expression is not None:
+        parts.append(expression)
+
+    combined = None
+    for part in parts:
+        combined = part if combined is None else combined & part
+    return combined
+
+
+def dataset():
+    """The warehouse as a pyarrow Dataset (None if nothing has been archived yet)"""
+    root = warehouse_dir()
+    if not os.path.isdir(root):
+        return None
+    return ds.dataset(root, format="parquet", schema=WAREHOUSE_SCHEMA, partitioning=PARTITIONING)
+
+
+def query(columns: list = None, **filters) -> pa.Table:
+    """
+    Read warehouse rows.
+    columns: subset of WAREHOUSE_SCHEMA names (None = all)
+    filters: see build_filter
+    """
+    data = dataset()
+    if data is None:
+        schema = WAREHOUSE_SCHEMA if columns is None else pa.schema([WAREHOUSE_SCHEMA.field(c) for c in columns])
+        return schema.empty_table()
+    return data.to_table(columns=columns, filter=build_filter(**filters))
+
+
+def aggregate(group_by: list, aggregations: list, **filters) -> pa.Table:
+    """
+    Group warehouse rows and aggregate them, e.g.
+    aggregate(["scenario"], [("tax_rate", "mean")], game_type="build_country")
+    aggregations: (column, pyarrow aggregate function name) pairs
+    Only the columns involved are read.
+    """
+    columns = list(dict.fromkeys(list(group_by) + [column for column, _ in aggregations]))
+    table = query(columns=columns, **filters)
+    return table.group_by(group_by).aggregate(aggregations)
+
+
+def average_policy_by_scenario(**filters) -> pa.Table:
+    """Build a Country: mean policy choices and outcomes per scenario"""
+    filters["game_type"] = "build_country"
+    return aggregate(
+        ["scenario"],
+        [
+            ("tax_rate", "mean"),
+            ("education_spending", "mean"),
+            ("infrastructure_spending", "mean"),
+            ("score", "mean"),
+            ("join_code", "count_distinct"),
+        ],
+        **filters,
+    ).sort_by("scenario")
+
+
+def liquidation_rate_by_leverage(**filters) -> pa.Table:
+    """Crypto Crash: share of team-rounds that ended in a liquidation, per leverage level"""
+    filters["game_type"] = "crypto_crash"
+    table = query(columns=["leverage", "liquidated"], **filters)
+    table = table.set_column(1, "liquidated", table["liquidated"].cast(pa.float64()))
+    table = table.group_by(["leverage"]).aggregate([("liquidated", "mean"), ("liquidated", "count")])
+    return table.select(["leverage", "liquidated_mean", "liquidated_count"]).rename_columns(
+        ["leverage", "liquidation_rate", "team_rounds"]
+    ).sort_by("leverage")